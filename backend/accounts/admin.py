@@ -15,7 +15,10 @@ class UserAdmin(BaseUserAdmin):
     
     fieldsets = BaseUserAdmin.fieldsets + (
         ('Club & Notifications', {
-            'fields': ('club', 'sub_club', 'notification_enabled', 'notification_time', 'timezone', 'last_notification_sent_at')
+            'fields': (
+                'club', 'sub_club', 'notification_enabled', 'notification_time', 'timezone',
+                'last_notification_sent_at', 'urgent_notifications_enabled',
+            )
         }),
     )
     
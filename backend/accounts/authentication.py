@@ -1,22 +1,35 @@
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.conf import settings
 
+from .tokens import token_user
+
 class CookieJWTAuthentication(JWTAuthentication):
     """
-    Custom authentication class that allows SimpleJWT to authenticate 
+    Custom authentication class that allows SimpleJWT to authenticate
     an access token from an HttpOnly cookie.
+
+    Safe requests whose token carries current membership claims get a User
+    built from the claims, without a users-table query (accounts/tokens.py);
+    writes and stale tokens load the user from the database.
     """
     def authenticate(self, request):
         # 1. First try the standard Authorization header mechanism (for testing/API clients)
-        header_auth = super().authenticate(request)
-        if header_auth is not None:
-            return header_auth
-            
+        raw_token = None
+        header = self.get_header(request)
+        if header is not None:
+            raw_token = self.get_raw_token(header)
+
         # 2. If no header, try to extract the access token from cookies
-        access_token = request.COOKIES.get('access_token')
-        
-        if access_token is None:
+        if raw_token is None:
+            raw_token = request.COOKIES.get('access_token')
+
+        if raw_token is None:
             return None
-            
-        validated_token = self.get_validated_token(access_token)
+
+        validated_token = self.get_validated_token(raw_token)
+        if request.method in SAFE_METHODS:
+            user = token_user(validated_token)
+            if user is not None:
+                return user, validated_token
         return self.get_user(validated_token), validated_token
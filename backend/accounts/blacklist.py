@@ -0,0 +1,153 @@
+"""
+Redis index of blacklisted refresh tokens.
+
+With ROTATE_REFRESH_TOKENS and BLACKLIST_AFTER_ROTATION every refresh
+blacklists the presented token, and every refresh first checks that it is
+not blacklisted yet. IndexedRefreshToken (accounts/tokens.py) answers that
+check from a Redis sorted set of JTIs, scored by the token's expiry, rather
+than from the BlacklistedToken table:
+
+- new BlacklistedToken rows are added after commit (signals.py);
+- the set only counts as complete while it holds READY_MEMBER, which
+  accounts.tasks.prune_tokens adds after loading every unexpired row from
+  the table. A flushed or deleted key takes the marker with it, and a
+  failed add removes it, so a JTI missing from the set is trusted as "not
+  blacklisted" only when nothing can have been missed;
+- a failed add also bumps EPOCH_KEY, and a rebuild only sets the marker if
+  the epoch it read before loading the table is still current (WATCH), so
+  a rebuild that overlapped the failure cannot mark the set complete;
+- otherwise, or when Redis is unreachable, the check falls back to the table.
+
+Entries leave the set when their token expires (prune_tokens trims them);
+un-blacklisting a token by deleting its row is not reflected, so such a
+token stays rejected until it expires.
+"""
+import logging
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEY = 'accounts:token-blacklist'
+READY_MEMBER = '*ready*'
+EPOCH_KEY = 'accounts:token-blacklist:epoch'
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.TOKEN_BLACKLIST_REDIS_URL)
+    return _client
+
+
+def contains(jti):
+    """
+    Whether the token is blacklisted: True or False, or None when the index
+    cannot tell (incomplete or unreachable) and the table must be checked.
+    """
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zscore(INDEX_KEY, READY_MEMBER)
+        pipe.zscore(INDEX_KEY, jti)
+        ready, score = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Token blacklist index unavailable: %s", e)
+        return None
+    if ready is None:
+        return None
+    return score is not None
+
+
+def add(entries):
+    """
+    Add blacklisted tokens to the index.
+
+    Args:
+        entries: iterable of (JTI, aware expiry datetime)
+    """
+    members = {jti: expires_at.timestamp() for jti, expires_at in entries}
+    if members:
+        get_redis().zadd(INDEX_KEY, members)
+
+
+def add_on_commit(entries):
+    """
+    add() once the current transaction commits. If Redis rejects the write,
+    the index is marked incomplete so checks use the table until the next
+    rebuild.
+    """
+    entries = list(entries)
+
+    def apply():
+        try:
+            add(entries)
+        except redis.RedisError as e:
+            logger.error("Could not index blacklisted tokens: %s", e)
+            try:
+                invalidate()
+            except redis.RedisError:
+                # Unreachable for the checks as well: they use the table
+                pass
+    transaction.on_commit(apply)
+
+
+def invalidate():
+    """Mark the index incomplete, including for rebuilds already running."""
+    pipe = get_redis().pipeline()
+    pipe.zrem(INDEX_KEY, READY_MEMBER)
+    pipe.incr(EPOCH_KEY)
+    pipe.execute()
+
+
+def is_ready():
+    return get_redis().zscore(INDEX_KEY, READY_MEMBER) is not None
+
+
+def trim(now):
+    """Drop tokens that have expired by `now`; the marker never expires."""
+    get_redis().zremrangebyscore(INDEX_KEY, '-inf', now.timestamp())
+
+
+def rebuild(now, batch_size):
+    """
+    Load every unexpired blacklisted token into the index, then mark it
+    complete. Idempotent; tokens blacklisted meanwhile are added by their
+    own commit hooks, and if one of those adds fails the index is left
+    incomplete for the next run.
+
+    Returns:
+        bool: whether the index was marked complete
+    """
+    client = get_redis()
+    # Read before the table, so any add failing from here on is noticed
+    epoch = client.get(EPOCH_KEY)
+    rows = (
+        BlacklistedToken.objects
+        .filter(token__expires_at__gt=now)
+        .order_by('pk')
+        .values_list('pk', 'token__jti', 'token__expires_at')
+    )
+    last_pk = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        add((jti, expires_at) for _, jti, expires_at in batch)
+        last_pk = batch[-1][0]
+
+    with client.pipeline() as pipe:
+        try:
+            pipe.watch(EPOCH_KEY)
+            if pipe.get(EPOCH_KEY) != epoch:
+                return False
+            pipe.multi()
+            pipe.zadd(INDEX_KEY, {READY_MEMBER: float('inf')})
+            pipe.execute()
+        except redis.WatchError:
+            return False
+    return True
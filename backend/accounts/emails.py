@@ -0,0 +1,27 @@
+"""
+Account emails rendered at delivery time.
+
+A password reset link is a credential, so it is never stored: the outbox row
+only records the user, and notifications.outbox builds the message (with a
+fresh token) when it sends the row.
+"""
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMessage
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+PASSWORD_RESET_SUBJECT = 'CEAL-Calendar Password Reset'
+
+
+def password_reset_message(user):
+    """EmailMessage carrying a newly generated reset link for `user`."""
+    token = default_token_generator.make_token(user)
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    reset_link = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}/"
+    return EmailMessage(
+        subject=PASSWORD_RESET_SUBJECT,
+        body=f'Click the following link to reset your password: {reset_link}\n\nThis link will expire in 15 minutes.',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
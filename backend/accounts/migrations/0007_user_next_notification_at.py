@@ -0,0 +1,71 @@
+# Generated by Django 5.0 on 2026-10-18 07:32
+
+from datetime import datetime, timedelta
+
+import pytz
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Frozen copies of notifications.utils._local_slot and
+# compute_next_notification_at as of this migration
+
+def _local_slot(day, notification_time, user_tz):
+    local = user_tz.normalize(user_tz.localize(datetime.combine(day, notification_time), is_dst=False))
+    return local.astimezone(pytz.UTC)
+
+
+def compute_next_notification_at(notification_time, timezone_str, now_utc, last_sent_utc=None):
+    if not notification_time:
+        return None
+    try:
+        user_tz = pytz.timezone(timezone_str)
+    except Exception:
+        user_tz = pytz.UTC
+
+    today = now_utc.astimezone(user_tz).date()
+    today_slot = _local_slot(today, notification_time, user_tz)
+    if not last_sent_utc or last_sent_utc.astimezone(user_tz).date() < today:
+        return today_slot
+    if today_slot > last_sent_utc and today_slot + timedelta(minutes=1) > now_utc:
+        return today_slot
+    return _local_slot(today + timedelta(days=1), notification_time, user_tz)
+
+
+def backfill_next_notification_at(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    now = timezone.now()
+    batch = []
+    users = User.objects.filter(notification_enabled=True, notification_time__isnull=False)
+    for user in users.iterator(chunk_size=1000):
+        user.next_notification_at = compute_next_notification_at(
+            user.notification_time, user.timezone, now, user.last_notification_sent_at
+        )
+        batch.append(user)
+        if len(batch) >= 1000:
+            User.objects.bulk_update(batch, ['next_notification_at'])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ['next_notification_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_user_time_format'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('clubs', '0003_club_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='next_notification_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='UTC timestamp the next notification is due (null when notifications are off)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('next_notification_at__isnull', False), ('notification_enabled', True)), fields=['next_notification_at'], name='user_next_notification_idx'),
+        ),
+        migrations.RunPython(backfill_next_notification_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_next_notification_at'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('clubs', '0003_club_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='urgent_notifications_enabled',
+            field=models.BooleanField(default=False, help_text='Email right away when an event starting soon is added or changed'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('urgent_notifications_enabled', True)), fields=['club', 'sub_club'], name='user_urgent_club_idx'),
+        ),
+    ]
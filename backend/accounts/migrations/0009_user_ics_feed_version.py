@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_user_urgent_notifications_enabled'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='ics_feed_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Bumped to revoke every personal calendar feed URL issued so far'),
+        ),
+    ]
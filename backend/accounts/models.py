@@ -2,7 +2,18 @@ import random
 from datetime import time
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone as django_timezone
 from clubs.models import Club
+from notifications.utils import compute_next_notification_at
+
+# Fields that determine when a user's next digest is due
+NOTIFICATION_SCHEDULE_FIELDS = (
+    'notification_enabled', 'notification_time', 'timezone', 'last_notification_sent_at',
+)
+
+# Fields embedded in access tokens (accounts/tokens.py); changing one makes
+# the user's tokens stale
+MEMBERSHIP_FIELDS = ('club_id', 'sub_club_id', 'is_staff', 'is_superuser', 'is_active')
 
 
 def get_random_notification_time():
@@ -59,6 +70,21 @@ class User(AbstractUser):
         blank=True,
         help_text="UTC timestamp of last notification sent"
     )
+    next_notification_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="UTC timestamp the next notification is due (null when notifications are off)"
+    )
+    urgent_notifications_enabled = models.BooleanField(
+        default=False,
+        help_text="Email right away when an event starting soon is added or changed"
+    )
+    ics_feed_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Bumped to revoke every personal calendar feed URL issued so far"
+    )
     
     # Time format preference
     TIME_FORMAT_CHOICES = [
@@ -78,6 +104,70 @@ class User(AbstractUser):
     
     class Meta:
         ordering = ['email']
+        indexes = [
+            # dispatch_notifications only ever reads the users that are due
+            models.Index(
+                fields=['next_notification_at'],
+                name='user_next_notification_idx',
+                condition=models.Q(notification_enabled=True, next_notification_at__isnull=False),
+            ),
+            # Urgent-change recipients are looked up by club among opted-in users
+            models.Index(
+                fields=['club', 'sub_club'],
+                name='user_urgent_club_idx',
+                condition=models.Q(urgent_notifications_enabled=True),
+            ),
+        ]
     
     def __str__(self):
         return self.email
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_notification_schedule = instance._notification_schedule()
+        instance._loaded_membership = instance.membership()
+        return instance
+
+    def _notification_schedule(self):
+        # Read __dict__ so deferred fields are not loaded just for this
+        return tuple(self.__dict__.get(name) for name in NOTIFICATION_SCHEDULE_FIELDS)
+
+    def membership(self):
+        """The values embedded in access tokens, as a tuple."""
+        return tuple(self.__dict__.get(name) for name in MEMBERSHIP_FIELDS)
+
+    def membership_changed(self):
+        """Whether a membership field differs from what was loaded (False for new users)."""
+        loaded = getattr(self, '_loaded_membership', None)
+        return loaded is not None and loaded != self.membership()
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # A user built from token claims loads the rest of its row on first
+        # use, in one query rather than one per deferred field
+        if fields is not None and getattr(self, '_from_token', False):
+            fields = {*fields, *self.get_deferred_fields()}
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+
+    def schedule_next_notification(self, now=None):
+        """Set next_notification_at from the current notification settings."""
+        if not self.notification_enabled:
+            self.next_notification_at = None
+            return
+        self.next_notification_at = compute_next_notification_at(
+            self.notification_time,
+            self.timezone,
+            now or django_timezone.now(),
+            self.last_notification_sent_at,
+        )
+
+    def save(self, *args, **kwargs):
+        # Keep the schedule in step whenever a setting it depends on changes
+        if self._notification_schedule() != getattr(self, '_loaded_notification_schedule', None):
+            self.schedule_next_notification()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'next_notification_at'}
+        super().save(*args, **kwargs)
+        self._loaded_notification_schedule = self._notification_schedule()
+        self._loaded_membership = self.membership()
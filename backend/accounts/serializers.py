@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
 from .models import User
+from .tokens import IndexedRefreshToken, add_membership_claims
 from clubs.models import Club
 from clubs.serializers import ClubSerializer
 
@@ -47,7 +52,8 @@ class UserSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'email', 'username', 'first_name', 'last_name',
             'club', 'sub_club', 'extra_clubs', 'notification_enabled', 
-            'notification_time', 'timezone', 'time_format', 'is_staff', 'is_superuser'
+            'notification_time', 'timezone', 'time_format', 'urgent_notifications_enabled',
+            'is_staff', 'is_superuser'
         ]
         read_only_fields = ['id', 'email']
 
@@ -82,7 +88,7 @@ class UserSettingsSerializer(serializers.ModelSerializer):
         model = User
         fields = [
             'first_name', 'last_name', 'notification_enabled',
-            'notification_time', 'timezone', 'time_format'
+            'notification_time', 'timezone', 'time_format', 'urgent_notifications_enabled'
         ]
 
 
@@ -92,3 +98,33 @@ class ChangePasswordSerializer(serializers.Serializer):
     """
     old_password = serializers.CharField(required=True)
     new_password = serializers.CharField(required=True, validators=[validate_password])
+
+
+class MembershipTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Login tokens carrying the user's membership claims (accounts/tokens.py).
+    """
+    token_class = IndexedRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        return add_membership_claims(super().get_token(user), user)
+
+
+class MembershipTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh that re-reads the membership claims, so a new access token
+    reflects club changes made since login.
+    """
+    token_class = IndexedRefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: access[api_settings.USER_ID_CLAIM]}, is_active=True,
+        ).first()
+        if user is None:
+            raise InvalidToken("User not found or inactive.")
+        data['access'] = str(add_membership_claims(access, user))
+        return data
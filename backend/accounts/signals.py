@@ -0,0 +1,48 @@
+"""
+Signal handlers that make access tokens stale when the membership they
+embed changes (accounts/tokens.py), and that keep the refresh-token
+blacklist index current (accounts/blacklist.py).
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from clubs.models import Club
+
+from . import blacklist
+from .models import User
+from .tokens import bump_membership_version
+
+
+def _bump_on_commit(user_ids):
+    for user_id in user_ids:
+        transaction.on_commit(partial(bump_membership_version, user_id))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    if instance.membership_changed():
+        _bump_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    _bump_on_commit([instance.pk])
+
+
+@receiver(pre_delete, sender=Club)
+def club_deleted(sender, instance, **kwargs):
+    # Members' club columns are nulled by the delete without a save
+    members = User.objects.filter(Q(club=instance) | Q(sub_club=instance)).values_list('pk', flat=True)
+    _bump_on_commit(list(members))
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance, created, **kwargs):
+    if created:
+        blacklist.add_on_commit([(instance.token.jti, instance.token.expires_at)])
@@ -0,0 +1,48 @@
+import logging
+
+import redis
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from . import blacklist
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def prune_tokens():
+    """
+    Delete expired refresh tokens and their blacklist entries, in batches of
+    TOKEN_PRUNE_BATCH_SIZE, then trim them from the blacklist index and
+    rebuild the index if Redis lost it. Runs hourly via Celery Beat, so the
+    tables hold about one REFRESH_TOKEN_LIFETIME of rotations.
+    """
+    now = timezone.now()
+    batch_size = settings.TOKEN_PRUNE_BATCH_SIZE
+    expired = OutstandingToken.objects.filter(expires_at__lte=now).order_by('pk').values_list('pk', flat=True)
+
+    deleted = 0
+    while True:
+        ids = list(expired[:batch_size])
+        if not ids:
+            break
+        # Blacklist rows first, so the outstanding delete has nothing to cascade
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+    try:
+        blacklist.trim(now)
+        if not blacklist.is_ready() and not blacklist.rebuild(now, batch_size):
+            logger.warning("Token blacklist index changed during the rebuild; retrying on the next run")
+    except redis.RedisError as e:
+        # Refreshes keep checking the table until a later run succeeds
+        logger.warning("Could not maintain the token blacklist index: %s", e)
+
+    result = f"Pruned {deleted} expired token(s)"
+    logger.info(result)
+    return result
@@ -1,12 +1,25 @@
 """
 Tests for the accounts app: signup, login, profile, admin views.
 """
-from django.test import TestCase
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+
+import redis
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from accounts import blacklist
 from accounts.models import User
+from accounts.tasks import prune_tokens
 from clubs.models import Club
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover
+    fakeredis = None
 
 
 class SignupTests(TestCase):
@@ -147,6 +160,57 @@ class ChangePasswordTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+class PasswordResetRequestTests(TestCase):
+    """Test that reset mail is queued in the outbox instead of sent inline."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='user@test.com', username='user', password='OldPass123!',
+        )
+
+    def test_reset_mail_is_queued(self):
+        from django.core import mail
+        from notifications.models import OutboxEmail
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('password_reset'), {'email': 'user@test.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(callbacks), 1)  # wakes the sender after commit
+        queued = OutboxEmail.objects.get()
+        self.assertEqual((queued.kind, queued.to_email, queued.user_id), ('password_reset', 'user@test.com', self.user.id))
+        # The link is a credential: it is only generated when the mail is sent
+        self.assertEqual(queued.body, '')
+
+    def test_reset_link_built_at_delivery(self):
+        from django.core import mail
+        from notifications.models import OutboxEmail
+        from notifications.tasks import send_outbox
+
+        self.client.post(reverse('password_reset'), {'email': 'user@test.com'}, format='json')
+        self.assertIn('Delivered 1 email', send_outbox())
+        self.assertEqual(mail.outbox[0].to, ['user@test.com'])
+        self.assertIn('/reset-password/', mail.outbox[0].body)
+        self.assertEqual(OutboxEmail.objects.get().body, '')
+
+    def test_reset_for_deleted_user_fails(self):
+        from notifications.models import OutboxEmail
+        from notifications.tasks import send_outbox
+
+        self.client.post(reverse('password_reset'), {'email': 'user@test.com'}, format='json')
+        self.user.delete()
+        self.assertIn('Delivered 0 email', send_outbox())
+        self.assertEqual(OutboxEmail.objects.get().status, 'failed')
+
+    def test_unknown_email_queues_nothing(self):
+        from notifications.models import OutboxEmail
+
+        response = self.client.post(reverse('password_reset'), {'email': 'nobody@test.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(OutboxEmail.objects.exists())
+
+
 class AdminUserTests(TestCase):
     """Test admin user management endpoints."""
 
@@ -184,3 +248,219 @@ class AdminUserTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.regular_user.refresh_from_db()
         self.assertEqual(self.regular_user.club, club)
+
+
+class TokenMembershipTests(TestCase):
+    """Test authentication from the membership claims in access tokens."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.other_club = Club.objects.create(slug='ee', name='EE Club', color='#EF4444')
+        self.user = User.objects.create_user(
+            email='member@example.com',
+            username='member',
+            password='StrongPass123!',
+            club=self.club,
+        )
+        self.user.extra_clubs.add(self.other_club)
+        self.client.post(reverse('token_obtain_pair'), {
+            'email': 'member@example.com',
+            'password': 'StrongPass123!',
+        }, format='json')
+
+    def _claims(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        return AccessToken(self.client.cookies['access_token'].value)['membership']
+
+    def _user_queries(self, method, url, **kwargs):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, [q['sql'] for q in queries if 'FROM "accounts_user"' in q['sql']]
+
+    def test_login_embeds_membership(self):
+        claims = self._claims()
+        self.assertEqual(claims['club'], self.club.id)
+        self.assertIsNone(claims['sub_club'])
+        self.assertNotIn('extra_clubs', claims)
+        self.assertFalse(claims['is_superuser'])
+
+    def test_safe_request_skips_user_lookup(self):
+        response, user_queries = self._user_queries('get', reverse('club-subscription-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(user_queries, [])
+
+    def test_write_loads_user(self):
+        response, user_queries = self._user_queries(
+            'post', reverse('club-subscription-list'), data={'club': self.club.id}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(user_queries), 1)
+
+    def test_other_fields_load_in_one_query(self):
+        response, user_queries = self._user_queries('get', reverse('user-profile'))
+        self.assertEqual(response.data['email'], 'member@example.com')
+        self.assertEqual(response.data['username'], 'member')
+        self.assertEqual(len(user_queries), 1)
+
+    def test_membership_change_makes_token_stale(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.club = self.other_club
+            self.user.save()
+        _, user_queries = self._user_queries('get', reverse('club-subscription-list'))
+        self.assertEqual(len(user_queries), 1)
+
+    def test_extra_club_change_keeps_token(self):
+        # Extra clubs are not in the claims; writes resolve them from the database
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_club.extra_members.remove(self.user)
+        _, user_queries = self._user_queries('get', reverse('club-subscription-list'))
+        self.assertEqual(user_queries, [])
+
+    def test_unrelated_save_keeps_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Renamed'
+            self.user.save()
+        _, user_queries = self._user_queries('get', reverse('club-subscription-list'))
+        self.assertEqual(user_queries, [])
+
+    def test_deactivated_user_rejected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        response = self.client.get(reverse('club-subscription-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_claims_without_active_user_fall_back(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        from accounts.tokens import add_membership_claims
+
+        token = add_membership_claims(AccessToken.for_user(self.user), self.user)
+        del token['membership']['is_active']
+        self.client.cookies['access_token'] = str(token)
+        _, user_queries = self._user_queries('get', reverse('club-subscription-list'))
+        self.assertEqual(len(user_queries), 1)
+
+        # Deactivated without a version bump: the claim still keeps the user out
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.is_active = False
+        self.client.cookies['access_token'] = str(add_membership_claims(AccessToken.for_user(self.user), self.user))
+        response = self.client.get(reverse('club-subscription-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_reads_current_membership(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.sub_club = Club.objects.create(slug='cs-ai', name='CS AI', parent=self.club)
+            self.user.save()
+        response = self.client.post(reverse('token_refresh'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._claims()['sub_club'], self.user.sub_club_id)
+        _, user_queries = self._user_queries('get', reverse('club-subscription-list'))
+        self.assertEqual(user_queries, [])
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class TokenBlacklistIndexTests(TestCase):
+    """Test the Redis blacklist index and the expired-token pruning."""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = patch.object(blacklist, '_client', self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='member@example.com',
+            username='member',
+            password='StrongPass123!',
+        )
+        self.client.post(reverse('token_obtain_pair'), {
+            'email': 'member@example.com',
+            'password': 'StrongPass123!',
+        }, format='json')
+        self.refresh = self.client.cookies['refresh_token'].value
+
+    def _refresh(self, token):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.cookies['refresh_token'] = token
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('token_refresh'))
+        checks = [q['sql'] for q in queries if 'INNER JOIN "token_blacklist_outstandingtoken"' in q['sql']]
+        return response, checks
+
+    def _outstanding(self, jti, expires_at):
+        return OutstandingToken.objects.create(user=self.user, jti=jti, token='x', expires_at=expires_at)
+
+    def test_ready_index_replaces_table_check(self):
+        blacklist.rebuild(timezone.now(), 100)
+        response, checks = self._refresh(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(checks, [])
+
+        # The rotated token was indexed and is rejected without the table
+        response, checks = self._refresh(self.refresh)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(checks, [])
+
+    def test_incomplete_index_falls_back_to_table(self):
+        response, checks = self._refresh(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(checks), 1)
+
+        self.redis.delete(blacklist.INDEX_KEY)
+        response, checks = self._refresh(self.refresh)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(len(checks), 1)
+
+    def test_rebuild_loads_unexpired_blacklist(self):
+        now = timezone.now()
+        BlacklistedToken.objects.create(token=self._outstanding('live', now + timedelta(hours=1)))
+        BlacklistedToken.objects.create(token=self._outstanding('dead', now - timedelta(hours=1)))
+        blacklist.rebuild(now, 1)
+        self.assertTrue(blacklist.contains('live'))
+        self.assertFalse(blacklist.contains('dead'))
+
+    def test_failed_add_during_rebuild_keeps_index_incomplete(self):
+        now = timezone.now()
+        token = self._outstanding('missed', now + timedelta(hours=1))
+        loaded = BlacklistedToken.objects.filter
+
+        def load_then_fail(*args, **kwargs):
+            # The token is blacklisted after the rebuild read the table, and indexing it fails
+            rows = loaded(*args, **kwargs)
+            BlacklistedToken.objects.create(token=token)
+            with patch.object(blacklist, 'add', side_effect=redis.ConnectionError("Connection reset")):
+                with self.captureOnCommitCallbacks(execute=True):
+                    blacklist.add_on_commit([('missed', token.expires_at)])
+            return rows
+
+        with patch.object(BlacklistedToken.objects, 'filter', side_effect=load_then_fail):
+            self.assertFalse(blacklist.rebuild(now, 100))
+        self.assertIsNone(blacklist.contains('missed'))
+
+        self.assertTrue(blacklist.rebuild(now, 100))
+        self.assertTrue(blacklist.contains('missed'))
+
+    @override_settings(TOKEN_PRUNE_BATCH_SIZE=2)
+    def test_prune_deletes_expired_tokens_in_batches(self):
+        now = timezone.now()
+        for i in range(5):
+            token = self._outstanding(f'old-{i}', now - timedelta(minutes=i + 1))
+            if i % 2:
+                BlacklistedToken.objects.create(token=token)
+        live = self._outstanding('live', now + timedelta(hours=1))
+        BlacklistedToken.objects.create(token=live)
+        blacklist.add([('old-1', now - timedelta(minutes=2))])
+
+        self.assertEqual(prune_tokens(), "Pruned 5 expired token(s)")
+        self.assertFalse(OutstandingToken.objects.filter(jti__startswith='old-').exists())
+        self.assertEqual(list(BlacklistedToken.objects.values_list('token__jti', flat=True)), ['live'])
+        self.assertIsNone(self.redis.zscore(blacklist.INDEX_KEY, 'old-1'))
+        # The index was missing its marker, so the task rebuilt it
+        self.assertTrue(blacklist.contains('live'))
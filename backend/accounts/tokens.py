@@ -0,0 +1,113 @@
+"""
+Membership claims in access tokens.
+
+Access tokens carry what the read-only API needs to know about a user (club,
+sub-club, staff and active flags) plus a per-user membership version, so
+CookieJWTAuthentication can authenticate safe requests without a users-table
+query:
+
+- the version is a counter in the shared cache, bumped after commit whenever
+  one of the embedded fields changes (User.save, accounts/signals.py);
+- a token whose version no longer matches (or whose counter was evicted) is
+  stale and the request falls back to loading the user from the database,
+  as do all writes;
+- the token refresh re-reads the claims, so at most one access token
+  lifetime is spent on the fallback after a change.
+
+Refresh tokens are IndexedRefreshTokens, whose blacklist check is answered
+by the Redis index in accounts/blacklist.py.
+"""
+import time
+
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import blacklist
+from .models import User
+
+MEMBERSHIP_CLAIM = 'membership'
+VERSION_KEY_PREFIX = 'accounts:membership:'
+
+
+def _version_key(user_id):
+    return f'{VERSION_KEY_PREFIX}{user_id}'
+
+
+def get_membership_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Seeded from the clock so an evicted counter never reuses a version
+        cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def bump_membership_version(user_id):
+    """Make the user's existing access tokens fall back to the database."""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # No counter: every token of the user is stale already
+        pass
+
+
+def add_membership_claims(token, user):
+    """Embed the user's current membership in `token`."""
+    token[MEMBERSHIP_CLAIM] = {
+        'version': get_membership_version(user.pk),
+        'club': user.club_id,
+        'sub_club': user.sub_club_id,
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+        'is_active': user.is_active,
+    }
+    return token
+
+
+def token_user(validated_token):
+    """
+    A User built from the token's claims, or None if the token has no
+    membership claims, they are stale, or they do not vouch for an active
+    user (the database then decides).
+
+    Only the claimed fields are loaded; reading any other field loads the
+    rest of the row in one query (User.refresh_from_db).
+    """
+    user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+    claims = validated_token.get(MEMBERSHIP_CLAIM)
+    if user_id is None or not claims:
+        return None
+    if claims.get('version') != cache.get(_version_key(user_id)):
+        return None
+    if not claims.get('is_active'):
+        # Inactive, or minted before the claim existed
+        return None
+
+    values = {
+        'id': user_id,
+        'club_id': claims['club'],
+        'sub_club_id': claims['sub_club'],
+        'is_staff': claims['is_staff'],
+        'is_superuser': claims['is_superuser'],
+        'is_active': claims['is_active'],
+    }
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    user = User.from_db(None, names, [values[name] for name in names])
+    user._from_token = True
+    return user
+
+
+class IndexedRefreshToken(RefreshToken):
+    """
+    RefreshToken whose blacklist check reads the Redis index, falling back
+    to the BlacklistedToken table when the index cannot tell.
+    """
+    def check_blacklist(self):
+        listed = blacklist.contains(self.payload[api_settings.JTI_CLAIM])
+        if listed is None:
+            return super().check_blacklist()
+        if listed:
+            raise TokenError(_("Token is blacklisted"))
@@ -4,16 +4,18 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.throttling import ScopedRateThrottle
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from django.contrib.auth.tokens import default_token_generator
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
+from django.utils.http import urlsafe_base64_decode
+from django.utils.encoding import force_str
 from django.utils.decorators import method_decorator
 from django_ratelimit.decorators import ratelimit
+from notifications.models import OutboxEmail
+from notifications.outbox import enqueue
+from .emails import PASSWORD_RESET_SUBJECT
 from .models import User
+from .tokens import IndexedRefreshToken
 from .serializers import (
     SignupSerializer, UserSerializer, UserSettingsSerializer,
     ChangePasswordSerializer, AdminUserUpdateSerializer,
@@ -225,23 +227,12 @@ class PasswordResetRequestView(APIView):
             # Return success to prevent email enumeration
             return Response({"detail": "If an account with this email exists, a password reset link has been sent."}, status=status.HTTP_200_OK)
             
-        token = default_token_generator.make_token(user)
-        uid = urlsafe_base64_encode(force_bytes(user.pk))
-        
-        frontend_url = settings.FRONTEND_URL
-        reset_link = f"{frontend_url}/reset-password/{uid}/{token}/"
-        
-        try:
-            send_mail(
-                subject='CEAL-Calendar Password Reset',
-                message=f'Click the following link to reset your password: {reset_link}\n\nThis link will expire in 15 minutes.',
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
-            logger.info("Password reset email sent to %s", user.email)
-        except Exception as e:
-            logger.error("Failed to send password reset email to %s: %s", user.email, str(e))
+        # Queued in the email outbox: the request never waits on SMTP. Only
+        # the user is stored; the link is generated when the row is sent
+        enqueue([OutboxEmail(
+            kind='password_reset', user=user, to_email=user.email, subject=PASSWORD_RESET_SUBJECT,
+        )])
+        logger.info("Password reset email queued for %s", user.email)
             
         return Response({"detail": "If an account with this email exists, a password reset link has been sent."}, status=status.HTTP_200_OK)
 
@@ -283,7 +274,7 @@ class LogoutView(APIView):
         try:
             refresh_token = request.COOKIES.get('refresh_token')
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = IndexedRefreshToken(refresh_token)
                 token.blacklist()
             
             response = Response({"message": "Logout successful."}, status=status.HTTP_200_OK)
@@ -19,9 +19,31 @@ app.autodiscover_tasks()
 
 # Celery Beat Schedule
 app.conf.beat_schedule = {
-    'run-notifications-every-minute': {
+    # Digests are dispatched by the Redis schedule loop (run_notification_scheduler);
+    # this sweep only catches users the schedule missed
+    'sweep-notifications-every-15-minutes': {
         'task': 'notifications.tasks.dispatch_notifications',
-        'schedule': crontab(minute='*'),  # Every minute
+        'schedule': crontab(minute='*/15'),
+    },
+    'send-email-outbox-every-minute': {
+        'task': 'notifications.tasks.send_outbox',
+        'schedule': crontab(minute='*'),  # Retries; new rows trigger it directly
+    },
+    'prune-email-outbox-daily': {
+        'task': 'notifications.tasks.prune_outbox',
+        'schedule': crontab(hour=3, minute=45),
+    },
+    'prune-event-tombstones-daily': {
+        'task': 'events.tasks.prune_event_tombstones',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'prune-event-exports-hourly': {
+        'task': 'events.tasks.prune_event_exports',
+        'schedule': crontab(minute=15),
+    },
+    'prune-jwt-tokens-hourly': {
+        'task': 'accounts.tasks.prune_tokens',
+        'schedule': crontab(minute=40),
     },
 }
 
@@ -162,8 +162,18 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': True,
+    # Embed club membership in access tokens (accounts/tokens.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.MembershipTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.MembershipTokenRefreshSerializer',
 }
 
+# Redis index of blacklisted refresh tokens (accounts/blacklist.py); expired
+# tokens are deleted hourly in batches by accounts.tasks.prune_tokens
+TOKEN_BLACKLIST_REDIS_URL = os.getenv(
+    'TOKEN_BLACKLIST_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6380/0')
+)
+TOKEN_PRUNE_BATCH_SIZE = int(os.getenv('TOKEN_PRUNE_BATCH_SIZE', '1000'))
+
 # CORS
 CORS_ALLOWED_ORIGINS = os.getenv(
     'CORS_ALLOWED_ORIGINS', 
@@ -181,6 +191,37 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@cealcalendar.com')
 
+# Digest emails (notifications/mailer.py) reuse one SMTP connection per batch
+NOTIFICATION_EMAIL_BATCH_SIZE = int(os.getenv('NOTIFICATION_EMAIL_BATCH_SIZE', '100'))
+NOTIFICATION_EMAIL_MAX_RECONNECTS = int(os.getenv('NOTIFICATION_EMAIL_MAX_RECONNECTS', '3'))
+
+# dispatch_notifications fans due users out in chunks of this many per
+# subtask; claimed users are not picked up again for the lease period
+NOTIFICATION_DISPATCH_CHUNK_SIZE = int(os.getenv('NOTIFICATION_DISPATCH_CHUNK_SIZE', '200'))
+NOTIFICATION_CLAIM_LEASE_SECONDS = 600
+NOTIFICATION_DISPATCH_LOCK_SECONDS = 300
+
+# Redis sorted-set digest schedule (notifications/scheduler.py)
+NOTIFICATION_SCHEDULER_REDIS_URL = os.getenv(
+    'NOTIFICATION_SCHEDULER_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6380/0')
+)
+NOTIFICATION_SCHEDULER_BATCH_SIZE = 1000
+NOTIFICATION_SCHEDULER_MAX_SLEEP_SECONDS = 60
+
+# Email outbox (notifications/outbox.py), drained by the `email` queue worker
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.getenv('NOTIFICATION_OUTBOX_BATCH_SIZE', '500'))
+NOTIFICATION_OUTBOX_RATE_PER_SECOND = float(os.getenv('NOTIFICATION_OUTBOX_RATE_PER_SECOND', '20'))
+NOTIFICATION_OUTBOX_BURST = int(os.getenv('NOTIFICATION_OUTBOX_BURST', '50'))
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 5
+NOTIFICATION_OUTBOX_LEASE_SECONDS = 300
+NOTIFICATION_OUTBOX_TIME_LIMIT_SECONDS = 50
+NOTIFICATION_OUTBOX_RETENTION_DAYS = 7
+
+# Urgent-change emails (notifications/urgent.py): events starting within the
+# horizon notify opted-in members at once, edits coalesced per debounce window
+NOTIFICATION_URGENT_HORIZON_HOURS = int(os.getenv('NOTIFICATION_URGENT_HORIZON_HOURS', '6'))
+NOTIFICATION_URGENT_DEBOUNCE_SECONDS = int(os.getenv('NOTIFICATION_URGENT_DEBOUNCE_SECONDS', '120'))
+
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6380/0')
 CELERY_RESULT_BACKEND = os.getenv('REDIS_URL', 'redis://localhost:6380/0')
@@ -190,6 +231,63 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 CELERY_TASK_ACKS_LATE = True  # Ensure tasks are re-queued if worker crashes
 CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_TASK_ROUTES = {
+    # SMTP delivery runs on its own worker so slow mail never delays other tasks
+    'notifications.tasks.send_outbox': {'queue': 'email'},
+}
+
+# Cache: Redis when REDIS_CACHE_URL is set (shares the instance with Celery;
+# entries carry a TTL so Redis' volatile-lru policy can evict them without
+# touching broker keys). Without it, e.g. in tests, a per-process local-memory
+# cache, so nothing depends on a Redis server being up.
+REDIS_CACHE_URL = os.getenv('REDIS_CACHE_URL')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'KEY_PREFIX': 'ceal',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+
+# Event range response cache (see events/cache.py)
+EVENTS_RESPONSE_CACHE = {
+    'ENABLED': os.getenv('EVENTS_RESPONSE_CACHE_ENABLED', 'True') == 'True',
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.getenv('EVENTS_RESPONSE_CACHE_TIMEOUT', '120')),  # seconds
+}
+
+# Delta sync (GET /api/events/changes/)
+EVENT_TOMBSTONE_RETENTION_DAYS = int(os.getenv('EVENT_TOMBSTONE_RETENTION_DAYS', '30'))
+EVENT_SYNC_OVERLAP_SECONDS = 5
+
+# Room double-booking (events/conflicts.py)
+EVENT_ENFORCE_LOCATION_CONFLICTS = os.getenv('EVENT_ENFORCE_LOCATION_CONFLICTS', 'False') == 'True'
+EVENT_LOCATION_CONFLICT_EXEMPT = {'online', 'virtual', 'tba', 'tbd'}  # normalized keys
+EVENT_CONFLICT_CHECK_MAX_SLOTS = 200
+
+# Bulk create/update/delete (POST /api/events/bulk/)
+EVENT_BULK_MAX_OPERATIONS = int(os.getenv('EVENT_BULK_MAX_OPERATIONS', '200'))
+
+# Recurring events are expanded in this wall-clock timezone (see events/recurrence.py)
+EVENT_RECURRENCE_TIMEZONE = os.getenv('EVENT_RECURRENCE_TIMEZONE', 'Asia/Kolkata')
+
+# iCalendar feeds (GET /api/events/ics/) include events that ended up to this many days ago
+EVENT_ICS_PAST_DAYS = int(os.getenv('EVENT_ICS_PAST_DAYS', '90'))
+
+# CSV/PDF exports (GET /api/events/export/): ranges with more stored events than
+# this are generated by a Celery job into EVENT_EXPORT_ROOT instead of streamed
+EVENT_EXPORT_MAX_SYNC_ROWS = int(os.getenv('EVENT_EXPORT_MAX_SYNC_ROWS', '5000'))
+EVENT_EXPORT_ROOT = os.getenv('EVENT_EXPORT_ROOT', str(BASE_DIR / 'exports'))
+EVENT_EXPORT_RETENTION_HOURS = 24
 
 # Frontend URL
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3100')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Club
+from .models import Club, ClubSubscription
 
 
 @admin.register(Club)
@@ -7,3 +7,11 @@ class ClubAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug', 'color', 'created_at']
     prepopulated_fields = {'slug': ('name',)}
     search_fields = ['name', 'slug']
+
+
+@admin.register(ClubSubscription)
+class ClubSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'club', 'include_sub_clubs', 'created_at']
+    list_filter = ['club', 'include_sub_clubs']
+    search_fields = ['user__email', 'club__name']
+    raw_id_fields = ['user']
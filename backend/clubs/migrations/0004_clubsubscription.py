@@ -0,0 +1,34 @@
+# Generated by Django 5.0 on 2026-10-18 07:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0003_club_order'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClubSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('include_sub_clubs', models.BooleanField(default=True, help_text="Also follow the club's sub-clubs")),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('club', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to='clubs.club')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='club_subscriptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['club__name'],
+                'indexes': [models.Index(fields=['club', 'user'], name='club_subscription_club_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='clubsubscription',
+            constraint=models.UniqueConstraint(fields=('user', 'club'), name='unique_club_subscription'),
+        ),
+    ]
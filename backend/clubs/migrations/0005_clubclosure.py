@@ -0,0 +1,51 @@
+# Generated by Django 5.0 on 2026-10-18 07:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def closure_rows(parents, model):
+    # Frozen copy of clubs.models.closure_rows as of this migration
+    parent_of = dict(parents)
+    rows = []
+    for club_id in parent_of:
+        ancestor_id, depth = club_id, 0
+        while ancestor_id is not None and depth <= len(parent_of):
+            rows.append(model(ancestor_id=ancestor_id, descendant_id=club_id, depth=depth))
+            ancestor_id, depth = parent_of.get(ancestor_id), depth + 1
+    return rows
+
+
+def build_closure(apps, schema_editor):
+    Club = apps.get_model('clubs', 'Club')
+    ClubClosure = apps.get_model('clubs', 'ClubClosure')
+    ClubClosure.objects.bulk_create(
+        closure_rows(Club.objects.values_list('id', 'parent_id'), ClubClosure), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0004_clubsubscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClubClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='clubs.club')),
+                ('descendant', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='clubs.club')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'ancestor'], name='club_closure_descendant_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='clubclosure',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_club_closure'),
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
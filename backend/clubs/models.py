@@ -1,4 +1,6 @@
-from django.db import models
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 
 
 class Club(models.Model):
@@ -19,3 +21,154 @@ class Club(models.Model):
     
     def __str__(self):
         return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_parent_id = instance.parent_id
+        return instance
+
+    def clean(self):
+        super().clean()
+        # A club cannot move under itself or anything below it
+        if self.parent_id is not None and not self._state.adding and (
+                self.parent_id == self.pk or self.parent.is_within(self.pk)):
+            raise ValidationError({'parent': "A club cannot be placed under itself or one of its sub-clubs."})
+
+    def save(self, *args, **kwargs):
+        """Save the club and keep its ClubClosure rows in step with `parent`."""
+        created = self._state.adding
+        moved = not created and self.parent_id != getattr(self, '_loaded_parent_id', object())
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if created:
+                ClubClosure.objects.add_club(self)
+            elif moved:
+                ClubClosure.objects.move_club(self)
+        self._loaded_parent_id = self.parent_id
+
+    def is_within(self, ancestor_id):
+        """Whether this club is `ancestor_id` or lies anywhere below it."""
+        return ClubClosure.objects.filter(ancestor_id=ancestor_id, descendant_id=self.pk).exists()
+
+
+class ClubClosureManager(models.Manager):
+    def add_club(self, club):
+        """Link a new club to itself and to every ancestor of its parent."""
+        rows = [ClubClosure(ancestor_id=club.pk, descendant_id=club.pk, depth=0)]
+        if club.parent_id is not None:
+            rows += [
+                ClubClosure(ancestor_id=ancestor_id, descendant_id=club.pk, depth=depth + 1)
+                for ancestor_id, depth in self.filter(descendant_id=club.parent_id).values_list('ancestor_id', 'depth')
+            ]
+        self.bulk_create(rows)
+
+    def move_club(self, club):
+        """Re-link a club's subtree under its (new) parent."""
+        subtree = list(self.filter(ancestor_id=club.pk).values_list('descendant_id', 'depth'))
+        if not subtree:
+            # Created without save() (bulk_create); start from the club alone
+            self.create(ancestor_id=club.pk, descendant_id=club.pk, depth=0)
+            subtree = [(club.pk, 0)]
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+        self.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+        if club.parent_id is not None:
+            ancestors = self.filter(descendant_id=club.parent_id).values_list('ancestor_id', 'depth')
+            self.bulk_create([
+                ClubClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=up + down + 1)
+                for ancestor_id, up in ancestors
+                for descendant_id, down in subtree
+            ])
+
+    def rebuild(self):
+        """Recompute every row from Club.parent (after bulk_create/update of clubs)."""
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(closure_rows(Club.objects.values_list('id', 'parent_id')), batch_size=1000)
+            # The cached tree was built from the old rows; let clients refetch
+            from . import tree
+            transaction.on_commit(tree.bump_version)
+
+    def descendant_ids(self, ancestor_ids):
+        """Subquery of the IDs of these clubs and every club below them."""
+        return self.filter(ancestor_id__in=ancestor_ids).values('descendant_id')
+
+    def ancestor_ids(self, descendant_ids):
+        """Subquery of the IDs of these clubs and every club above them."""
+        return self.filter(descendant_id__in=descendant_ids).values('ancestor_id')
+
+
+def closure_rows(parents, model=None):
+    """
+    ClubClosure rows for (club ID, parent ID) pairs: each club with itself
+    and with every ancestor up the parent chain.
+    """
+    model = model or ClubClosure
+    parent_of = dict(parents)
+    rows = []
+    for club_id in parent_of:
+        ancestor_id, depth = club_id, 0
+        while ancestor_id is not None and depth <= len(parent_of):
+            rows.append(model(ancestor_id=ancestor_id, descendant_id=club_id, depth=depth))
+            ancestor_id, depth = parent_of.get(ancestor_id), depth + 1
+    return rows
+
+
+class ClubClosure(models.Model):
+    """
+    Transitive closure of the club hierarchy: one row per (ancestor,
+    descendant) pair at any depth, including each club with itself at depth 0.
+
+    "Is X under Y" and "everything under Y" are single index lookups however
+    deep the tree is. Club.save() maintains the rows; deleting a club
+    cascades to its rows (and to its sub-clubs).
+    """
+    # Both lookups are served by the composite indexes below
+    ancestor = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='descendant_links', db_index=False)
+    descendant = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='ancestor_links', db_index=False)
+    depth = models.PositiveSmallIntegerField()
+
+    objects = ClubClosureManager()
+
+    class Meta:
+        constraints = [
+            # Also the index for "everything under this club"
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_club_closure'),
+        ]
+        indexes = [
+            # "Everything above this club"
+            models.Index(fields=['descendant', 'ancestor'], name='club_closure_descendant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} > {self.descendant_id} ({self.depth})"
+
+
+class ClubSubscription(models.Model):
+    """
+    A club whose events a user wants in their notifications.
+
+    Users without any subscription keep receiving every club's events.
+    """
+    # Both lookups are served by the composite indexes below
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='club_subscriptions', db_index=False
+    )
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='subscriptions', db_index=False)
+    include_sub_clubs = models.BooleanField(default=True, help_text="Also follow the club's sub-clubs")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['club__name']
+        constraints = [
+            # Also the index for "which clubs does this user follow" (digests)
+            models.UniqueConstraint(fields=['user', 'club'], name='unique_club_subscription'),
+        ]
+        indexes = [
+            # "Who follows this club" (urgent-change recipients)
+            models.Index(fields=['club', 'user'], name='club_subscription_club_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} follows {self.club}"
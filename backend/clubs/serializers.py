@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Club
+from .models import Club, ClubSubscription
 
 
 class ClubSerializer(serializers.ModelSerializer):
@@ -21,3 +21,30 @@ class ClubSerializer(serializers.ModelSerializer):
             sub_clubs = obj.sub_clubs.all().order_by('order', 'name')
             return ClubSerializer(sub_clubs, many=True).data
         return []
+
+    def validate_parent(self, parent):
+        # A club cannot move under itself or anything below it
+        if parent is not None and self.instance is not None and parent.is_within(self.instance.pk):
+            raise serializers.ValidationError("A club cannot be placed under itself or one of its sub-clubs.")
+        return parent
+
+
+class ClubSubscriptionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the current user's club subscriptions
+    """
+    club_name = serializers.ReadOnlyField(source='club.name')
+
+    class Meta:
+        model = ClubSubscription
+        fields = ['id', 'club', 'club_name', 'include_sub_clubs', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+    def validate_club(self, club):
+        user = self.context['request'].user
+        subscriptions = ClubSubscription.objects.filter(user=user, club=club)
+        if self.instance is not None:
+            subscriptions = subscriptions.exclude(pk=self.instance.pk)
+        if subscriptions.exists():
+            raise serializers.ValidationError("You are already subscribed to this club.")
+        return club
@@ -0,0 +1,16 @@
+"""
+Signal handlers that keep the cached club tree (clubs/tree.py) coherent.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import tree
+from .models import Club
+
+
+@receiver(post_save, sender=Club)
+@receiver(post_delete, sender=Club)
+def invalidate_club_tree(sender, instance, **kwargs):
+    # After commit, so no worker can cache the old tree under the new version
+    transaction.on_commit(tree.bump_version)
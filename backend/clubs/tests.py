@@ -0,0 +1,180 @@
+"""
+Tests for the clubs app: the closure table, the cached club tree, club subscriptions.
+"""
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from clubs import tree
+from clubs.models import Club, ClubClosure, ClubSubscription
+from clubs.serializers import ClubSerializer
+
+
+class ClubClosureTests(TestCase):
+    """Test that the closure table follows the club hierarchy."""
+
+    def setUp(self):
+        self.dept = Club.objects.create(slug='eng', name='Engineering')
+        self.club = Club.objects.create(slug='robotics', name='Robotics', parent=self.dept)
+        self.chapter = Club.objects.create(slug='robotics-drones', name='Drones', parent=self.club)
+        self.other = Club.objects.create(slug='arts', name='Arts')
+
+    def _links(self):
+        return set(ClubClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+
+    def test_rows_cover_every_depth(self):
+        self.assertIn((self.dept.id, self.chapter.id, 2), self._links())
+        self.assertEqual(
+            set(Club.objects.filter(pk__in=ClubClosure.objects.descendant_ids([self.dept.id])).values_list('slug', flat=True)),
+            {'eng', 'robotics', 'robotics-drones'},
+        )
+        with self.assertNumQueries(1):
+            self.assertTrue(self.chapter.is_within(self.dept.id))
+        self.assertFalse(self.dept.is_within(self.chapter.id))
+
+    def test_moving_a_club_moves_its_subtree(self):
+        self.club.parent = self.other
+        self.club.save()
+        self.assertFalse(self.chapter.is_within(self.dept.id))
+        self.assertTrue(self.chapter.is_within(self.other.id))
+        incremental = self._links()
+        ClubClosure.objects.rebuild()
+        self.assertEqual(self._links(), incremental)
+
+    def test_deleting_a_club_drops_its_rows(self):
+        self.club.delete()
+        self.assertEqual(self._links(), {(self.dept.id, self.dept.id, 0), (self.other.id, self.other.id, 0)})
+
+    def test_cannot_move_a_club_under_its_own_subtree(self):
+        admin = User.objects.create_superuser(email='admin@example.com', username='admin', password='Pass123!')
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        url = reverse('club-manage-detail', args=[self.dept.id])
+        response = client.patch(url, {'parent': self.chapter.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = client.patch(url, {'parent': self.other.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.chapter.is_within(self.other.id))
+
+    def test_clean_rejects_a_parent_cycle(self):
+        for parent in (self.dept, self.chapter):
+            self.dept.parent = parent
+            with self.assertRaises(ValidationError) as ctx:
+                self.dept.full_clean()
+            self.assertIn('parent', ctx.exception.message_dict)
+        self.dept.parent = self.other
+        self.dept.full_clean()
+
+
+class ClubTreeTests(TestCase):
+    """Test the cached, single-query club list."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tech = Club.objects.create(slug='tech', name='Tech Society', order=2)
+        self.arts = Club.objects.create(slug='arts', name='Arts Society', order=1)
+        self.web = Club.objects.create(slug='tech-web', name='Web Group', parent=self.tech, order=1)
+        self.ai = Club.objects.create(slug='tech-ai', name='AI Group', parent=self.tech, order=1)
+        self.music = Club.objects.create(slug='arts-music', name='Music', parent=self.arts)
+
+    def test_tree_matches_serializer_in_one_query(self):
+        mains = Club.objects.filter(parent__isnull=True).order_by('order', 'name')
+        expected = json.loads(json.dumps(ClubSerializer(mains, many=True).data))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('club-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['results'], expected)
+        self.assertEqual([sub['name'] for sub in data['results'][1]['sub_clubs']], ['AI Group', 'Web Group'])
+
+        # Served from the process-local copy afterwards
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('club-list')).content, response.content)
+
+    def test_conditional_request_returns_304(self):
+        response = self.client.get(reverse('club-list'))
+        etag = response['ETag']
+        response = self.client.get(reverse('club-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_club_changes_bump_the_version(self):
+        etag = self.client.get(reverse('club-list'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.music.name = 'Music Circle'
+            self.music.save()
+        response = self.client.get(reverse('club-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'Music Circle', response.content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.music.delete()
+        self.assertNotIn(b'Music Circle', self.client.get(reverse('club-list')).content)
+
+    def test_rebuild_bumps_the_version(self):
+        etag = self.client.get(reverse('club-list'))['ETag']
+        self.assertNotIn(self.music.id, tree.expand([self.tech.id]))
+        # update() sends no signals; rebuild() is what callers run afterwards
+        Club.objects.filter(pk=self.music.pk).update(parent=self.tech)
+        with self.captureOnCommitCallbacks(execute=True):
+            ClubClosure.objects.rebuild()
+        response = self.client.get(reverse('club-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(self.music.id, tree.expand([self.tech.id]))
+
+    def test_deeper_levels_are_nested(self):
+        Club.objects.create(slug='tech-ai-ml', name='ML Chapter', parent=self.ai)
+        data = json.loads(self.client.get(reverse('club-list')).content)
+        ai = data['results'][1]['sub_clubs'][0]
+        self.assertEqual([chapter['name'] for chapter in ai['sub_clubs']], ['ML Chapter'])
+        self.assertEqual(ai['sub_clubs'][0]['parent_name'], 'AI Group')
+
+    def test_paged_requests_use_the_serializer(self):
+        response = self.client.get(reverse('club-list'), {'page': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class ClubSubscriptionTests(TestCase):
+    """Test managing the current user's club subscriptions."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.other_club = Club.objects.create(slug='ee', name='EE Club', color='#EF4444')
+        self.user = User.objects.create_user(email='student@example.com', username='student', password='Pass123!')
+        self.other_user = User.objects.create_user(email='other@example.com', username='other', password='Pass123!')
+        self.client.force_authenticate(user=self.user)
+
+    def test_subscribe_and_list(self):
+        response = self.client.post(reverse('club-subscription-list'), {'club': self.club.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['include_sub_clubs'])
+        ClubSubscription.objects.create(user=self.other_user, club=self.other_club)
+
+        response = self.client.get(reverse('club-subscription-list'))
+        self.assertEqual([item['club_name'] for item in response.data['results']], ['CS Club'])
+
+    def test_duplicate_subscription_rejected(self):
+        ClubSubscription.objects.create(user=self.user, club=self.club)
+        response = self.client.post(reverse('club-subscription-list'), {'club': self.club.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cannot_touch_other_users_subscriptions(self):
+        subscription = ClubSubscription.objects.create(user=self.other_user, club=self.club)
+        response = self.client.delete(reverse('club-subscription-detail', args=[subscription.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(ClubSubscription.objects.filter(pk=subscription.pk).exists())
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse('club-subscription-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,134 @@
+"""
+Cached club tree served by ClubListView.
+
+The tree is built from a single Club query, assembled in memory and
+serialized to JSON once. The bytes are kept in two layers, both keyed by a
+version counter in the shared cache:
+
+- a process-local copy, so a request whose version is current costs one
+  cache read and no serialization;
+- the shared Django cache, so the other workers do not rebuild it.
+
+The map of every club's descendants, used to expand hierarchical event
+filters, is cached the same way.
+
+Club save/delete signals bump the version (clubs/signals.py); payloads of
+old versions are never read again and age out of the shared cache.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.utils.http import quote_etag
+
+from .models import Club, ClubClosure
+
+VERSION_KEY = 'clubs:tree:version'
+PAYLOAD_TIMEOUT = 24 * 60 * 60
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+def _payload_key(name, version):
+    return f'clubs:tree:{name}:{version}'
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seeded from the clock so an evicted counter never reuses a version
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Invalidate the cached tree in every process."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def _club_data(club, parent=None, sub_clubs=()):
+    # Same shape as ClubSerializer, which leaves parent_name out of main clubs
+    data = {
+        'id': club.pk,
+        'slug': club.slug,
+        'name': club.name,
+        'color': club.color,
+        'parent': club.parent_id,
+    }
+    if parent is not None:
+        data['parent_name'] = parent.name
+    data['order'] = club.order
+    data['sub_clubs'] = list(sub_clubs)
+    return data
+
+
+def build_tree():
+    """Main clubs with their sub-clubs nested at any depth, ordered by (order, name)."""
+    clubs = list(Club.objects.order_by('order', 'name'))
+    children = defaultdict(list)
+    for club in clubs:
+        if club.parent_id is not None:
+            children[club.parent_id].append(club)
+
+    def subtree(club, parent=None):
+        return _club_data(club, parent, (subtree(sub, club) for sub in children[club.pk]))
+
+    return [subtree(club) for club in clubs if club.parent_id is None]
+
+
+def _cached(name, build):
+    version = get_version()
+    with _local_lock:
+        local = _local.get(name)
+    if local is not None and local[0] == version:
+        return local[1]
+
+    value = cache.get(_payload_key(name, version))
+    if value is None:
+        value = build()
+        cache.set(_payload_key(name, version), value, timeout=PAYLOAD_TIMEOUT)
+
+    with _local_lock:
+        _local[name] = (version, value)
+    return value
+
+
+def _build_payload():
+    results = build_tree()
+    body = json.dumps(
+        {'count': len(results), 'next': None, 'previous': None, 'results': results},
+        separators=(',', ':'),
+    ).encode()
+    return quote_etag(hashlib.sha1(body).hexdigest()), body
+
+
+def get_payload():
+    """
+    The club list response: (quoted ETag, JSON bytes), in the same
+    paginated envelope as the rest of the API (the whole tree is one page).
+    """
+    return _cached('payload', _build_payload)
+
+
+def _build_descendants():
+    descendants = defaultdict(set)
+    for ancestor_id, descendant_id in ClubClosure.objects.values_list('ancestor_id', 'descendant_id'):
+        descendants[ancestor_id].add(descendant_id)
+    return {club_id: frozenset(ids) for club_id, ids in descendants.items()}
+
+
+def expand(club_ids):
+    """The given clubs and every club below them, without a query while cached."""
+    descendants = _cached('descendants', _build_descendants)
+    expanded = set()
+    for club_id in club_ids:
+        expanded |= descendants.get(club_id, {club_id})
+    return expanded
@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ClubListView, ClubManagementViewSet
+from .views import ClubListView, ClubManagementViewSet, ClubSubscriptionViewSet
 
 router = DefaultRouter()
 router.register('manage', ClubManagementViewSet, basename='club-manage')
+router.register('subscriptions', ClubSubscriptionViewSet, basename='club-subscription')
 
 urlpatterns = [
     path('', ClubListView.as_view(), name='club-list'),
@@ -1,6 +1,9 @@
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
 from rest_framework import generics, permissions, viewsets
-from .models import Club
-from .serializers import ClubSerializer
+from . import tree as club_tree
+from .models import Club, ClubSubscription
+from .serializers import ClubSerializer, ClubSubscriptionSerializer
 
 
 class ClubListView(generics.ListAPIView):
@@ -14,6 +17,23 @@ class ClubListView(generics.ListAPIView):
         # Only return main clubs (no parent) and order by the new order field
         return Club.objects.filter(parent__isnull=True).order_by('order', 'name')
 
+    def list(self, request, *args, **kwargs):
+        """
+        Serve the cached club tree (see clubs/tree.py), answering
+        If-None-Match with 304. Paged requests and the browsable API go
+        through the serializer.
+        """
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+
+        etag, body = club_tree.get_payload()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
 
 class ClubManagementViewSet(viewsets.ModelViewSet):
     """
@@ -26,3 +46,18 @@ class ClubManagementViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         # Super admin only
         serializer.save()
+
+
+class ClubSubscriptionViewSet(viewsets.ModelViewSet):
+    """
+    The current user's club subscriptions. Notifications only include events
+    of subscribed clubs; with no subscriptions every club is included.
+    """
+    serializer_class = ClubSubscriptionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ClubSubscription.objects.filter(user=self.request.user).select_related('club')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
@@ -0,0 +1,106 @@
+"""
+Per-request resolution of which clubs' events a user may manage.
+
+The event permission classes and the EventViewSet write hooks all need the
+same answer. ClubAccess computes it lazily in one query and is memoized on
+the request, so a write costs at most one access query however many checks
+consult it.
+"""
+from django.db.models import BooleanField, Value
+from django.utils.functional import cached_property
+
+from clubs.models import Club, ClubClosure
+
+
+class ClubAccess:
+    """
+    The clubs whose events a user may create, edit and delete:
+    - superusers: every club;
+    - extra clubs, always;
+    - sub-club role: the assigned sub-club and anything below it;
+    - main-club role: the main club and every club below it.
+
+    The subtree comes from ClubClosure, so deeper hierarchies cost the same
+    single query as flat ones.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.is_superuser = bool(getattr(user, 'is_superuser', False))
+
+    @cached_property
+    def _resolved(self):
+        """(writable club IDs, extra club IDs ordered by name), in one query."""
+        user = self.user
+        if self.is_superuser or not getattr(user, 'is_authenticated', False):
+            return frozenset(), []
+
+        rows = Club.objects.filter(extra_members=user).values_list(
+            'id', 'name', Value(True, output_field=BooleanField()),
+        ).order_by()
+        role_club_id = user.sub_club_id if user.sub_club_id is not None else user.club_id
+        if role_club_id is not None:
+            subtree = ClubClosure.objects.filter(ancestor_id=role_club_id).values_list(
+                'descendant_id', Value(''), Value(False, output_field=BooleanField()),
+            ).order_by()
+            rows = rows.union(subtree, all=True)
+
+        writable = set()
+        extras = []
+        for club_id, name, is_extra in rows:
+            writable.add(club_id)
+            if is_extra:
+                extras.append((name, club_id))
+
+        # The role club itself, even if its closure rows are missing
+        if role_club_id is not None:
+            writable.add(role_club_id)
+        # Same order as user.extra_clubs (Club.Meta.ordering is by name)
+        return frozenset(writable), [club_id for _, club_id in sorted(extras)]
+
+    @property
+    def writable_club_ids(self):
+        return self._resolved[0]
+
+    @property
+    def extra_club_ids(self):
+        return self._resolved[1]
+
+    @classmethod
+    def for_request(cls, request):
+        """The ClubAccess of request.user, computed once per request."""
+        access = getattr(request, '_club_access', None)
+        if access is None or access.user is not request.user:
+            access = cls(request.user)
+            request._club_access = access
+        return access
+
+    @property
+    def has_any_club(self):
+        """Whether the user has any club role at all (may create events)."""
+        if self.is_superuser:
+            return True
+        user = self.user
+        # Only resolve the club set when the user has no direct role
+        return bool(user.club_id or user.sub_club_id or self.extra_club_ids)
+
+    def can_write(self, club_id):
+        return self.is_superuser or club_id in self.writable_club_ids
+
+    def default_club_id(self):
+        """Club a new event is filed under when no club_id is given."""
+        if self.is_superuser:
+            return None
+        if self.user.sub_club_id is not None:
+            return self.user.sub_club_id
+        if self.user.club_id is not None:
+            return self.user.club_id
+        return self.extra_club_ids[0] if self.extra_club_ids else None
+
+    def denial_message(self, verb):
+        """PermissionDenied message for a write outside the writable set."""
+        if not self.has_any_club:
+            return f"You must be a member of a club to {verb} events."
+        if self.user.club_id is not None and self.user.sub_club_id is None:
+            return f"You can only {verb} events for your club and its sub-clubs."
+        return f"You can only {verb} events for your assigned clubs."
@@ -0,0 +1,274 @@
+"""
+Bulk create/update/delete of events (POST /api/events/bulk/).
+
+A semester import used to cost several queries per event: each
+perform_create/perform_update re-read the user's extra clubs and the target
+Club rows, and each serializer re-checked its collaborating clubs. Here the
+user's ClubAccess, every referenced club and every referenced event
+are resolved once, all operations are validated in memory, and the batch is
+applied in one transaction with bulk_create/bulk_update and a single insert
+into the collaborators through table.
+
+The batch is all-or-nothing: if any operation is invalid nothing is written
+and every item reports whether it was valid.
+
+bulk_create/bulk_update bypass Event.save() and its signals, so derived
+fields are refreshed and cache generations bumped here. Deletions go through
+QuerySet.delete(), which still sends the signals that write tombstones.
+Created and rescheduled events open urgent-change windows like the
+single-event endpoints do.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from clubs.models import Club
+from notifications import urgent
+from . import cache as response_cache
+from .access import ClubAccess
+from .conflicts import check_slots, lock_rooms
+from .models import Event
+from .serializers import EventCreateSerializer, EventSerializer
+
+OPERATIONS = ('create', 'update', 'delete')
+UPDATABLE_FIELDS = ('title', 'description', 'start', 'end', 'location', 'recurrence_rule')
+
+
+class BulkOperationSerializer(serializers.Serializer):
+    """
+    Envelope of one bulk operation; `data` is validated per operation type.
+    """
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.UUIDField(required=False)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs['op'] != 'create' and not attrs.get('id'):
+            raise serializers.ValidationError({"id": "This field is required for update and delete."})
+        return attrs
+
+
+class BulkRequestSerializer(serializers.Serializer):
+    operations = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_operations(self, operations):
+        if len(operations) > settings.EVENT_BULK_MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f"At most {settings.EVENT_BULK_MAX_OPERATIONS} operations can be applied at once."
+            )
+        return operations
+
+
+class BulkEventProcessor:
+    """
+    Validates and applies a list of bulk operations for one user.
+
+    Usage:
+        processor = BulkEventProcessor(user, operations, access=ClubAccess.for_request(request))
+        with transaction.atomic():
+            if processor.validate():
+                processor.apply()
+        processor.results  # one dict per operation, in input order
+    """
+
+    def __init__(self, user, operations, access=None):
+        self.user = user
+        self.access = access or ClubAccess(user)
+        self.operations = operations
+        self.results = [{'index': i, 'op': (op or {}).get('op')} for i, op in enumerate(operations)]
+        self._creates = []   # (index, Event, collaborator IDs)
+        self._updates = []   # (index, Event, collaborator IDs or None, changed fields)
+        self._deletes = []   # (index, event ID)
+        self._previous = {}  # event ID: (start, end) before the update
+
+    def _fail(self, index, errors):
+        self.results[index]['status'] = 'error'
+        self.results[index]['errors'] = errors
+
+    def _resolve(self, envelopes):
+        """Load every club and event the batch refers to, in one query each."""
+        club_ids = set()
+        event_ids = set()
+        for envelope in envelopes:
+            if envelope is None:
+                continue
+            data = envelope['data']
+            if isinstance(data.get('club_id'), int):
+                club_ids.add(data['club_id'])
+            club_ids.update(cid for cid in data.get('collaborating_club_ids') or [] if isinstance(cid, int))
+            if envelope.get('id'):
+                event_ids.add(envelope['id'])
+
+        self.existing_club_ids = set(Club.objects.filter(pk__in=club_ids).values_list('id', flat=True))
+        self.events = Event.objects.in_bulk(event_ids)
+
+    def validate(self):
+        envelopes = []
+        for i, raw in enumerate(self.operations):
+            envelope = BulkOperationSerializer(data=raw)
+            if envelope.is_valid():
+                envelopes.append(envelope.validated_data)
+            else:
+                envelopes.append(None)
+                self._fail(i, envelope.errors)
+
+        self._resolve(envelopes)
+        context = {'existing_club_ids': self.existing_club_ids}
+        seen_events = set()
+
+        for i, envelope in enumerate(envelopes):
+            if envelope is None:
+                continue
+            op = envelope['op']
+
+            if op == 'create':
+                self._validate_create(i, envelope['data'], context)
+                continue
+
+            event = self.events.get(envelope['id'])
+            if event is None:
+                self._fail(i, {"id": "Event not found."})
+            elif not self.access.can_write(event.club_id):
+                self._fail(i, {"detail": self.access.denial_message('change')})
+            elif event.pk in seen_events:
+                self._fail(i, {"id": "Event appears in more than one operation."})
+            elif op == 'delete':
+                seen_events.add(event.pk)
+                self._deletes.append((i, event.pk))
+            else:
+                seen_events.add(event.pk)
+                self._validate_update(i, event, envelope['data'], context)
+
+        if settings.EVENT_ENFORCE_LOCATION_CONFLICTS:
+            self._check_conflicts()
+
+        for result in self.results:
+            result.setdefault('status', 'valid')
+        return all(result['status'] == 'valid' for result in self.results)
+
+    def _validate_create(self, index, data, context):
+        serializer = EventCreateSerializer(data=data, context=context)
+        if not serializer.is_valid():
+            self._fail(index, serializer.errors)
+            return
+        fields = dict(serializer.validated_data)
+        club_id = fields.pop('club_id', None)
+        collaborator_ids = fields.pop('collaborating_club_ids', [])
+
+        if club_id is None:
+            if self.access.is_superuser:
+                self._fail(index, {"club_id": "Superusers must specify a club_id when creating events."})
+                return
+            club_id = self.access.default_club_id()
+            if club_id is None:
+                self._fail(index, {"detail": "You must be a member of a club to create events."})
+                return
+        elif club_id not in self.existing_club_ids:
+            self._fail(index, {"club_id": "Invalid club_id."})
+            return
+        elif not self.access.can_write(club_id):
+            self._fail(index, {"club_id": self.access.denial_message('create')})
+            return
+
+        event = Event(**fields, club_id=club_id, created_by=self.user)
+        self._creates.append((index, event, collaborator_ids))
+
+    def _validate_update(self, index, event, data, context):
+        serializer = EventSerializer(event, data=data, partial=True, context=context)
+        if not serializer.is_valid():
+            self._fail(index, serializer.errors)
+            return
+        fields = dict(serializer.validated_data)
+        # Partial validation skips defaults, so this is None unless it was sent
+        collaborator_ids = fields.pop('collaborating_club_ids', None)
+        changed = [name for name in UPDATABLE_FIELDS if name in fields]
+        previous = (event.start, event.end)
+        for name in changed:
+            setattr(event, name, fields[name])
+        if event.end <= event.start:
+            self._fail(index, {"end": "End time must be after start time."})
+            return
+        self._previous[event.pk] = previous
+        self._updates.append((index, event, collaborator_ids, changed))
+
+    def _check_conflicts(self):
+        """
+        Room double-booking across the whole batch, in one query. Run
+        validate() and apply() in one transaction to keep the rooms locked
+        until the batch is written.
+        """
+        pending = [(i, event) for i, event, *_ in self._creates + self._updates]
+        if not pending:
+            return
+        deleted_ids = {pk for _, pk in self._deletes}
+        slots = [
+            {'location': event.location, 'start': event.start, 'end': event.end,
+             'exclude': event.pk if event.pk in self.events else None}
+            for _, event in pending
+        ]
+        # Held until the caller's transaction ends; see conflicts.lock_rooms
+        lock_rooms(slot['location'] for slot in slots)
+        for (index, event), result in zip(pending, check_slots(slots)):
+            clashes = [row for row in result['conflicts'] if row['id'] not in deleted_ids]
+            if clashes:
+                clash = clashes[0]
+                self._fail(index, {"location": f"{event.location} is already booked for '{clash['title']}'."})
+            elif result['internal_conflicts']:
+                other = pending[result['internal_conflicts'][0]][0]
+                self._fail(index, {"location": f"{event.location} is also booked by operation {other}."})
+
+    @transaction.atomic
+    def apply(self):
+        """Write the validated batch. Call only after validate() returned True."""
+        now = timezone.now()
+        touched_clubs = set()
+        through = Event.collaborating_clubs.through
+
+        if self._deletes:
+            Event.objects.filter(pk__in=[pk for _, pk in self._deletes]).delete()
+            for index, pk in self._deletes:
+                self.results[index].update(status='deleted', id=pk)
+
+        new_links = []
+        if self._creates:
+            events = [event for _, event, _ in self._creates]
+            for event in events:
+                event.refresh_derived_fields()
+            Event.objects.bulk_create(events)
+            for index, event, collaborator_ids in self._creates:
+                new_links += [through(event_id=event.pk, club_id=cid) for cid in set(collaborator_ids)]
+                touched_clubs.add(event.club_id)
+                touched_clubs.update(collaborator_ids)
+                self.results[index].update(status='created', id=event.pk)
+                urgent.notify_on_commit(event)
+
+        if self._updates:
+            events = [event for _, event, _, _ in self._updates]
+            fields = {'updated_at', 'location_key', 'recurrence_until'}
+            for _, event, _, changed in self._updates:
+                event.refresh_derived_fields()
+                event.updated_at = now
+                fields.update(changed)
+            Event.objects.bulk_update(events, sorted(fields))
+
+            # Collaborators of updated events: old ones are invalidated too
+            replaced = [event.pk for _, event, ids, _ in self._updates if ids is not None]
+            touched_clubs.update(
+                through.objects.filter(event_id__in=[e.pk for e in events]).values_list('club_id', flat=True)
+            )
+            if replaced:
+                through.objects.filter(event_id__in=replaced).delete()
+            for index, event, collaborator_ids, _ in self._updates:
+                touched_clubs.add(event.club_id)
+                if collaborator_ids is not None:
+                    new_links += [through(event_id=event.pk, club_id=cid) for cid in set(collaborator_ids)]
+                    touched_clubs.update(collaborator_ids)
+                self.results[index].update(status='updated', id=event.pk)
+                urgent.notify_on_commit(event, self._previous[event.pk])
+
+        if new_links:
+            through.objects.bulk_create(new_links)
+
+        if touched_clubs:
+            transaction.on_commit(lambda: response_cache.bump_generations(touched_clubs))
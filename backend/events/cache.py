@@ -0,0 +1,177 @@
+"""
+Response cache for event range queries.
+
+Payloads are keyed on the normalized (start, end, clubs) tuple plus the
+current generation counter of every club involved. Writes never delete
+entries; they bump the generation of the affected clubs so the next read
+computes a fresh key and stale entries simply age out via their TTL.
+
+Everything goes through Django's cache framework, so the Redis backend used
+in production can be swapped for a local-memory cache in tests. The cache is
+only an accelerator: when it fails, errors are logged and requests are served
+from the database.
+"""
+import hashlib
+import json
+import logging
+import time
+
+import redis
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'events'
+ALL_CLUBS_GENERATION = f'{KEY_PREFIX}:gen:all'
+CLUB_METADATA_GENERATION = f'{KEY_PREFIX}:gen:clubs'
+HITS_KEY = f'{KEY_PREFIX}:stats:hits'
+MISSES_KEY = f'{KEY_PREFIX}:stats:misses'
+
+
+def _config():
+    return getattr(settings, 'EVENTS_RESPONSE_CACHE', {})
+
+
+def is_enabled():
+    return _config().get('ENABLED', True)
+
+
+def get_cache():
+    return caches[_config().get('ALIAS', 'default')]
+
+
+def _club_generation_key(club_id):
+    return f'{KEY_PREFIX}:gen:club:{club_id}'
+
+
+def _get_generations(keys):
+    """
+    Read generation counters, seeding any that are missing.
+
+    Missing counters are seeded with a time-based value rather than 0 so a
+    counter evicted by the cache can never collide with an older generation.
+    """
+    cache = get_cache()
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def _incr_generation(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_generations(club_ids):
+    """
+    Invalidate every cached payload that could include events of these clubs.
+    The all-clubs generation is always bumped as well.
+    """
+    if not is_enabled():
+        return
+    try:
+        _incr_generation(ALL_CLUBS_GENERATION)
+        for club_id in set(club_ids):
+            if club_id is not None:
+                _incr_generation(_club_generation_key(club_id))
+    except redis.RedisError as e:
+        logger.error("Could not invalidate cached event ranges: %s", e)
+
+
+def bump_club_metadata():
+    """Invalidate every cached payload after a club's name, color or hierarchy changes."""
+    if not is_enabled():
+        return
+    try:
+        _incr_generation(CLUB_METADATA_GENERATION)
+    except redis.RedisError as e:
+        logger.error("Could not invalidate cached event ranges: %s", e)
+
+
+def build_cache_key(kind, start_dt, end_dt, club_ids, extra=None):
+    """
+    Build a cache key for an event range payload, or None if the cache is
+    unavailable.
+
+    Args:
+        kind: payload flavour (e.g. 'list', 'feed')
+        start_dt, end_dt: aware datetimes of the window, or None
+        club_ids: iterable of club IDs the query is filtered on (empty = all clubs)
+        extra: optional dict of further request attributes (page, host, ...)
+    """
+    club_ids = sorted(set(club_ids or []))
+    generation_keys = [CLUB_METADATA_GENERATION]
+    if club_ids:
+        generation_keys += [_club_generation_key(cid) for cid in club_ids]
+    else:
+        generation_keys.append(ALL_CLUBS_GENERATION)
+
+    try:
+        generations = _get_generations(generation_keys)
+    except redis.RedisError as e:
+        logger.warning("Event response cache unavailable: %s", e)
+        return None
+
+    normalized = {
+        'kind': kind,
+        'start': start_dt.timestamp() if start_dt else None,
+        'end': end_dt.timestamp() if end_dt else None,
+        'clubs': club_ids,
+        'generations': generations,
+        'extra': extra or {},
+    }
+    digest = hashlib.sha1(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+    return f'{KEY_PREFIX}:resp:{kind}:{digest}'
+
+
+def _count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_or_build(cache_key, build):
+    """
+    Return the cached payload for cache_key, or build, store and return it.
+    Records a hit or a miss. Cache errors fall through to build().
+    """
+    cache = get_cache()
+    try:
+        payload = cache.get(cache_key)
+        if payload is not None:
+            _count(HITS_KEY)
+            return payload
+        _count(MISSES_KEY)
+    except redis.RedisError as e:
+        logger.warning("Event response cache unavailable: %s", e)
+        return build()
+
+    payload = build()
+    try:
+        cache.set(cache_key, payload, timeout=_config().get('TIMEOUT', 120))
+    except redis.RedisError as e:
+        logger.warning("Could not cache event range payload: %s", e)
+    return payload
+
+
+def get_stats():
+    """Return hit/miss counters for the event response cache."""
+    counters = get_cache().get_many([HITS_KEY, MISSES_KEY])
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0.0,
+    }
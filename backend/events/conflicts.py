@@ -0,0 +1,187 @@
+"""
+Room double-booking detection on Event.location.
+
+Two events conflict when their normalized location keys are equal and their
+half-open [start, end) spans overlap, so back-to-back bookings are fine. On
+PostgreSQL the check is a `location_key = k AND tstzrange && slot` predicate
+served by the (location_key, tstzrange) GiST index; elsewhere the
+(location_key, start) B-tree narrows the scan to a single room.
+
+Recurring series in the room that may still be running are fetched too and
+expanded (with their exceptions) over each slot, so a booking clashes with
+any occurrence of a series, not only with its first one. So are series booked
+elsewhere with an occurrence moved into the room by an exception.
+
+Checking and writing are not atomic by themselves: writers call
+`lock_rooms()` inside their transaction first, so two bookings of the same
+room are checked and inserted one after the other.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+from .models import Event, EventOccurrenceException, normalize_location, booked_span
+from .recurrence import expand_occurrences
+
+CONFLICT_FIELDS = ('id', 'title', 'club_id', 'location', 'start', 'end')
+
+
+def is_exempt(location_key):
+    """Locations such as 'Online' or 'TBA' never conflict."""
+    return not location_key or location_key in settings.EVENT_LOCATION_CONFLICT_EXEMPT
+
+
+def _slot_q(location_key, start, end, exclude_id=None, use_ranges=False):
+    if use_ranges:
+        from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+        q = Q(location_key=location_key, booked_span__overlap=DateTimeTZRange(start, end, '[)'))
+    else:
+        q = Q(location_key=location_key, start__lt=end, end__gt=start)
+    running = ~Q(recurrence_rule='') & (Q(recurrence_until__isnull=True) | Q(recurrence_until__gte=start))
+    # Series whose later occurrences may fall in the slot
+    q |= Q(location_key=location_key, start__lt=end) & running
+    # Series booked elsewhere with an occurrence moved into the room
+    moved_in = EventOccurrenceException.objects.filter(
+        Q(start__lt=end) | Q(start__isnull=True, original_start__lt=end),
+        Q(end__gt=start) | Q(end__isnull=True),
+        location_key=location_key,
+    )
+    q |= Q(pk__in=moved_in.values('event_id')) & running
+    if exclude_id:
+        q &= ~Q(pk=exclude_id)
+    return q
+
+
+def _base_queryset():
+    queryset = Event.objects.all()
+    use_ranges = connections[queryset.db].vendor == 'postgresql'
+    if use_ranges:
+        queryset = queryset.alias(booked_span=booked_span())
+    return queryset, use_ranges
+
+
+def _lock_id(location_key):
+    digest = hashlib.blake2b(f'events.room:{location_key}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def lock_rooms(locations, using='default'):
+    """
+    Hold a lock on each room until the current transaction ends, so a
+    conflict check and the write it guards cannot interleave with another
+    booking of the same room. Call inside the writing transaction, before
+    checking.
+
+    PostgreSQL transaction-level advisory locks, one per location key, taken
+    in sorted order so two multi-room writers cannot deadlock. Other backends
+    (SQLite in tests) serialize writers already.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    keys = sorted({key for key in map(normalize_location, locations) if not is_exempt(key)})
+    with connection.cursor() as cursor:
+        for key in keys:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [_lock_id(key)])
+
+
+def find_conflicts(location, start, end, exclude_id=None):
+    """
+    Events already booked at `location` whose span overlaps [start, end).
+
+    Args:
+        exclude_id: event being edited, so it does not conflict with itself
+
+    Returns:
+        list of dicts with CONFLICT_FIELDS; for a series, start/end (and any
+        overridden title/location) are those of the clashing occurrence
+    """
+    return check_slots([{'location': location, 'start': start, 'end': end, 'exclude': exclude_id}])[0]['conflicts']
+
+
+def _occurrence_clash(row, exceptions, location_key, start, end):
+    """The first occurrence of series `row` booked in the room during [start, end), as a conflict row."""
+    for occ in expand_occurrences(
+        row['recurrence_rule'], row['start'], row['end'], row['title'], row['location'], start, end, exceptions,
+    ):
+        if occ.start < end and occ.end > start and normalize_location(occ.location) == location_key:
+            return {**row, 'title': occ.title, 'location': occ.location, 'start': occ.start, 'end': occ.end}
+    return None
+
+
+def check_slots(slots):
+    """
+    Check many proposed slots in a single query.
+
+    Args:
+        slots: list of dicts with 'location', 'start', 'end' and optional 'exclude'
+
+    Returns:
+        list of {'index', 'conflicts', 'internal_conflicts'} in input order, where
+        'conflicts' are existing events and 'internal_conflicts' are indices of
+        other proposed slots booked for the same room at the same time.
+    """
+    keyed = [(normalize_location(slot['location']), slot) for slot in slots]
+    results = [{'index': i, 'conflicts': [], 'internal_conflicts': []} for i in range(len(slots))]
+
+    queryset, use_ranges = _base_queryset()
+    combined = Q()
+    for location_key, slot in keyed:
+        if not is_exempt(location_key):
+            combined |= _slot_q(location_key, slot['start'], slot['end'], slot.get('exclude'), use_ranges)
+
+    if combined:
+        rows = list(queryset.filter(combined).values(*CONFLICT_FIELDS, 'location_key', 'recurrence_rule'))
+        # Exceptions only cost a query when a series is among the candidates
+        exceptions = {}
+        series_ids = [row['id'] for row in rows if row['recurrence_rule']]
+        if series_ids:
+            for exc in EventOccurrenceException.objects.filter(event_id__in=series_ids):
+                exceptions.setdefault(exc.event_id, []).append(exc)
+
+        by_room = {}
+        for row in rows:
+            by_room.setdefault(row.pop('location_key'), []).append(row)
+        # Series are also candidates in every room an exception moves one of their occurrences to
+        by_id = {row['id']: row for row in rows}
+        for event_id, overrides in exceptions.items():
+            for exc in overrides:
+                room = by_room.setdefault(exc.location_key, []) if exc.location_key else None
+                if room is not None and by_id[event_id] not in room:
+                    room.append(by_id[event_id])
+        for i, (location_key, slot) in enumerate(keyed):
+            for row in by_room.get(location_key, []):
+                if row['id'] == slot.get('exclude'):
+                    continue
+                if row['recurrence_rule']:
+                    clash = _occurrence_clash(
+                        row, exceptions.get(row['id'], ()), location_key, slot['start'], slot['end'],
+                    )
+                elif row['start'] < slot['end'] and row['end'] > slot['start']:
+                    clash = row
+                else:
+                    clash = None
+                if clash is not None:
+                    clash = dict(clash)
+                    clash.pop('recurrence_rule')
+                    results[i]['conflicts'].append(clash)
+
+    # Overlaps between the proposed slots themselves: sweep each room in start order
+    rooms = {}
+    for i, (location_key, slot) in enumerate(keyed):
+        if not is_exempt(location_key):
+            rooms.setdefault(location_key, []).append(i)
+    for indices in rooms.values():
+        indices.sort(key=lambda i: slots[i]['start'])
+        active = []
+        for i in indices:
+            active = [j for j in active if slots[j]['end'] > slots[i]['start']]
+            for j in active:
+                results[i]['internal_conflicts'].append(j)
+                results[j]['internal_conflicts'].append(i)
+            active.append(i)
+    for result in results:
+        result['internal_conflicts'].sort()
+    return results
@@ -0,0 +1,307 @@
+"""
+Server-side CSV and PDF exports of an event range.
+
+Rows are read with `.values().iterator(chunk_size=...)` and written out as
+they arrive, so memory use stays flat however long the range is:
+
+- one-off events stream in start order, chunk by chunk, with a single
+  collaborator query per chunk;
+- recurring series (few compared to one-off events) are expanded up front
+  and merged into the stream in start order;
+- club names come from one map loaded before the first row.
+
+The PDF is a paginated table written by a minimal PDF 1.4 writer that emits
+each page as soon as it is full, so no PDF library has to hold the whole
+document in memory.
+"""
+import csv
+import heapq
+from collections import defaultdict, namedtuple
+from itertools import islice
+from types import SimpleNamespace
+
+import pytz
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+from clubs.models import Club
+from .models import Event, EventOccurrenceException
+from .recurrence import expand_occurrences
+
+EXPORT_EVENT_FIELDS = ('id', 'title', 'description', 'start', 'end', 'location', 'club_id', 'recurrence_rule')
+EXPORT_EXCEPTION_FIELDS = ('event_id', 'original_start', 'is_cancelled', 'start', 'end', 'title', 'location')
+CSV_HEADER = ('Title', 'Start', 'End', 'Location', 'Main Club', 'Sub Club', 'Collaborating Clubs', 'Description')
+ITERATOR_CHUNK_SIZE = 1000
+
+ExportRow = namedtuple(
+    'ExportRow', ['title', 'start', 'end', 'location', 'main_club', 'sub_club', 'collaborating_clubs', 'description'],
+)
+
+
+def get_export_storage():
+    """Private storage for background export files (not served as media)."""
+    return FileSystemStorage(location=settings.EVENT_EXPORT_ROOT)
+
+
+def export_queryset(start, end, club_ids=None):
+    """Events overlapping [start, end], optionally limited to `club_ids`."""
+    queryset = Event.objects.overlapping(start, end)
+    if club_ids:
+        queryset = queryset.filter(club_id__in=club_ids)
+    return queryset
+
+
+def export_timezone(user):
+    try:
+        return pytz.timezone(user.timezone)
+    except (pytz.UnknownTimeZoneError, AttributeError):
+        return pytz.UTC
+
+
+def _club_labels(club_map, club_id):
+    """(main club, sub club) names, matching the calendar's 'Parent › Sub-club' labels."""
+    name, parent_id = club_map.get(club_id, ('', None))
+    if parent_id is not None:
+        return club_map.get(parent_id, ('', None))[0], name
+    return name, ''
+
+
+def _collaborators(event_ids):
+    collaborators = defaultdict(list)
+    through = Event.collaborating_clubs.through.objects.filter(event_id__in=event_ids)
+    for event_id, club_id in through.values_list('event_id', 'club_id'):
+        collaborators[event_id].append(club_id)
+    return collaborators
+
+
+def _one_off_rows(queryset):
+    """Non-recurring rows in start order, with collaborators attached per chunk."""
+    rows = queryset.filter(recurrence_rule='').order_by('start').values(*EXPORT_EVENT_FIELDS)
+    rows = rows.iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    while True:
+        chunk = list(islice(rows, ITERATOR_CHUNK_SIZE))
+        if not chunk:
+            return
+        collaborators = _collaborators([row['id'] for row in chunk])
+        for row in chunk:
+            row['collaborating_club_ids'] = collaborators.get(row['id'], [])
+            yield row
+
+
+def _occurrence_rows(queryset, window_start, window_end):
+    """Occurrences of the recurring series in the window, sorted by start."""
+    series = list(queryset.exclude(recurrence_rule='').order_by().values(*EXPORT_EVENT_FIELDS))
+    if not series:
+        return []
+    series_ids = [row['id'] for row in series]
+    collaborators = _collaborators(series_ids)
+    exceptions = defaultdict(list)
+    for exc in EventOccurrenceException.objects.filter(event_id__in=series_ids).values(*EXPORT_EXCEPTION_FIELDS):
+        exceptions[exc['event_id']].append(SimpleNamespace(**exc))
+
+    occurrences = []
+    for row in series:
+        for occ in expand_occurrences(
+            row['recurrence_rule'], row['start'], row['end'], row['title'], row['location'],
+            window_start, window_end, exceptions=exceptions.get(row['id'], ()),
+        ):
+            occurrences.append({
+                **row,
+                'title': occ.title,
+                'location': occ.location,
+                'start': occ.start,
+                'end': occ.end,
+                'collaborating_club_ids': collaborators.get(row['id'], []),
+            })
+    occurrences.sort(key=lambda row: row['start'])
+    return occurrences
+
+
+def iter_export_rows(queryset, window_start, window_end):
+    """Yield an ExportRow per event or occurrence in the window, in start order."""
+    club_map = {club_id: (name, parent_id) for club_id, name, parent_id in
+                Club.objects.values_list('id', 'name', 'parent_id')}
+
+    merged = heapq.merge(
+        _one_off_rows(queryset),
+        _occurrence_rows(queryset, window_start, window_end),
+        key=lambda row: row['start'],
+    )
+    for row in merged:
+        main_club, sub_club = _club_labels(club_map, row['club_id'])
+        collaborating = sorted(club_map.get(cid, ('', None))[0] for cid in row['collaborating_club_ids'])
+        yield ExportRow(
+            row['title'], row['start'], row['end'], row['location'],
+            main_club, sub_club, ', '.join(collaborating), row['description'],
+        )
+
+
+# ---------------------------------------------------------------------------
+# CSV
+# ---------------------------------------------------------------------------
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    # Neutralize spreadsheet formulas in user-supplied text
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def iter_csv(rows, tz):
+    """Yield CSV lines (str) for ExportRows, with times in `tz`."""
+    writer = csv.writer(_Echo())
+    # BOM so spreadsheet apps detect UTF-8
+    yield '\ufeff' + writer.writerow(CSV_HEADER)
+    for row in rows:
+        yield writer.writerow([
+            _csv_cell(row.title),
+            row.start.astimezone(tz).isoformat(),
+            row.end.astimezone(tz).isoformat(),
+            _csv_cell(row.location),
+            row.main_club,
+            row.sub_club,
+            row.collaborating_clubs,
+            _csv_cell(row.description),
+        ])
+
+
+# ---------------------------------------------------------------------------
+# PDF
+# ---------------------------------------------------------------------------
+PAGE_WIDTH, PAGE_HEIGHT = 842, 595  # A4 landscape, in points
+MARGIN = 30
+FONT_SIZE = 7
+ROW_HEIGHT = 11
+TABLE_TOP = PAGE_HEIGHT - MARGIN - 34
+ROWS_PER_PAGE = (TABLE_TOP - ROW_HEIGHT - MARGIN - 10) // ROW_HEIGHT
+PDF_COLUMNS = (
+    ('#', 28), ('Event Title', 170), ('Start', 90), ('End', 90), ('Location', 110),
+    ('Main Club', 95), ('Sub Club', 85), ('Collaborating Clubs', 114),
+)
+
+
+def _pdf_text(text, width=None):
+    """Escape (and optionally truncate to a column width) a PDF string literal."""
+    text = ' '.join(str(text or '').split())
+    if width is not None:
+        # Helvetica averages ~0.55 em per character
+        max_chars = int((width - 4) / (FONT_SIZE * 0.55))
+        if len(text) > max_chars:
+            text = text[:max_chars - 3] + '...'
+    text = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return text.encode('cp1252', errors='replace')
+
+
+class _PDFWriter:
+    """Tracks byte offsets of emitted objects for the cross-reference table."""
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+
+    def emit(self, data):
+        self.offset += len(data)
+        return data
+
+    def obj(self, number, body):
+        self.offsets[number] = self.offset
+        return self.emit(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+
+    def stream(self, number, content):
+        return self.obj(number, b'<< /Length %d >>\nstream\n' % len(content) + content + b'\nendstream')
+
+    def xref(self, root):
+        start = self.offset
+        size = max(self.offsets) + 1
+        lines = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        lines += [b'%010d 00000 n \n' % self.offsets[number] for number in range(1, size)]
+        lines.append(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, root, start))
+        return b''.join(lines)
+
+
+def _page_content(title, rows, page_number):
+    ops = [b'BT /F2 12 Tf %d %d Td (%s) Tj ET' % (MARGIN, PAGE_HEIGHT - MARGIN - 12, _pdf_text(title))]
+
+    # Header row
+    y = TABLE_TOP
+    ops.append(b'0.2 0.25 0.33 rg %d %d %d %d re f' % (MARGIN, y - 3, PAGE_WIDTH - 2 * MARGIN, ROW_HEIGHT))
+    ops.append(b'1 g BT /F2 %d Tf' % FONT_SIZE)
+    x = MARGIN
+    for label, width in PDF_COLUMNS:
+        ops.append(b'1 0 0 1 %d %d Tm (%s) Tj' % (x + 2, y, _pdf_text(label)))
+        x += width
+    ops.append(b'ET 0 g')
+
+    for i, cells in enumerate(rows):
+        y -= ROW_HEIGHT
+        if i % 2:
+            ops.append(b'0.95 g %d %d %d %d re f 0 g' % (MARGIN, y - 3, PAGE_WIDTH - 2 * MARGIN, ROW_HEIGHT))
+        ops.append(b'BT /F1 %d Tf' % FONT_SIZE)
+        x = MARGIN
+        for (_, width), cell in zip(PDF_COLUMNS, cells):
+            ops.append(b'1 0 0 1 %d %d Tm (%s) Tj' % (x + 2, y, _pdf_text(cell, width)))
+            x += width
+        ops.append(b'ET')
+
+    if not rows:
+        ops.append(b'BT /F1 9 Tf %d %d Td (No events in this range.) Tj ET' % (MARGIN, TABLE_TOP - 2 * ROW_HEIGHT))
+    ops.append(b'BT /F1 7 Tf %d %d Td (Page %d) Tj ET' % (PAGE_WIDTH - MARGIN - 30, MARGIN - 10, page_number))
+    return b'\n'.join(ops)
+
+
+def iter_pdf(rows, title, tz, time_format='12h'):
+    """
+    Yield a PDF document (bytes) with one table row per ExportRow. Each page
+    is written out as soon as it fills up.
+    """
+    fmt = '%d %b %Y %I:%M %p' if time_format == '12h' else '%d %b %Y %H:%M'
+    pdf = _PDFWriter()
+    yield pdf.emit(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    yield pdf.obj(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    yield pdf.obj(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+    yield pdf.obj(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+
+    kids = []
+    next_number = 5
+
+    def write_page(page_rows):
+        nonlocal next_number
+        content_number, page_number = next_number, next_number + 1
+        next_number += 2
+        kids.append(page_number)
+        return pdf.stream(content_number, _page_content(title, page_rows, len(kids))) + pdf.obj(
+            page_number,
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+            b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>' % (PAGE_WIDTH, PAGE_HEIGHT, content_number),
+        )
+
+    page_rows = []
+    for index, row in enumerate(rows, start=1):
+        page_rows.append((
+            f'#{index}', row.title,
+            row.start.astimezone(tz).strftime(fmt), row.end.astimezone(tz).strftime(fmt),
+            row.location, row.main_club or 'N/A', row.sub_club or '-', row.collaborating_clubs or '-',
+        ))
+        if len(page_rows) == ROWS_PER_PAGE:
+            yield write_page(page_rows)
+            page_rows = []
+    if page_rows or not kids:
+        yield write_page(page_rows)
+
+    yield pdf.obj(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % kid for kid in kids), len(kids),
+    ))
+    yield pdf.xref(root=1)
+
+
+def iter_export(export_format, rows, title, user):
+    """Dispatch to the CSV or PDF writer for `user`'s timezone and time format."""
+    tz = export_timezone(user)
+    if export_format == 'pdf':
+        return iter_pdf(rows, title, tz, getattr(user, 'time_format', '12h'))
+    return iter_csv(rows, tz)
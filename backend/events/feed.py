@@ -0,0 +1,125 @@
+"""
+Compact calendar feed built straight from `.values()` rows.
+
+Instead of embedding a full ClubSerializer blob for every event, each event
+carries plain `club_id` / `collaborating_club_ids` integers and the clubs are
+side-loaded once in a de-duplicated `clubs` map. The whole feed is built in a
+fixed number of queries regardless of how many events are returned.
+"""
+from collections import defaultdict
+from types import SimpleNamespace
+
+from django.db.models import Q
+
+from clubs.models import Club, ClubClosure
+from .models import Event, EventOccurrenceException
+from .recurrence import expand_occurrences
+
+
+FEED_EVENT_FIELDS = (
+    'id', 'title', 'description', 'start', 'end', 'location', 'recurrence_rule',
+    'club_id', 'created_by_id', 'created_at', 'updated_at',
+    'created_by__first_name', 'created_by__last_name', 'created_by__username',
+)
+
+FEED_CLUB_FIELDS = ('id', 'slug', 'name', 'color', 'parent_id', 'order')
+
+EXCEPTION_FIELDS = ('event_id', 'original_start', 'is_cancelled', 'start', 'end', 'title', 'location')
+
+
+def build_event_feed(queryset, window=None):
+    """
+    Build the compact feed payload for an Event queryset.
+
+    Runs exactly three queries: the event rows (joined with the creator),
+    the collaborating-club through rows, and the referenced clubs plus
+    their parents. A fourth query loads occurrence exceptions when the
+    rows include recurring series.
+
+    Args:
+        window: optional (start, end); recurring series are expanded into the
+            occurrences inside it, otherwise they are returned as stored.
+
+    Returns:
+        dict: {"events": [...], "clubs": {club_id: {...}}}
+    """
+    queryset = queryset.select_related(None).prefetch_related(None)
+    rows = list(queryset.values(*FEED_EVENT_FIELDS))
+
+    # Collaborating clubs for the same filtered set, resolved via a subquery
+    # so the event IDs never have to be sent back to the database.
+    collaborators = defaultdict(list)
+    if rows:
+        through = Event.collaborating_clubs.through.objects.filter(
+            event_id__in=queryset.order_by().values('id')
+        )
+        for event_id, club_id in through.values_list('event_id', 'club_id'):
+            collaborators[event_id].append(club_id)
+
+    club_ids = {row['club_id'] for row in rows}
+    for ids in collaborators.values():
+        club_ids.update(ids)
+
+    clubs = {}
+    if club_ids:
+        # Include every ancestor of the referenced clubs so clients can render
+        # "Parent › Sub-club" labels without a second round trip.
+        club_rows = Club.objects.filter(
+            Q(pk__in=club_ids) | Q(pk__in=ClubClosure.objects.ancestor_ids(club_ids))
+        ).values(*FEED_CLUB_FIELDS)
+        for club in club_rows:
+            clubs[club['id']] = {
+                'id': club['id'],
+                'slug': club['slug'],
+                'name': club['name'],
+                'color': club['color'],
+                'parent': club['parent_id'],
+                'order': club['order'],
+            }
+
+    exceptions = defaultdict(list)
+    if window and any(row['recurrence_rule'] for row in rows):
+        exception_rows = EventOccurrenceException.objects.filter(
+            event_id__in=[row['id'] for row in rows if row['recurrence_rule']]
+        ).values(*EXCEPTION_FIELDS)
+        for exc in exception_rows:
+            exceptions[exc['event_id']].append(SimpleNamespace(**exc))
+
+    events = []
+    for row in rows:
+        created_by_name = f"{row['created_by__first_name']} {row['created_by__last_name']}".strip()
+        item = {
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'start': row['start'],
+            'end': row['end'],
+            'location': row['location'],
+            'recurrence_rule': row['recurrence_rule'],
+            'club_id': row['club_id'],
+            'collaborating_club_ids': sorted(collaborators.get(row['id'], [])),
+            'created_by': row['created_by_id'],
+            'created_by_name': created_by_name or row['created_by__username'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+        }
+        if not (window and row['recurrence_rule']):
+            events.append(item)
+            continue
+        occurrences = expand_occurrences(
+            row['recurrence_rule'], row['start'], row['end'], row['title'], row['location'],
+            window[0], window[1], exceptions=exceptions.get(row['id'], ()),
+        )
+        for occ in occurrences:
+            events.append({
+                **item,
+                'title': occ.title,
+                'location': occ.location,
+                'start': occ.start,
+                'end': occ.end,
+                'occurrence_start': occ.original_start,
+            })
+
+    if window:
+        events.sort(key=lambda event: event['start'])
+    return {'events': events, 'clubs': clubs}
@@ -0,0 +1,297 @@
+"""
+iCalendar (RFC 5545) subscription feeds.
+
+Calendar apps poll subscribed feeds aggressively, so feeds are built to be
+cheap to re-check and cheap to render:
+
+- `feed_validators()` derives an ETag / Last-Modified pair from a couple of
+  aggregate queries, so an unchanged feed is answered with a 304 before any
+  VEVENT is rendered.
+- `iter_calendar()` is a generator over `.values().iterator()` rows; events
+  are streamed in chunks and never held in memory all at once. Club names
+  come from a single map loaded up front.
+
+Recurring series are emitted once with their RRULE (the stored subset is
+valid RFC 5545), plus EXDATE lines for cancelled occurrences and a separate
+VEVENT with RECURRENCE-ID for every moved or renamed occurrence. Their times
+are local to EVENT_RECURRENCE_TIMEZONE, described by the feed's VTIMEZONE.
+
+Personal feed tokens carry the user's ics_feed_version; rotating it
+(POST /events/ics-link/) revokes every URL handed out before.
+"""
+import bisect
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+
+import pytz
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from clubs.models import Club, ClubClosure
+from .models import Event, EventOccurrenceException, EventTombstone
+from .recurrence import parse_rule
+
+ICS_TOKEN_SALT = 'events.ics'
+ICS_EVENT_FIELDS = (
+    'id', 'title', 'description', 'start', 'end', 'location', 'club_id',
+    'recurrence_rule', 'created_at', 'updated_at',
+)
+ICS_EXCEPTION_FIELDS = ('event_id', 'original_start', 'is_cancelled', 'start', 'end', 'title', 'location')
+ITERATOR_CHUNK_SIZE = 500
+
+
+def make_user_token(user):
+    """Signed, URL-safe token identifying a user's personal feed."""
+    return signing.dumps([user.pk, user.ics_feed_version], salt=ICS_TOKEN_SALT)
+
+
+def read_user_token(token):
+    """
+    Return (user ID, feed version) for a feed token, or None if it is
+    invalid. The caller checks the version against the user's current one.
+    """
+    try:
+        user_id, version = signing.loads(token, salt=ICS_TOKEN_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        # Forged, or minted before tokens carried a version
+        return None
+    return user_id, version
+
+
+def user_club_ids(user):
+    """
+    Clubs a user's personal feed follows: their club and everything below
+    it, their sub-club and everything below it, and their extra clubs.
+    Empty means every club.
+    """
+    club_ids = set(user.extra_clubs.values_list('id', flat=True))
+    roots = [club_id for club_id in (user.club_id, user.sub_club_id) if club_id]
+    if roots:
+        club_ids.update(roots)
+        club_ids.update(
+            ClubClosure.objects.filter(ancestor_id__in=roots).values_list('descendant_id', flat=True)
+        )
+    return club_ids
+
+
+def feed_queryset(club_ids=None):
+    """
+    Events included in a feed: everything ending within the last
+    EVENT_ICS_PAST_DAYS plus series still running, optionally limited to
+    events organized or co-organized by `club_ids`.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.EVENT_ICS_PAST_DAYS)
+    queryset = Event.objects.filter(
+        Q(end__gte=cutoff)
+        | (~Q(recurrence_rule='') & (Q(recurrence_until__isnull=True) | Q(recurrence_until__gte=cutoff)))
+    )
+    if club_ids:
+        collaborations = Event.collaborating_clubs.through.objects.filter(club_id__in=club_ids).values('event_id')
+        queryset = queryset.filter(Q(club_id__in=club_ids) | Q(pk__in=collaborations))
+    return queryset
+
+
+def feed_validators(queryset, club_ids=None):
+    """
+    (etag, last_modified) for a feed without rendering it.
+
+    Edits move Max(updated_at), deletions change the row count and leave a
+    tombstone, and club renames move Club.updated_at, so any change to the
+    rendered output changes the ETag.
+    """
+    events = queryset.order_by().aggregate(count=Count('pk'), updated=Max('updated_at'))
+    tombstones = EventTombstone.objects.all()
+    if club_ids:
+        tombstones = tombstones.filter(club_id__in=club_ids)
+    deleted = tombstones.aggregate(latest=Max('deleted_at'))['latest']
+    clubs_updated = Club.objects.aggregate(latest=Max('updated_at'))['latest']
+
+    stamps = [dt for dt in (events['updated'], deleted, clubs_updated) if dt]
+    last_modified = max(stamps) if stamps else None
+    fingerprint = '|'.join(str(part) for part in (
+        events['count'], events['updated'], deleted, clubs_updated, sorted(club_ids or []),
+    ))
+    return hashlib.sha1(fingerprint.encode()).hexdigest(), last_modified
+
+
+def _escape(text):
+    return (
+        (text or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Fold a content line at 75 octets (RFC 5545 §3.1), never splitting a UTF-8 sequence."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(dt):
+    return dt.astimezone(pytz.UTC).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local(dt, tz):
+    return dt.astimezone(tz).strftime('%Y%m%dT%H%M%S')
+
+
+def _offset(delta):
+    minutes = int(delta.total_seconds()) // 60
+    sign = '-' if minutes < 0 else '+'
+    return f'{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}'
+
+
+def _vtimezone(tz, since):
+    """
+    VTIMEZONE for `tz` from `since` on: the period in force at `since`,
+    anchored at 1970, then one observance per later UTC-offset change that
+    pytz knows of.
+    """
+    times = getattr(tz, '_utc_transition_times', None)
+    if times:
+        infos = tz._transition_info
+        first = max(bisect.bisect_right(times, since.astimezone(pytz.UTC).replace(tzinfo=None)) - 1, 0)
+        periods = [(None, infos[first], infos[first])]
+        periods += [(times[i], infos[i - 1], infos[i]) for i in range(first + 1, len(times))]
+    else:
+        # Fixed offset (UTC and friends)
+        info = (tz.utcoffset(None), timedelta(0), tz.tzname(None))
+        periods = [(None, info, info)]
+
+    lines = ['BEGIN:VTIMEZONE', f'TZID:{tz.zone}']
+    for onset, (offset_from, _, _), (offset_to, dst, name) in periods:
+        component = 'DAYLIGHT' if dst else 'STANDARD'
+        # DTSTART is the onset in the local time it interrupts
+        start = (onset + offset_from).strftime('%Y%m%dT%H%M%S') if onset else '19700101T000000'
+        lines += [
+            f'BEGIN:{component}',
+            f'DTSTART:{start}',
+            f'TZOFFSETFROM:{_offset(offset_from)}',
+            f'TZOFFSETTO:{_offset(offset_to)}',
+            f'TZNAME:{name}',
+            f'END:{component}',
+        ]
+    lines.append('END:VTIMEZONE')
+    return ''.join(_fold(line) for line in lines)
+
+
+def _rrule(rule):
+    """Re-emit a stored rule with UNTIL as a UTC date-time, as DTSTART is one."""
+    parsed = parse_rule(rule)
+    parts = [f'FREQ={parsed.freq}']
+    if parsed.interval != 1:
+        parts.append(f'INTERVAL={parsed.interval}')
+    if parsed.count is not None:
+        parts.append(f'COUNT={parsed.count}')
+    if parsed.until is not None:
+        parts.append(f'UNTIL={_utc(parsed.until)}')
+    if parsed.byday:
+        parts.append('BYDAY=' + ','.join(('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')[day] for day in parsed.byday))
+    return ';'.join(parts)
+
+
+def _vevent(row, club_name, host, tz, stamp, recurrence_id=None, exdates=()):
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:{row['id']}@{host}",
+        f'DTSTAMP:{stamp}',
+    ]
+    if row['recurrence_rule'] or recurrence_id:
+        # Series are expanded in local wall time, so keep DST-stable TZID times
+        lines += [
+            f"DTSTART;TZID={tz.zone}:{_local(row['start'], tz)}",
+            f"DTEND;TZID={tz.zone}:{_local(row['end'], tz)}",
+        ]
+    else:
+        lines += [f"DTSTART:{_utc(row['start'])}", f"DTEND:{_utc(row['end'])}"]
+    if recurrence_id:
+        lines.append(f'RECURRENCE-ID;TZID={tz.zone}:{_local(recurrence_id, tz)}')
+    elif row['recurrence_rule']:
+        lines.append(f"RRULE:{_rrule(row['recurrence_rule'])}")
+        lines += [f'EXDATE;TZID={tz.zone}:{_local(exdate, tz)}' for exdate in exdates]
+    lines += [
+        f"SUMMARY:{_escape(row['title'])}",
+        f"LOCATION:{_escape(row['location'])}",
+    ]
+    if row['description']:
+        lines.append(f"DESCRIPTION:{_escape(row['description'])}")
+    if club_name:
+        lines.append(f'CATEGORIES:{_escape(club_name)}')
+    lines += [
+        f"CREATED:{_utc(row['created_at'])}",
+        f"LAST-MODIFIED:{_utc(row['updated_at'])}",
+        'END:VEVENT',
+    ]
+    return ''.join(_fold(line) for line in lines)
+
+
+def iter_calendar(queryset, name, host):
+    """
+    Yield an iCalendar document for `queryset`, one VEVENT (or a few, for a
+    series with overrides) at a time.
+    """
+    tz = pytz.timezone(settings.EVENT_RECURRENCE_TIMEZONE)
+    stamp = _utc(timezone.now())
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:-//{host}//CEAL Calendar//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+        f'X-WR-TIMEZONE:{tz.zone}',
+    ))
+
+    # Local (TZID) times only appear in series and their overrides
+    series = queryset.exclude(recurrence_rule='').order_by()
+    first_start = series.aggregate(first=Min('start'))['first']
+    yield _vtimezone(tz, min(first_start, timezone.now()) if first_start else timezone.now())
+
+    club_names = dict(Club.objects.values_list('id', 'name'))
+
+    # Series are few compared to one-off events, so their exceptions fit in memory
+    exceptions = defaultdict(list)
+    series_ids = series.values('id')
+    for exc in EventOccurrenceException.objects.filter(event_id__in=series_ids).values(*ICS_EXCEPTION_FIELDS):
+        exceptions[exc['event_id']].append(exc)
+
+    rows = queryset.order_by('start').values(*ICS_EVENT_FIELDS).iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    for row in rows:
+        club_name = club_names.get(row['club_id'])
+        overrides = exceptions.get(row['id'], ())
+        exdates = [exc['original_start'] for exc in overrides if exc['is_cancelled']]
+        yield _vevent(row, club_name, host, tz, stamp, exdates=exdates)
+
+        duration = row['end'] - row['start']
+        for exc in overrides:
+            if exc['is_cancelled']:
+                continue
+            start = exc['start'] or exc['original_start']
+            moved = {
+                **row,
+                'start': start,
+                'end': exc['end'] or start + duration,
+                'title': exc['title'] or row['title'],
+                'location': exc['location'] or row['location'],
+            }
+            yield _vevent(moved, club_name, host, tz, stamp, recurrence_id=exc['original_start'])
+
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,97 @@
+"""
+Benchmark calendar-window queries against synthetic event tables.
+
+Compares the legacy `start <= end_dt AND end >= start_dt` predicate (served by
+the composite (start, end) B-tree) with the `tstzrange && window` predicate
+served by the GiST expression index. Everything runs inside a transaction that
+is rolled back, so it is safe to point at a development database:
+
+    python manage.py bench_event_ranges --sizes 10000 100000 1000000
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from clubs.models import Club
+from events.models import Event
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark B-tree vs GiST range queries at several event-table sizes (PostgreSQL only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--queries', type=int, default=200, help="Random windows timed per size and strategy")
+        parser.add_argument('--window-days', type=int, default=31, help="Width of each queried window")
+        parser.add_argument('--span-years', type=int, default=5, help="History the synthetic events are spread over")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("The range benchmark needs PostgreSQL (tstzrange/GiST).")
+
+        self.stdout.write(f"{'events':>10}  {'strategy':<8}  {'median ms':>10}  {'p95 ms':>8}  {'rows/query':>10}")
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self._bench_size(size, options)
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+    def _bench_size(self, size, options):
+        club = Club.objects.create(slug=f'bench-{size}', name='Bench Club')
+        user = User.objects.create(email=f'bench-{size}@example.com', username=f'bench-{size}')
+        origin = timezone.now() - timedelta(days=365 * options['span_years'])
+        span_seconds = 365 * options['span_years'] * 86400
+
+        # generate_series keeps the seed phase in the database; 1M rows take seconds, not minutes
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO events_event
+                    (id, title, description, start, "end", location, location_key, recurrence_rule,
+                     club_id, created_by_id, created_at, updated_at)
+                SELECT gen_random_uuid(), 'Bench event ' || g, '', ts, ts + (1 + g % 4) * interval '1 hour',
+                       'Room ' || (g % 50), 'room ' || (g % 50), '', %s, %s, now(), now()
+                FROM (
+                    SELECT g, %s + random() * %s * interval '1 second' AS ts
+                    FROM generate_series(1, %s) AS g
+                ) AS seeded
+                """,
+                [club.id, user.id, origin, span_seconds, size],
+            )
+            cursor.execute('ANALYZE events_event')
+
+        window = timedelta(days=options['window_days'])
+        rng = random.Random(size)
+        windows = []
+        for _ in range(options['queries']):
+            start = origin + timedelta(seconds=rng.uniform(0, span_seconds))
+            windows.append((start, start + window))
+
+        strategies = {
+            'btree': lambda s, e: Event.objects.filter(start__lte=e, end__gte=s),
+            'gist': lambda s, e: Event.objects.overlapping(s, e),
+        }
+        for name, build in strategies.items():
+            timings = []
+            rows = 0
+            for start, end in windows:
+                began = time.perf_counter()
+                rows += len(list(build(start, end).values_list('id', flat=True)))
+                timings.append((time.perf_counter() - began) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f"{size:>10}  {name:<8}  {statistics.median(timings):>10.2f}  {p95:>8.2f}  {rows // len(windows):>10}"
+            )
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+SPAN_INDEX = 'events_event_span_gist'
+
+
+def fix_inverted_spans(apps, schema_editor):
+    # tstzrange() rejects end < start, so such rows would abort the index build
+    Event = apps.get_model('events', 'Event')
+    Event.objects.filter(end__lt=models.F('start')).update(end=models.F('start'))
+
+
+def create_span_index(apps, schema_editor):
+    # tstzrange/GiST are PostgreSQL-only; other backends use the (start, end) B-tree
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    fix_inverted_spans(apps, schema_editor)
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {SPAN_INDEX} ON events_event '
+        f'USING gist (tstzrange("start", "end", \'[]\'))'
+    )
+
+
+def drop_span_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {SPAN_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_event_updated_at_index_eventtombstone'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_span_index, drop_span_index),
+    ]
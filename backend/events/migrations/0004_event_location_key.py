@@ -0,0 +1,67 @@
+# Generated by Django 5.0 on 2026-10-18 07:17
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+ROOM_INDEX = 'events_event_room_span_gist'
+
+
+def normalize_location(location):
+    # Frozen copy of events.models.normalize_location as of this migration
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', (location or '').casefold()).split())
+
+
+def backfill_location_keys(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    batch = []
+    for event in Event.objects.only('id', 'location').iterator(chunk_size=2000):
+        event.location_key = normalize_location(event.location)
+        batch.append(event)
+        if len(batch) >= 2000:
+            Event.objects.bulk_update(batch, ['location_key'])
+            batch = []
+    if batch:
+        Event.objects.bulk_update(batch, ['location_key'])
+
+
+def create_room_index(apps, schema_editor):
+    # (location_key, tstzrange) GiST needs btree_gist for the text column; PostgreSQL only
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {ROOM_INDEX} ON events_event '
+        f'USING gist (location_key, tstzrange("start", "end", \'[)\'))'
+    )
+
+
+def drop_room_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {ROOM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0003_club_order'),
+        ('events', '0003_event_span_gist_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='location_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['location_key', 'start'], name='events_even_locatio_e7ceab_idx'),
+        ),
+        migrations.RunPython(backfill_location_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_room_index, drop_room_index),
+    ]
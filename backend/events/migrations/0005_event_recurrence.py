@@ -0,0 +1,57 @@
+# Generated by Django 5.0 on 2026-10-18 07:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0003_club_order'),
+        ('events', '0004_event_location_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventOccurrenceException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_start', models.DateTimeField(help_text='Start of the occurrence as generated by the rule')),
+                ('is_cancelled', models.BooleanField(default=False)),
+                ('start', models.DateTimeField(blank=True, null=True)),
+                ('end', models.DateTimeField(blank=True, null=True)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['original_start'],
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_rule',
+            field=models.CharField(blank=True, default='', help_text="RRULE subset, e.g. 'FREQ=WEEKLY;BYDAY=MO,WE;COUNT=12' (blank for one-off events)", max_length=255),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_until',
+            field=models.DateTimeField(blank=True, editable=False, help_text="End of the series' last occurrence (null = no end); maintained in save()", null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('recurrence_rule', ''), _negated=True), fields=['start', 'recurrence_until'], name='events_event_series_idx'),
+        ),
+        migrations.AddField(
+            model_name='eventoccurrenceexception',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='events.event'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventoccurrenceexception',
+            constraint=models.UniqueConstraint(fields=('event', 'original_start'), name='unique_occurrence_exception'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0 on 2026-10-18 08:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fix_inverted_spans(apps, schema_editor):
+    # Rows saved by partial updates before the end/start check covered them
+    Event = apps.get_model('events', 'Event')
+    Event.objects.filter(end__lt=models.F('start')).update(end=models.F('start'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0005_clubclosure'),
+        ('events', '0006_event_export'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_inverted_spans, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.CheckConstraint(check=models.Q(('end__gte', models.F('start'))), name='event_end_not_before_start'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0 on 2026-10-18 08:28
+
+import re
+
+from django.db import migrations, models
+
+
+def normalize_location(location):
+    # Frozen copy of events.models.normalize_location as of this migration
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', (location or '').casefold()).split())
+
+
+def backfill_location_keys(apps, schema_editor):
+    EventOccurrenceException = apps.get_model('events', 'EventOccurrenceException')
+    batch = []
+    for exc in EventOccurrenceException.objects.exclude(location='').only('id', 'location').iterator(chunk_size=2000):
+        exc.location_key = normalize_location(exc.location)
+        batch.append(exc)
+        if len(batch) >= 2000:
+            EventOccurrenceException.objects.bulk_update(batch, ['location_key'])
+            batch = []
+    if batch:
+        EventOccurrenceException.objects.bulk_update(batch, ['location_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_end_not_before_start'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventoccurrenceexception',
+            name='location_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_location_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='eventoccurrenceexception',
+            index=models.Index(condition=models.Q(('location_key', ''), _negated=True), fields=['location_key'], name='events_exception_room_idx'),
+        ),
+    ]
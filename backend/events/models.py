@@ -1,9 +1,51 @@
+import re
 import uuid
-from django.db import models
+from django.db import connections, models
+from django.db.models import F, Func, Q, Value
 from django.conf import settings
 from clubs.models import Club
 
 
+def normalize_location(location):
+    """
+    Normalize a free-text location into a comparison key, so that
+    'CS Lab 2', 'cs-lab 2' and ' CS  LAB 2 ' all refer to the same room.
+    """
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', (location or '').casefold()).split())
+
+
+def booked_span():
+    """Half-open tstzrange(start, end) used for room-booking overlap checks (PostgreSQL only)."""
+    from django.contrib.postgres.fields import DateTimeRangeField
+    return Func(F('start'), F('end'), Value('[)'), function='tstzrange', output_field=DateTimeRangeField())
+
+
+class EventQuerySet(models.QuerySet):
+    def overlapping(self, start, end):
+        """
+        Events whose [start, end] span overlaps the given window (inclusive),
+        plus recurring series that may have an occurrence inside it.
+
+        On PostgreSQL this is a `tstzrange(start, end) && window` predicate
+        served by the GiST expression index from migration 0003; other
+        backends (SQLite in tests) fall back to the plain comparison pair.
+        Series are matched on (start, recurrence_until) via a partial index
+        and expanded later by events.recurrence.
+        """
+        series = (
+            ~Q(recurrence_rule='')
+            & Q(start__lte=end)
+            & (Q(recurrence_until__isnull=True) | Q(recurrence_until__gte=start))
+        )
+        if connections[self.db].vendor == 'postgresql':
+            from django.contrib.postgres.fields import DateTimeRangeField
+            from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+
+            span = Func(F('start'), F('end'), Value('[]'), function='tstzrange', output_field=DateTimeRangeField())
+            return self.alias(span=span).filter(Q(span__overlap=DateTimeTZRange(start, end, '[]')) | series)
+        return self.filter(Q(start__lte=end, end__gte=start) | series)
+
+
 class Event(models.Model):
     """
     Event model with full datetime support and location
@@ -19,6 +61,22 @@ class Event(models.Model):
     
     # Location support for overlapping events
     location = models.CharField(max_length=255, help_text="Event location (e.g., 'CS Lab 2', 'Main Auditorium')")
+    # Normalized form of location, maintained in save(); used for double-booking checks
+    location_key = models.CharField(max_length=255, editable=False, default='')
+
+    # Recurrence: one row per series; start/end describe the first occurrence
+    recurrence_rule = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        help_text="RRULE subset, e.g. 'FREQ=WEEKLY;BYDAY=MO,WE;COUNT=12' (blank for one-off events)"
+    )
+    recurrence_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="End of the series' last occurrence (null = no end); maintained in save()"
+    )
     
     # Relations
     club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='events')
@@ -33,13 +91,146 @@ class Event(models.Model):
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = EventQuerySet.as_manager()
     
     class Meta:
         ordering = ['start']
         indexes = [
             models.Index(fields=['start', 'end']),
             models.Index(fields=['club', 'created_at']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['location_key', 'start']),
+            models.Index(
+                fields=['start', 'recurrence_until'],
+                condition=~Q(recurrence_rule=''),
+                name='events_event_series_idx',
+            ),
+        ]
+        constraints = [
+            # tstzrange(start, end) raises for inverted spans, failing every range query
+            models.CheckConstraint(check=Q(end__gte=F('start')), name='event_end_not_before_start'),
         ]
     
     def __str__(self):
         return f"{self.title} ({self.club.name}) - {self.start.strftime('%Y-%m-%d %H:%M')}"
+
+    def refresh_derived_fields(self):
+        """
+        Recompute location_key and recurrence_until. Called by save(); bulk
+        writes that bypass save() must call it themselves.
+        """
+        from .recurrence import series_end
+
+        self.location_key = normalize_location(self.location)
+        self.recurrence_until = (
+            series_end(self.recurrence_rule, self.start, self.end) if self.recurrence_rule else None
+        )
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'location_key', 'recurrence_until'}
+        super().save(*args, **kwargs)
+
+    @property
+    def is_recurring(self):
+        return bool(self.recurrence_rule)
+
+
+class EventOccurrenceException(models.Model):
+    """
+    Per-occurrence change to a recurring event: either cancels the occurrence
+    that would start at original_start, or overrides its time/title/location.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='exceptions')
+    original_start = models.DateTimeField(help_text="Start of the occurrence as generated by the rule")
+    is_cancelled = models.BooleanField(default=False)
+
+    # Overrides (null/blank = keep the series value)
+    start = models.DateTimeField(null=True, blank=True)
+    end = models.DateTimeField(null=True, blank=True)
+    title = models.CharField(max_length=255, blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    # Normalized override location, maintained in save(); lets the double-booking
+    # check find occurrences moved into a room from a series booked elsewhere
+    location_key = models.CharField(max_length=255, editable=False, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['original_start']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'original_start'], name='unique_occurrence_exception'),
+        ]
+        indexes = [
+            models.Index(fields=['location_key'], name='events_exception_room_idx', condition=~Q(location_key='')),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.location_key = normalize_location(self.location)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'location_key'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        action = 'Cancelled' if self.is_cancelled else 'Changed'
+        return f"{action} occurrence of {self.event.title} on {self.original_start.strftime('%Y-%m-%d %H:%M')}"
+
+
+class EventTombstone(models.Model):
+    """
+    Deletion log so delta-sync clients can drop events that no longer exist.
+    Rows older than EVENT_TOMBSTONE_RETENTION are pruned periodically.
+    """
+    event_id = models.UUIDField()
+    club_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['deleted_at']
+
+    def __str__(self):
+        return f"Deleted event {self.event_id} at {self.deleted_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class EventExport(models.Model):
+    """
+    Background CSV/PDF export of a large event range. The file is written to
+    EVENT_EXPORT_ROOT by events.tasks.generate_event_export and downloaded
+    once status is 'ready'.
+    """
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('pdf', 'PDF'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='event_exports')
+    format = models.CharField(max_length=3, choices=FORMAT_CHOICES)
+    range_start = models.DateTimeField()
+    range_end = models.DateTimeField()
+    club_ids = models.JSONField(default=list, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file_name = models.CharField(max_length=255, blank=True)
+    row_count = models.IntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_format_display()} export {self.id} ({self.status})"
@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .access import ClubAccess
+
 
 class IsClubMemberOrReadOnly(permissions.BasePermission):
     """
@@ -21,11 +23,7 @@ class IsClubMemberOrReadOnly(permissions.BasePermission):
         if not (request.user and request.user.is_authenticated):
             return False
 
-        return (
-            request.user.club is not None
-            or request.user.sub_club is not None
-            or request.user.extra_clubs.exists()
-        )
+        return ClubAccess.for_request(request).has_any_club
 
 
 class IsSameClubMember(permissions.BasePermission):
@@ -48,11 +46,7 @@ class IsSameClubMember(permissions.BasePermission):
             
         # For POST (create), check if user has any club affiliation
         if request.method == 'POST':
-            return (
-                request.user.club is not None
-                or request.user.sub_club is not None
-                or request.user.extra_clubs.exists()
-            )
+            return ClubAccess.for_request(request).has_any_club
             
         return True  # Handled by has_object_permission for PUT/PATCH/DELETE
 
@@ -65,25 +59,5 @@ class IsSameClubMember(permissions.BasePermission):
         if request.user.is_superuser:
             return True
 
-        # Extra_clubs check first — must come before sub_club so it isn't short-circuited
-        extra_club_ids = list(request.user.extra_clubs.values_list('id', flat=True))
-        if obj.club.id in extra_club_ids:
-            return True
-
-        # Check sub_club (more specific role)
-        # If user has a sub_club role, they can ONLY manage events FOR THAT sub_club
-        if request.user.sub_club:
-            return obj.club.id == request.user.sub_club.id
-            
-        # Then check main club role
-        # If user has a main club role, they can manage events FOR THAT club
-        # AND events for any of its sub-clubs
-        if request.user.club:
-            # Check if the event belongs to the main club
-            if obj.club.id == request.user.club.id:
-                return True
-            # Check if the event's club is a sub-club of the user's club
-            if obj.club.parent and obj.club.parent.id == request.user.club.id:
-                return True
-            
-        return False
+        # Extra clubs, the sub-club role, or the main club and its sub-clubs
+        return ClubAccess.for_request(request).can_write(obj.club_id)
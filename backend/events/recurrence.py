@@ -0,0 +1,253 @@
+"""
+Recurring events: an RRULE subset stored once on Event and expanded lazily.
+
+Supported rule parts (RFC 5545 syntax):
+    FREQ=DAILY|WEEKLY|MONTHLY, INTERVAL=n, COUNT=n or UNTIL=YYYYMMDD[THHMMSSZ],
+    BYDAY=MO,TU,... (WEEKLY only; the series' first start must fall on one of them)
+
+Occurrences are generated in EVENT_RECURRENCE_TIMEZONE wall time, so a weekly
+18:00 meeting stays at 18:00 across DST changes. Expansion only ever covers the
+requested window, jumps straight to it instead of walking the series from its
+first occurrence, and is capped at MAX_OCCURRENCES_PER_WINDOW. Parsed rules and
+expanded windows are memoized per process.
+"""
+import calendar
+from collections import namedtuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import pytz
+from django.conf import settings
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+SUPPORTED_PARTS = {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY'}
+MAX_COUNT = 1000
+MAX_OCCURRENCES_PER_WINDOW = 500
+
+Rule = namedtuple('Rule', ['freq', 'interval', 'count', 'until', 'byday'])
+Occurrence = namedtuple('Occurrence', ['original_start', 'start', 'end', 'title', 'location'])
+
+
+@lru_cache(maxsize=1024)
+def parse_rule(rule):
+    """
+    Parse an RRULE string into a Rule.
+
+    Raises:
+        ValueError: with a user-facing message if the rule is malformed or
+        uses parts outside the supported subset.
+    """
+    text = rule.strip().upper()
+    if text.startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+
+    parts = {}
+    for part in text.split(';'):
+        if not part:
+            continue
+        key, sep, value = part.partition('=')
+        if not sep or not value:
+            raise ValueError(f"Malformed rule part '{part}'.")
+        parts[key] = value
+
+    unsupported = set(parts) - SUPPORTED_PARTS
+    if unsupported:
+        raise ValueError(f"Unsupported rule part(s): {', '.join(sorted(unsupported))}.")
+
+    freq = parts.get('FREQ')
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}.")
+
+    try:
+        interval = int(parts.get('INTERVAL', '1'))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+    except ValueError:
+        raise ValueError("INTERVAL and COUNT must be integers.")
+    if interval < 1:
+        raise ValueError("INTERVAL must be at least 1.")
+    if count is not None and not 1 <= count <= MAX_COUNT:
+        raise ValueError(f"COUNT must be between 1 and {MAX_COUNT}.")
+
+    until = None
+    if 'UNTIL' in parts:
+        if count is not None:
+            raise ValueError("COUNT and UNTIL cannot both be set.")
+        until = _parse_until(parts['UNTIL'])
+
+    byday = ()
+    if 'BYDAY' in parts:
+        if freq != 'WEEKLY':
+            raise ValueError("BYDAY is only supported with FREQ=WEEKLY.")
+        try:
+            byday = tuple(sorted({WEEKDAYS.index(day) for day in parts['BYDAY'].split(',')}))
+        except ValueError:
+            raise ValueError(f"BYDAY days must be among {', '.join(WEEKDAYS)}.")
+
+    return Rule(freq, interval, count, until, byday)
+
+
+def _parse_until(value):
+    for fmt in ('%Y%m%dT%H%M%SZ', '%Y%m%d'):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if fmt == '%Y%m%d':
+            # A date-only UNTIL includes the whole day
+            parsed = parsed.replace(hour=23, minute=59, second=59)
+        return pytz.UTC.localize(parsed)
+    raise ValueError("UNTIL must be YYYYMMDD or YYYYMMDDTHHMMSSZ.")
+
+
+def validate_rule(rule, start):
+    """Check a rule against the series' first start. Raises ValueError."""
+    parsed = parse_rule(rule)
+    if parsed.byday and _local(start).weekday() not in parsed.byday:
+        raise ValueError("The first occurrence must fall on one of the BYDAY days.")
+    if parsed.until and parsed.until < start:
+        raise ValueError("UNTIL must not be before the first occurrence.")
+    return parsed
+
+
+def _tz():
+    return pytz.timezone(getattr(settings, 'EVENT_RECURRENCE_TIMEZONE', 'UTC'))
+
+
+def _local(dt):
+    return dt.astimezone(_tz())
+
+
+def _aware(naive_local):
+    """Local wall time -> aware UTC datetime."""
+    tz = _tz()
+    return tz.normalize(tz.localize(naive_local)).astimezone(pytz.UTC)
+
+
+def _iter_local_starts(rule, base, skip_to):
+    """
+    Yield (index, naive local start) in series order, starting near skip_to.
+    `index` is the 0-based position in the full series, so COUNT stays exact
+    even though earlier occurrences are skipped arithmetically.
+    """
+    if rule.freq == 'MONTHLY':
+        # At most 12 candidates per year, so walk from the start
+        yield from _iter_monthly(rule, base)
+        return
+
+    period = timedelta(days=rule.interval * (7 if rule.freq == 'WEEKLY' else 1))
+    first = max(0, (skip_to - base) // period - 1)
+
+    if not rule.byday:
+        k = first
+        while True:
+            yield k, base + k * period
+            k += 1
+
+    week_start = base - timedelta(days=base.weekday())
+    first_week = [d for d in rule.byday if d >= base.weekday()]
+    k = first
+    while True:
+        days = first_week if k == 0 else rule.byday
+        index = 0 if k == 0 else len(first_week) + (k - 1) * len(rule.byday)
+        for offset, day in enumerate(days):
+            yield index + offset, week_start + k * period + timedelta(days=day)
+        k += 1
+
+
+def _iter_monthly(rule, base):
+    # Months without the start's day of month (e.g. the 31st) are skipped
+    k = index = 0
+    while True:
+        months = base.month - 1 + k * rule.interval
+        year, month = base.year + months // 12, months % 12 + 1
+        if base.day <= calendar.monthrange(year, month)[1]:
+            yield index, base.replace(year=year, month=month)
+            index += 1
+        k += 1
+
+
+@lru_cache(maxsize=4096)
+def _expand_starts(rule_text, start, duration, window_start, window_end):
+    rule = parse_rule(rule_text)
+    base = _local(start).replace(tzinfo=None)
+    skip_to = _local(window_start - duration).replace(tzinfo=None)
+
+    starts = []
+    for index, naive in _iter_local_starts(rule, base, skip_to):
+        if rule.count is not None and index >= rule.count:
+            break
+        occurrence = _aware(naive)
+        if occurrence > window_end or (rule.until and occurrence > rule.until):
+            break
+        if occurrence + duration >= window_start:
+            starts.append(occurrence)
+            if len(starts) >= MAX_OCCURRENCES_PER_WINDOW:
+                break
+    return tuple(starts)
+
+
+def occurrence_starts(rule, start, end, window_start, window_end):
+    """Original start times of the occurrences overlapping [window_start, window_end]."""
+    return _expand_starts(rule, start, end - start, window_start, window_end)
+
+
+def series_end(rule, start, end):
+    """
+    End of the last occurrence, or None for an unbounded series.
+    Stored as Event.recurrence_until so range queries can skip finished series.
+    """
+    parsed = parse_rule(rule)
+    duration = end - start
+    if parsed.until:
+        return parsed.until + duration
+    if parsed.count:
+        base = _local(start).replace(tzinfo=None)
+        last = None
+        for index, naive in _iter_local_starts(parsed, base, base):
+            if index >= parsed.count:
+                break
+            last = naive
+        return _aware(last) + duration
+    return None
+
+
+def expand_occurrences(rule, start, end, title, location, window_start, window_end, exceptions=()):
+    """
+    Expand a series into the occurrences overlapping the window.
+
+    Args:
+        exceptions: EventOccurrenceException-like objects (original_start,
+            is_cancelled and optional start/end/title/location overrides)
+
+    Returns:
+        list of Occurrence, sorted by start
+    """
+    overrides = {exc.original_start: exc for exc in exceptions}
+    duration = end - start
+    occurrences = []
+    seen = set()
+
+    for original in occurrence_starts(rule, start, end, window_start, window_end):
+        seen.add(original)
+        exc = overrides.get(original)
+        if exc is None:
+            occurrences.append(Occurrence(original, original, original + duration, title, location))
+        elif not exc.is_cancelled:
+            occurrences.append(_apply_exception(exc, original, duration, title, location))
+
+    # Occurrences moved into the window from outside it
+    for original, exc in overrides.items():
+        if original not in seen and not exc.is_cancelled and exc.start:
+            occurrences.append(_apply_exception(exc, original, duration, title, location))
+
+    return sorted(
+        (occ for occ in occurrences if occ.start <= window_end and occ.end >= window_start),
+        key=lambda occ: occ.start,
+    )
+
+
+def _apply_exception(exc, original, duration, title, location):
+    new_start = exc.start or original
+    new_end = exc.end or new_start + duration
+    return Occurrence(original, new_start, new_end, exc.title or title, exc.location or location)
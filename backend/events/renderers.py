@@ -0,0 +1,33 @@
+"""
+Renderers for the file-producing event endpoints (iCalendar feeds, exports).
+
+They let `Accept: text/calendar` / `?format=csv` style requests through DRF
+content negotiation. The files themselves are streamed directly with a
+StreamingHttpResponse, so these renderers only ever render error bodies,
+as plain text.
+"""
+from rest_framework.renderers import BaseRenderer
+
+
+class FileErrorRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = data.get('detail', data)
+        return str(data or '').encode(self.charset)
+
+
+class ICalendarRenderer(FileErrorRenderer):
+    media_type = 'text/calendar'
+    format = 'ics'
+
+
+class CSVRenderer(FileErrorRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFRenderer(FileErrorRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
@@ -1,8 +1,50 @@
 from rest_framework import serializers
-from .models import Event
+from .models import Event, EventExport, EventOccurrenceException
+from .recurrence import validate_rule, occurrence_starts, expand_occurrences
 from clubs.serializers import ClubSerializer
 
 
+def validate_recurrence_rule(rule, start):
+    """
+    Validate an RRULE (subset) against the series' first start.
+    """
+    if not rule:
+        return
+    try:
+        validate_rule(rule, start)
+    except ValueError as e:
+        raise serializers.ValidationError({"recurrence_rule": str(e)})
+
+
+class EventOccurrenceExceptionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for cancelling or overriding one occurrence of a recurring event.
+    Expects the series in context['event'].
+    """
+    class Meta:
+        model = EventOccurrenceException
+        fields = ['original_start', 'is_cancelled', 'start', 'end', 'title', 'location']
+
+    def validate(self, data):
+        event = self.context['event']
+        if not event.recurrence_rule:
+            raise serializers.ValidationError("Only recurring events have occurrences.")
+
+        original = data['original_start']
+        if original not in occurrence_starts(event.recurrence_rule, event.start, event.end, original, original):
+            raise serializers.ValidationError({
+                "original_start": "No occurrence of this event starts at that time."
+            })
+
+        start = data.get('start') or original
+        end = data.get('end') or start + (event.end - event.start)
+        if end <= start:
+            raise serializers.ValidationError({
+                "end": "End time must be after start time."
+            })
+        return data
+
+
 class EventSerializer(serializers.ModelSerializer):
     """
     Serializer for Event model (read + update).
@@ -19,29 +61,40 @@ class EventSerializer(serializers.ModelSerializer):
     )
     created_by_email = serializers.EmailField(source='created_by.email', read_only=True)
     created_by_name = serializers.SerializerMethodField()
+    exceptions = EventOccurrenceExceptionSerializer(many=True, read_only=True)
     
     class Meta:
         model = Event
         fields = [
             'id', 'title', 'description', 'start', 'end', 'location',
             'club', 'collaborating_clubs', 'collaborating_club_ids',
+            'recurrence_rule', 'recurrence_until', 'exceptions',
             'created_by', 'created_by_email', 'created_by_name',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'club', 'collaborating_clubs', 'created_by', 'created_at', 'updated_at']
+        read_only_fields = [
+            'id', 'club', 'collaborating_clubs', 'recurrence_until', 'exceptions',
+            'created_by', 'created_at', 'updated_at',
+        ]
     
     def get_created_by_name(self, obj):
         return f"{obj.created_by.first_name} {obj.created_by.last_name}".strip() or obj.created_by.username
     
     def validate(self, data):
         """
-        Validate that end time is after start time
+        Validate that end time is after start time, comparing partial
+        updates against the stored values
         """
-        if data.get('end') and data.get('start'):
-            if data['end'] <= data['start']:
-                raise serializers.ValidationError({
-                    "end": "End time must be after start time."
-                })
+        start = data.get('start', self.instance.start if self.instance else None)
+        end = data.get('end', self.instance.end if self.instance else None)
+        if start and end and end <= start:
+            raise serializers.ValidationError({
+                "end": "End time must be after start time."
+            })
+
+        rule = data.get('recurrence_rule', self.instance.recurrence_rule if self.instance else '')
+        if start:
+            validate_recurrence_rule(rule, start)
         
         # Validate collaborating clubs
         collaborating_ids = data.get('collaborating_club_ids')
@@ -54,9 +107,12 @@ class EventSerializer(serializers.ModelSerializer):
         """
         Verify that the provided club IDs exist.
         Collaboration is open to any existing club.
+        Bulk callers pass the already-resolved IDs in context['existing_club_ids'].
         """
-        from clubs.models import Club
-        existing_ids = set(Club.objects.filter(pk__in=club_ids).values_list('id', flat=True))
+        existing_ids = self.context.get('existing_club_ids')
+        if existing_ids is None:
+            from clubs.models import Club
+            existing_ids = set(Club.objects.filter(pk__in=club_ids).values_list('id', flat=True))
         
         for cid in club_ids:
             if cid not in existing_ids:
@@ -81,7 +137,10 @@ class EventCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Event
-        fields = ['title', 'description', 'start', 'end', 'location', 'club_id', 'collaborating_club_ids']
+        fields = [
+            'title', 'description', 'start', 'end', 'location', 'recurrence_rule',
+            'club_id', 'collaborating_club_ids',
+        ]
     
     def validate(self, data):
         """
@@ -91,6 +150,8 @@ class EventCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({
                 "end": "End time must be after start time."
             })
+
+        validate_recurrence_rule(data.get('recurrence_rule'), data['start'])
             
         # Validate collaborating clubs
         collaborating_ids = data.get('collaborating_club_ids')
@@ -103,12 +164,117 @@ class EventCreateSerializer(serializers.ModelSerializer):
         """
         Verify that the provided club IDs exist.
         Collaboration is open to any existing club.
+        Bulk callers pass the already-resolved IDs in context['existing_club_ids'].
         """
-        from clubs.models import Club
-        existing_ids = set(Club.objects.filter(pk__in=club_ids).values_list('id', flat=True))
+        existing_ids = self.context.get('existing_club_ids')
+        if existing_ids is None:
+            from clubs.models import Club
+            existing_ids = set(Club.objects.filter(pk__in=club_ids).values_list('id', flat=True))
         
         for cid in club_ids:
             if cid not in existing_ids:
                 raise serializers.ValidationError({
                     "collaborating_club_ids": f"Club with ID {cid} does not exist."
                 })
+
+
+class ConflictSlotSerializer(serializers.Serializer):
+    """
+    A proposed room booking to check for double-booking.
+    `exclude` is the ID of an event being edited, so it does not conflict with itself.
+    """
+    location = serializers.CharField(max_length=255)
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    exclude = serializers.UUIDField(required=False)
+
+    def validate(self, data):
+        if data['end'] <= data['start']:
+            raise serializers.ValidationError({
+                "end": "End time must be after start time."
+            })
+        return data
+
+
+class ConflictCheckSerializer(serializers.Serializer):
+    """
+    Bulk double-booking check for a list of proposed slots.
+    """
+    slots = serializers.ListField(child=ConflictSlotSerializer(), allow_empty=False)
+
+    def validate_slots(self, slots):
+        from django.conf import settings
+        if len(slots) > settings.EVENT_CONFLICT_CHECK_MAX_SLOTS:
+            raise serializers.ValidationError(
+                f"At most {settings.EVENT_CONFLICT_CHECK_MAX_SLOTS} slots can be checked at once."
+            )
+        return slots
+
+
+class ExportRangeSerializer(serializers.Serializer):
+    """
+    Date range of a CSV/PDF export.
+    """
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+    def validate(self, data):
+        if data['end'] <= data['start']:
+            raise serializers.ValidationError({
+                "end": "End time must be after start time."
+            })
+        return data
+
+
+class EventExportSerializer(serializers.ModelSerializer):
+    """
+    Status of a background export; `download_url` is set once it is ready.
+    """
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = EventExport
+        fields = [
+            'id', 'format', 'range_start', 'range_end', 'club_ids', 'status',
+            'row_count', 'error', 'created_at', 'completed_at', 'download_url',
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != 'ready':
+            return None
+        from rest_framework.reverse import reverse
+        return reverse('event-export-download', kwargs={'export_id': obj.id}, request=self.context.get('request'))
+
+
+def expand_recurring(events, data, window_start, window_end):
+    """
+    Replace serialized recurring series with one item per occurrence inside
+    the window. Occurrence items keep the series `id` and add `occurrence_start`
+    (the rule-generated start that identifies the occurrence for exceptions).
+
+    Args:
+        events: Event instances (with `exceptions` prefetched)
+        data: their serialized representations, in the same order
+    """
+    datetime_field = serializers.DateTimeField()
+    expanded = []
+    for event, item in zip(events, data):
+        if not event.recurrence_rule:
+            expanded.append((event.start, item))
+            continue
+        occurrences = expand_occurrences(
+            event.recurrence_rule, event.start, event.end, event.title, event.location,
+            window_start, window_end, exceptions=event.exceptions.all(),
+        )
+        for occ in occurrences:
+            expanded.append((occ.start, {
+                **item,
+                'title': occ.title,
+                'location': occ.location,
+                'start': datetime_field.to_representation(occ.start),
+                'end': datetime_field.to_representation(occ.end),
+                'occurrence_start': datetime_field.to_representation(occ.original_start),
+            }))
+    expanded.sort(key=lambda pair: pair[0])
+    return [item for _, item in expanded]
@@ -0,0 +1,71 @@
+"""
+Signal handlers that keep the event response cache coherent and record
+deletions for delta-sync clients.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from clubs.models import Club
+from . import cache as response_cache
+from .models import Event, EventTombstone
+
+
+def _bump_on_commit(club_ids):
+    # After commit, so no reader can cache the old rows under the new generation
+    transaction.on_commit(lambda: response_cache.bump_generations(club_ids))
+
+
+@receiver(post_save, sender=Event)
+def invalidate_on_event_save(sender, instance, **kwargs):
+    club_ids = [instance.club_id]
+    if not kwargs.get('created'):
+        club_ids += list(instance.collaborating_clubs.values_list('id', flat=True))
+    _bump_on_commit(club_ids)
+
+
+@receiver(pre_delete, sender=Event)
+def remember_collaborators_on_event_delete(sender, instance, **kwargs):
+    # The through rows are gone by post_delete, so capture them now
+    instance._collaborating_club_ids = list(instance.collaborating_clubs.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Event)
+def invalidate_on_event_delete(sender, instance, **kwargs):
+    _bump_on_commit([instance.club_id] + getattr(instance, '_collaborating_club_ids', []))
+
+
+@receiver(post_delete, sender=Event)
+def record_event_tombstone(sender, instance, **kwargs):
+    # Written for every deletion path (API, admin, club cascade) so sync clients never keep ghosts
+    EventTombstone.objects.create(event_id=instance.pk, club_id=instance.club_id)
+
+
+@receiver(m2m_changed, sender=Event.collaborating_clubs.through)
+def invalidate_on_collaborators_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # pk_set is not provided for clears, so remember the current collaborators
+        if reverse:
+            instance._cleared_ids = list(instance.collaborated_events.values_list('club_id', flat=True))
+        else:
+            instance._cleared_ids = list(instance.collaborating_clubs.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        # instance is a Club; pk_set holds event IDs
+        club_ids = [instance.pk]
+        if pk_set:
+            club_ids += list(Event.objects.filter(pk__in=pk_set).values_list('club_id', flat=True))
+    else:
+        club_ids = [instance.club_id] + list(pk_set or [])
+    if action == 'post_clear':
+        club_ids += getattr(instance, '_cleared_ids', [])
+    _bump_on_commit(club_ids)
+
+
+@receiver(post_save, sender=Club)
+@receiver(post_delete, sender=Club)
+def invalidate_on_club_change(sender, instance, **kwargs):
+    transaction.on_commit(response_cache.bump_club_metadata)
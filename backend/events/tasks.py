@@ -0,0 +1,92 @@
+import logging
+import tempfile
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .models import EventExport, EventTombstone
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def prune_event_tombstones():
+    """
+    Delete tombstones older than EVENT_TOMBSTONE_RETENTION_DAYS.
+    Runs daily via Celery Beat; clients with an older watermark get a 410
+    from the changes endpoint and reload their full range instead.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.EVENT_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = EventTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    result = f"Pruned {deleted} event tombstone(s)"
+    logger.info(result)
+    return result
+
+
+@shared_task
+def generate_event_export(export_id):
+    """
+    Write a background CSV/PDF export to EVENT_EXPORT_ROOT.
+    Streams through a temporary file, so memory use does not grow with the range.
+    """
+    from .export import export_queryset, get_export_storage, iter_export, iter_export_rows
+
+    export = EventExport.objects.select_related('requested_by').filter(pk=export_id, status='pending').first()
+    if export is None:
+        return f"Export {export_id} is not pending"
+    export.status = 'running'
+    export.save(update_fields=['status'])
+
+    row_count = 0
+
+    def counted(rows):
+        nonlocal row_count
+        for row in rows:
+            row_count += 1
+            yield row
+
+    try:
+        queryset = export_queryset(export.range_start, export.range_end, export.club_ids)
+        rows = counted(iter_export_rows(queryset, export.range_start, export.range_end))
+        title = f"CEAL Calendar: {export.range_start:%d %b %Y} - {export.range_end:%d %b %Y}"
+        with tempfile.TemporaryFile() as tmp:
+            for chunk in iter_export(export.format, rows, title, export.requested_by):
+                tmp.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            tmp.seek(0)
+            export.file_name = get_export_storage().save(f'{export.id}.{export.format}', File(tmp))
+    except Exception as e:
+        logger.error("Event export %s failed: %s", export.id, e, exc_info=True)
+        export.status = 'failed'
+        export.error = str(e)
+        export.completed_at = timezone.now()
+        export.save(update_fields=['status', 'error', 'completed_at'])
+        return f"Export {export.id} failed"
+
+    export.status = 'ready'
+    export.row_count = row_count
+    export.completed_at = timezone.now()
+    export.save(update_fields=['status', 'file_name', 'row_count', 'completed_at'])
+    result = f"Exported {row_count} event(s) to {export.file_name}"
+    logger.info(result)
+    return result
+
+
+@shared_task
+def prune_event_exports():
+    """
+    Delete export jobs (and their files) older than EVENT_EXPORT_RETENTION_HOURS.
+    """
+    from .export import get_export_storage
+
+    cutoff = timezone.now() - timedelta(hours=settings.EVENT_EXPORT_RETENTION_HOURS)
+    storage = get_export_storage()
+    expired = EventExport.objects.filter(created_at__lt=cutoff)
+    for file_name in expired.exclude(file_name='').values_list('file_name', flat=True):
+        storage.delete(file_name)
+    deleted, _ = expired.delete()
+    result = f"Pruned {deleted} event export(s)"
+    logger.info(result)
+    return result
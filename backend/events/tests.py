@@ -1,12 +1,17 @@
 """
 Tests for the events app: CRUD, permissions, date filtering.
 """
-from django.test import TestCase
+from unittest import skipUnless
+from unittest.mock import patch
+
+import redis
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from datetime import timedelta
+from datetime import datetime, timedelta
 from accounts.models import User
 from clubs.models import Club
 from events.models import Event
@@ -168,6 +173,58 @@ class EventValidationTests(TestCase):
         }, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_partial_update_checked_against_stored_start(self):
+        event = Event.objects.create(
+            title='Talk', start=self.now + timedelta(hours=2), end=self.now + timedelta(hours=3),
+            location='Lab', club=self.club, created_by=self.user,
+        )
+        response = self.client.patch(
+            reverse('event-detail', args=[event.id]),
+            {'end': (self.now + timedelta(hours=1)).isoformat()},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('end', response.data['detail'])
+
+    def test_inverted_span_rejected_by_database(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Event.objects.create(
+                title='Backwards', start=self.now + timedelta(hours=2), end=self.now + timedelta(hours=1),
+                location='Lab', club=self.club, created_by=self.user,
+            )
+
+
+@skipUnless(connection.vendor == 'postgresql', "tstzrange queries need PostgreSQL")
+class EventRangePostgresTests(TestCase):
+    """Test the tstzrange overlap path of EventQuerySet.overlapping."""
+
+    def setUp(self):
+        self.club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.user = User.objects.create_user(email='member@example.com', username='member', password='Pass123!')
+        self.now = timezone.now()
+
+    def _event(self, title, start, hours=1):
+        return Event.objects.create(
+            title=title, start=start, end=start + timedelta(hours=hours),
+            location='Lab', club=self.club, created_by=self.user,
+        )
+
+    def test_overlap_is_inclusive(self):
+        window = (self.now, self.now + timedelta(days=1))
+        self._event('Inside', self.now + timedelta(hours=3))
+        self._event('Ends at window start', self.now - timedelta(hours=1))
+        self._event('Spans window', self.now - timedelta(hours=1), hours=48)
+        self._event('Before', self.now - timedelta(days=2))
+        self._event('After', self.now + timedelta(days=2))
+        titles = set(Event.objects.overlapping(*window).values_list('title', flat=True))
+        self.assertEqual(titles, {'Inside', 'Ends at window start', 'Spans window'})
+
+    def test_zero_length_event_matches(self):
+        Event.objects.create(
+            title='Deadline', start=self.now, end=self.now, location='', club=self.club, created_by=self.user,
+        )
+        self.assertEqual(Event.objects.overlapping(self.now - timedelta(hours=1), self.now).count(), 1)
+
 
 class EventFilteringTests(TestCase):
     """Test date range and club filtering."""
@@ -220,6 +277,91 @@ class EventFilteringTests(TestCase):
             self.assertEqual(event['club']['id'], self.club2.id)
 
 
+class ClubTreeFilterTests(TestCase):
+    """Test the hierarchical `club_tree` filter."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.main = Club.objects.create(slug='ieee', name='IEEE', color='#3B82F6')
+        self.sub = Club.objects.create(slug='ieee-cs', name='IEEE CS', parent=self.main)
+        self.chapter = Club.objects.create(slug='ieee-cs-ai', name='IEEE CS AI', parent=self.sub)
+        self.other = Club.objects.create(slug='ee', name='EE Club', color='#EF4444')
+        self.user = User.objects.create_user(
+            email='member@example.com',
+            username='member',
+            password='Pass123!',
+            club=self.main,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.now = timezone.now()
+        for title, club in [('Main', self.main), ('Sub', self.sub), ('Chapter', self.chapter), ('Other', self.other)]:
+            self._create_event(title, club)
+        self.joint = self._create_event('Joint', self.other)
+        self.joint.collaborating_clubs.add(self.chapter)
+
+    def _create_event(self, title, club):
+        return Event.objects.create(
+            title=title, start=self.now + timedelta(hours=1),
+            end=self.now + timedelta(hours=2), location='Room 1',
+            club=club, created_by=self.user,
+        )
+
+    def _titles(self, params):
+        response = self.client.get(reverse('event-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(e['title'] for e in response.data['results'])
+
+    def test_expands_to_every_level_and_collaborations(self):
+        self.assertEqual(self._titles({'club_tree': str(self.main.id)}), ['Chapter', 'Joint', 'Main', 'Sub'])
+        self.assertEqual(self._titles({'club_tree': str(self.chapter.id)}), ['Chapter', 'Joint'])
+
+    def test_exact_clubs_combine_with_tree(self):
+        params = {'club_tree': str(self.chapter.id), 'clubs': str(self.main.id)}
+        self.assertEqual(self._titles(params), ['Chapter', 'Joint', 'Main'])
+
+    def test_plain_clubs_filter_unchanged(self):
+        self.assertEqual(self._titles({'clubs': str(self.main.id)}), ['Main'])
+
+    def test_new_sub_club_included(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            late = Club.objects.create(slug='ieee-ras', name='IEEE RAS', parent=self.main)
+        self._create_event('Late', late)
+        self.assertIn('Late', self._titles({'club_tree': str(self.main.id)}))
+
+    def test_repeat_request_served_from_cache(self):
+        params = {
+            'start': (self.now - timedelta(days=1)).isoformat(),
+            'end': (self.now + timedelta(days=1)).isoformat(),
+            'club_tree': str(self.main.id),
+        }
+        self.client.get(reverse('event-feed'), params)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('event-feed'), params)
+        self.assertEqual(len(response.data['events']), 4)
+
+    def test_collaboration_invalidates_tree_entry(self):
+        params = {
+            'start': (self.now - timedelta(days=1)).isoformat(),
+            'end': (self.now + timedelta(days=1)).isoformat(),
+            'club_tree': str(self.sub.id),
+        }
+        self.client.get(reverse('event-feed'), params)
+        other = Event.objects.get(title='Other')
+        with self.captureOnCommitCallbacks(execute=True):
+            other.collaborating_clubs.add(self.chapter)
+        response = self.client.get(reverse('event-feed'), params)
+        self.assertEqual(len(response.data['events']), 4)
+
+    def test_changes_honor_tree(self):
+        response = self.client.get(reverse('event-changes'), {
+            'since': (self.now - timedelta(minutes=1)).isoformat(),
+            'club_tree': str(self.sub.id),
+        })
+        self.assertEqual(len(response.data['events']), 3)
+
+
 class MainClubRoleTests(TestCase):
     """
     Test that main-club role users can manage events for their club
@@ -381,3 +523,985 @@ class MainClubRoleTests(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+
+
+class EventFeedTests(TestCase):
+    """Test the compact calendar feed endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.main_club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.sub_club = Club.objects.create(
+            slug='cs-ai', name='CS AI Sub-club', color='#8B5CF6',
+            parent=self.main_club
+        )
+        self.other_club = Club.objects.create(slug='ee', name='EE Club', color='#EF4444')
+        self.user = User.objects.create_user(
+            email='member@example.com',
+            username='member',
+            password='Pass123!',
+            club=self.main_club,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.now = timezone.now()
+        self.params = {
+            'start': (self.now - timedelta(days=1)).isoformat(),
+            'end': (self.now + timedelta(days=7)).isoformat(),
+        }
+
+    def _create_events(self, count):
+        for i in range(count):
+            event = Event.objects.create(
+                title=f'Event {i}',
+                start=self.now + timedelta(hours=i + 1),
+                end=self.now + timedelta(hours=i + 2),
+                location='Room 1',
+                club=self.sub_club,
+                created_by=self.user,
+            )
+            event.collaborating_clubs.set([self.other_club])
+
+    def test_feed_side_loads_clubs(self):
+        self._create_events(2)
+        response = self.client.get(reverse('event-feed'), self.params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        events = response.data['events']
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]['club_id'], self.sub_club.id)
+        self.assertEqual(events[0]['collaborating_club_ids'], [self.other_club.id])
+        self.assertNotIn('club', events[0])
+        # Referenced clubs and the sub-club's parent appear exactly once
+        self.assertEqual(
+            set(response.data['clubs']),
+            {self.main_club.id, self.sub_club.id, self.other_club.id},
+        )
+        self.assertEqual(response.data['clubs'][self.sub_club.id]['parent'], self.main_club.id)
+
+    def test_feed_query_count_is_constant(self):
+        self._create_events(1)
+        with self.assertNumQueries(3):
+            self.client.get(reverse('event-feed'), self.params)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_events(10)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('event-feed'), self.params)
+        self.assertEqual(len(response.data['events']), 11)
+
+    def test_feed_requires_date_range(self):
+        response = self.client.get(reverse('event-feed'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EventResponseCacheTests(TestCase):
+    """Test the range-query response cache and its invalidation."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.other_club = Club.objects.create(slug='ee', name='EE Club', color='#EF4444')
+        self.user = User.objects.create_user(
+            email='member@example.com',
+            username='member',
+            password='Pass123!',
+            club=self.club,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.now = timezone.now()
+        self.params = {
+            'start': (self.now - timedelta(days=1)).isoformat(),
+            'end': (self.now + timedelta(days=7)).isoformat(),
+            'clubs': str(self.club.id),
+        }
+        self.event = Event.objects.create(
+            title='Cached Event', start=self.now + timedelta(hours=1),
+            end=self.now + timedelta(hours=2), location='Room 1',
+            club=self.club, created_by=self.user,
+        )
+
+    def _titles(self, response):
+        return [e['title'] for e in response.data['results']]
+
+    def test_repeat_request_served_from_cache(self):
+        self.client.get(reverse('event-list'), self.params)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('event-list'), self.params)
+        self.assertEqual(self._titles(response), ['Cached Event'])
+
+    @patch('notifications.tasks.send_urgent_notification.apply_async')
+    def test_update_invalidates(self, apply_async):
+        self.client.get(reverse('event-list'), self.params)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('event-detail', args=[self.event.id]), {'title': 'Renamed'}, format='json')
+        response = self.client.get(reverse('event-list'), self.params)
+        self.assertEqual(self._titles(response), ['Renamed'])
+
+    def test_bump_waits_for_commit(self):
+        self.client.get(reverse('event-list'), self.params)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.event.title = 'Renamed'
+            self.event.save()
+            # Not committed yet: readers keep the current generation
+            with self.assertNumQueries(0):
+                self.client.get(reverse('event-list'), self.params)
+        for callback in callbacks:
+            callback()
+        response = self.client.get(reverse('event-list'), self.params)
+        self.assertEqual(self._titles(response), ['Renamed'])
+
+    def test_cache_errors_fall_back_to_database(self):
+        from events import cache as response_cache
+        broken = redis.ConnectionError("Connection refused")
+        with patch.object(response_cache.get_cache(), 'incr', side_effect=broken), \
+                patch.object(response_cache.get_cache(), 'get_many', side_effect=broken), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.event.title = 'Renamed'
+            self.event.save()
+            response = self.client.get(reverse('event-list'), self.params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._titles(response), ['Renamed'])
+
+    def test_delete_invalidates(self):
+        self.client.get(reverse('event-feed'), self.params)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('event-detail', args=[self.event.id]))
+        response = self.client.get(reverse('event-feed'), self.params)
+        self.assertEqual(response.data['events'], [])
+
+    def test_collaborator_change_invalidates_collaborator_club(self):
+        params = {**self.params, 'clubs': str(self.other_club.id)}
+        self.client.get(reverse('event-feed'), params)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.collaborating_clubs.add(self.other_club)
+        # Cache miss: the feed is rebuilt from the database
+        with self.assertNumQueries(1):
+            self.client.get(reverse('event-feed'), params)
+
+    def test_other_club_write_keeps_entry(self):
+        self.client.get(reverse('event-list'), self.params)
+        Event.objects.create(
+            title='Other', start=self.now, end=self.now + timedelta(hours=1),
+            location='Room 2', club=self.other_club, created_by=self.user,
+        )
+        with self.assertNumQueries(0):
+            self.client.get(reverse('event-list'), self.params)
+
+    def test_cache_stats_staff_only(self):
+        self.client.get(reverse('event-list'), self.params)
+        self.client.get(reverse('event-list'), self.params)
+        response = self.client.get(reverse('event-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = User.objects.create_superuser(email='admin@example.com', username='admin', password='Admin123!')
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(reverse('event-cache-stats'))
+        self.assertEqual(response.data['hits'], 1)
+        self.assertEqual(response.data['misses'], 1)
+
+
+class EventChangesTests(TestCase):
+    """Test the delta-sync changes endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.user = User.objects.create_user(
+            email='member@example.com',
+            username='member',
+            password='Pass123!',
+            club=self.club,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.now = timezone.now()
+
+    def _create_event(self, title):
+        return Event.objects.create(
+            title=title, start=self.now + timedelta(days=1),
+            end=self.now + timedelta(days=1, hours=1), location='Room 1',
+            club=self.club, created_by=self.user,
+        )
+
+    def test_returns_only_changes_after_watermark(self):
+        old = self._create_event('Old')
+        Event.objects.filter(pk=old.pk).update(updated_at=self.now - timedelta(hours=1))
+        new = self._create_event('New')
+
+        response = self.client.get(reverse('event-changes'), {'since': (self.now - timedelta(minutes=1)).isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e['id'] for e in response.data['events']], [new.id])
+        self.assertEqual(response.data['deleted'], [])
+        self.assertIn('watermark', response.data)
+
+    def test_deleted_event_returns_tombstone(self):
+        event = self._create_event('Doomed')
+        watermark = self.client.get(reverse('event-changes'), {'since': self.now.isoformat()}).data['watermark']
+        self.client.delete(reverse('event-detail', args=[event.id]))
+
+        response = self.client.get(reverse('event-changes'), {'since': watermark.isoformat()})
+        self.assertEqual(response.data['events'], [])
+        self.assertEqual(response.data['deleted'], [event.id])
+
+    def test_naive_watermark_taken_as_local_time(self):
+        event = self._create_event('New')
+        since = timezone.localtime(self.now - timedelta(minutes=1)).replace(tzinfo=None)
+        response = self.client.get(reverse('event-changes'), {'since': since.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e['id'] for e in response.data['events']], [event.id])
+
+    def test_unparseable_watermark_rejected(self):
+        response = self.client.get(reverse('event-changes'), {'since': '2026-13-45T99:00:00'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_missing_watermark_rejected(self):
+        response = self.client.get(reverse('event-changes'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_watermark_older_than_retention_is_gone(self):
+        response = self.client.get(reverse('event-changes'), {'since': (self.now - timedelta(days=365)).isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+
+class LocationConflictTests(TestCase):
+    """Test room double-booking detection."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.user = User.objects.create_user(
+            email='member@example.com',
+            username='member',
+            password='Pass123!',
+            club=self.club,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.booked = Event.objects.create(
+            title='Booked', start=self.start, end=self.start + timedelta(hours=2),
+            location='CS Lab 2', club=self.club, created_by=self.user,
+        )
+
+    def _slot(self, location='cs-lab  2', offset=1, hours=2):
+        start = self.start + timedelta(hours=offset)
+        return {'location': location, 'start': start.isoformat(), 'end': (start + timedelta(hours=hours)).isoformat()}
+
+    def test_location_key_is_normalized(self):
+        self.assertEqual(self.booked.location_key, 'cs lab 2')
+
+    def test_single_slot_conflict(self):
+        response = self.client.get(reverse('event-conflicts'), self._slot())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['id'] for c in response.data['conflicts']], [self.booked.id])
+
+    def test_back_to_back_and_other_rooms_do_not_conflict(self):
+        response = self.client.get(reverse('event-conflicts'), self._slot(offset=2))
+        self.assertEqual(response.data['conflicts'], [])
+        response = self.client.get(reverse('event-conflicts'), self._slot(location='CS Lab 3'))
+        self.assertEqual(response.data['conflicts'], [])
+
+    def test_bulk_check_single_query(self):
+        slots = [self._slot(), self._slot(offset=5), self._slot(offset=6), self._slot('Online')]
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('event-conflicts'), {'slots': slots}, format='json')
+        results = response.data['results']
+        self.assertEqual([c['id'] for c in results[0]['conflicts']], [self.booked.id])
+        self.assertEqual(results[1]['conflicts'], [])
+        self.assertEqual(results[1]['internal_conflicts'], [2])
+        self.assertEqual(results[2]['internal_conflicts'], [1])
+        self.assertEqual(results[3], {'index': 3, 'conflicts': [], 'internal_conflicts': []})
+
+    @override_settings(EVENT_ENFORCE_LOCATION_CONFLICTS=True)
+    def test_enforcement_rejects_double_booking(self):
+        response = self.client.post(reverse('event-list'), {'title': 'Clash', **self._slot()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # Editing the booked event itself does not clash with its own slot
+        response = self.client.patch(
+            reverse('event-detail', args=[self.booked.id]),
+            {'end': (self.start + timedelta(hours=3)).isoformat()},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_enforcement_off_by_default(self):
+        response = self.client.post(reverse('event-list'), {'title': 'Clash', **self._slot()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def _weekly_series(self):
+        return Event.objects.create(
+            title='Weekly Lab', start=self.start + timedelta(days=1), end=self.start + timedelta(days=1, hours=2),
+            location='Seminar Hall', club=self.club, created_by=self.user, recurrence_rule='FREQ=WEEKLY',
+        )
+
+    def test_later_occurrence_of_series_conflicts(self):
+        series = self._weekly_series()
+        week3 = series.start + timedelta(weeks=2)
+        slot = {'location': 'seminar hall', 'start': (week3 + timedelta(hours=1)).isoformat(),
+                'end': (week3 + timedelta(hours=3)).isoformat()}
+        response = self.client.get(reverse('event-conflicts'), slot)
+        conflicts = response.data['conflicts']
+        self.assertEqual([c['id'] for c in conflicts], [series.id])
+        self.assertEqual(conflicts[0]['start'], week3)
+
+        with self.assertNumQueries(2):
+            results = self.client.post(reverse('event-conflicts'), {'slots': [slot]}, format='json').data['results']
+        self.assertEqual([c['id'] for c in results[0]['conflicts']], [series.id])
+
+    def test_cancelled_occurrence_does_not_conflict(self):
+        series = self._weekly_series()
+        week3 = series.start + timedelta(weeks=2)
+        series.exceptions.create(original_start=week3, is_cancelled=True)
+        slot = {'location': 'Seminar Hall', 'start': week3.isoformat(), 'end': (week3 + timedelta(hours=1)).isoformat()}
+        response = self.client.get(reverse('event-conflicts'), slot)
+        self.assertEqual(response.data['conflicts'], [])
+
+    def test_occurrence_moved_into_room_conflicts(self):
+        series = self._weekly_series()
+        week3 = series.start + timedelta(weeks=2)
+        series.exceptions.create(original_start=week3, location='CS Lab 2')
+        slot = {'location': 'cs lab 2', 'start': week3.isoformat(), 'end': (week3 + timedelta(hours=1)).isoformat()}
+        with self.assertNumQueries(2):
+            results = self.client.post(reverse('event-conflicts'), {'slots': [slot]}, format='json').data['results']
+        conflicts = results[0]['conflicts']
+        self.assertEqual([c['id'] for c in conflicts], [series.id])
+        self.assertEqual(conflicts[0]['location'], 'CS Lab 2')
+
+        # The series' own room is free for that week
+        slot['location'] = 'Seminar Hall'
+        self.assertEqual(self.client.get(reverse('event-conflicts'), slot).data['conflicts'], [])
+
+    @override_settings(EVENT_ENFORCE_LOCATION_CONFLICTS=True)
+    def test_enforcement_rejects_booking_over_series_occurrence(self):
+        series = self._weekly_series()
+        week3 = series.start + timedelta(weeks=2)
+        response = self.client.post(reverse('event-list'), {
+            'title': 'One-off', 'location': 'Seminar Hall',
+            'start': (week3 + timedelta(hours=1)).isoformat(), 'end': (week3 + timedelta(hours=3)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecurrenceExpansionTests(TestCase):
+    """Test RRULE parsing and lazy expansion."""
+
+    def setUp(self):
+        import pytz
+        self.utc = pytz.UTC
+        # Monday 2026-03-02 18:00 IST
+        self.start = self.utc.localize(datetime(2026, 3, 2, 12, 30))
+        self.end = self.start + timedelta(hours=1)
+
+    def test_rejects_unsupported_rules(self):
+        from events.recurrence import parse_rule
+        for rule in ['FREQ=YEARLY', 'FREQ=DAILY;BYHOUR=9', 'FREQ=DAILY;COUNT=2;UNTIL=20260401', 'FREQ=DAILY;COUNT=0']:
+            with self.assertRaises(ValueError):
+                parse_rule(rule)
+
+    def test_weekly_byday_with_count(self):
+        from events.recurrence import occurrence_starts
+        window_end = self.start + timedelta(days=60)
+        starts = occurrence_starts('FREQ=WEEKLY;BYDAY=MO,WE;COUNT=5', self.start, self.end, self.start, window_end)
+        self.assertEqual(
+            [s.date().isoformat() for s in starts],
+            ['2026-03-02', '2026-03-04', '2026-03-09', '2026-03-11', '2026-03-16'],
+        )
+
+    def test_window_far_into_series_skips_ahead(self):
+        from events.recurrence import occurrence_starts
+        window_start = self.start + timedelta(days=7 * 520)
+        starts = occurrence_starts(
+            'FREQ=WEEKLY', self.start, self.end, window_start, window_start + timedelta(days=13)
+        )
+        self.assertEqual(len(starts), 2)
+        self.assertTrue(all(s.weekday() == 0 for s in starts))
+
+    def test_monthly_skips_short_months(self):
+        from events.recurrence import occurrence_starts
+        start = self.utc.localize(datetime(2026, 1, 31, 12, 30))
+        starts = occurrence_starts(
+            'FREQ=MONTHLY;COUNT=3', start, start + timedelta(hours=1), start, start + timedelta(days=200)
+        )
+        self.assertEqual([s.month for s in starts], [1, 3, 5])
+
+    def test_expansion_is_capped(self):
+        from events.recurrence import occurrence_starts, MAX_OCCURRENCES_PER_WINDOW
+        starts = occurrence_starts(
+            'FREQ=DAILY', self.start, self.end, self.start, self.start + timedelta(days=5000)
+        )
+        self.assertEqual(len(starts), MAX_OCCURRENCES_PER_WINDOW)
+
+
+class RecurringEventAPITests(TestCase):
+    """Test recurring events through the list, feed and exceptions endpoints."""
+
+    def setUp(self):
+        import pytz
+        self.client = APIClient()
+        self.club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.user = User.objects.create_user(
+            email='member@example.com',
+            username='member',
+            password='Pass123!',
+            club=self.club,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.start = pytz.UTC.localize(datetime(2026, 3, 2, 12, 30))
+        self.series = Event.objects.create(
+            title='Weekly Meetup', start=self.start, end=self.start + timedelta(hours=1),
+            location='Room 1', club=self.club, created_by=self.user,
+            recurrence_rule='FREQ=WEEKLY;COUNT=10',
+        )
+        # Window covering weeks 4-6 of the series
+        self.params = {
+            'start': (self.start + timedelta(days=20)).isoformat(),
+            'end': (self.start + timedelta(days=36)).isoformat(),
+        }
+
+    def test_series_end_is_stored(self):
+        self.assertEqual(self.series.recurrence_until, self.start + timedelta(weeks=9, hours=1))
+
+    def test_list_expands_occurrences_in_window(self):
+        response = self.client.get(reverse('event-list'), self.params)
+        results = response.data['results']
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(r['id'] == str(self.series.id) for r in results))
+        self.assertEqual(results[0]['occurrence_start'], results[0]['start'])
+
+    def test_date_only_window_expands_occurrences(self):
+        params = {
+            'start': (self.start + timedelta(days=20)).date().isoformat(),
+            'end': (self.start + timedelta(days=36)).date().isoformat(),
+        }
+        response = self.client.get(reverse('event-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        response = self.client.get(reverse('event-feed'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['events']), 3)
+
+    def test_finished_series_not_returned(self):
+        params = {
+            'start': (self.start + timedelta(weeks=20)).isoformat(),
+            'end': (self.start + timedelta(weeks=22)).isoformat(),
+        }
+        response = self.client.get(reverse('event-list'), params)
+        self.assertEqual(response.data['results'], [])
+
+    def test_exceptions_cancel_and_move_occurrences(self):
+        week4 = self.start + timedelta(weeks=3)
+        week5 = self.start + timedelta(weeks=4)
+        url = reverse('event-exceptions', args=[self.series.id])
+        response = self.client.post(url, {'original_start': week4.isoformat(), 'is_cancelled': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.post(url, {
+            'original_start': week5.isoformat(),
+            'start': (week5 + timedelta(hours=2)).isoformat(),
+            'location': 'Main Hall',
+        }, format='json')
+
+        events = self.client.get(reverse('event-feed'), self.params).data['events']
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]['start'], week5 + timedelta(hours=2))
+        self.assertEqual(events[0]['location'], 'Main Hall')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"{url}?original_start={week4.isoformat().replace('+', '%2B')}")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(len(self.client.get(reverse('event-feed'), self.params).data['events']), 3)
+
+    def test_exception_must_match_an_occurrence(self):
+        response = self.client.post(
+            reverse('event-exceptions', args=[self.series.id]),
+            {'original_start': (self.start + timedelta(days=1)).isoformat(), 'is_cancelled': True},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_rule_rejected(self):
+        response = self.client.post(reverse('event-list'), {
+            'title': 'Bad Series',
+            'start': self.start.isoformat(),
+            'end': (self.start + timedelta(hours=1)).isoformat(),
+            'location': 'Room 2',
+            'recurrence_rule': 'FREQ=WEEKLY;BYDAY=TU',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ICalendarFeedTests(TestCase):
+    """Test the streaming iCalendar feeds."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.other = Club.objects.create(slug='art', name='Art, Design & Media', color='#10B981')
+        self.user = User.objects.create_user(
+            email='member@example.com',
+            username='member',
+            password='Pass123!',
+            club=self.club,
+        )
+        now = timezone.now()
+        self.event = Event.objects.create(
+            title='Hackathon; Day 1', description='Bring a laptop,\nand snacks',
+            start=now + timedelta(days=1), end=now + timedelta(days=1, hours=8),
+            location='CS Lab 2', club=self.club, created_by=self.user,
+        )
+        Event.objects.create(
+            title='Sketch Night', start=now + timedelta(days=2), end=now + timedelta(days=2, hours=2),
+            location='Studio', club=self.other, created_by=self.user,
+        )
+        Event.objects.create(
+            title='Old Meetup', start=now - timedelta(days=400), end=now - timedelta(days=400, hours=-1),
+            location='Room 1', club=self.club, created_by=self.user,
+        )
+
+    def _body(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_requires_authentication(self):
+        response = self.client.get(reverse('event-ics-feed'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_club_feed_streams_events(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('event-ics-feed'), {'clubs': str(self.club.id)}, HTTP_ACCEPT='text/calendar')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = self._body(response)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn(f'UID:{self.event.id}@', body)
+        self.assertIn('SUMMARY:Hackathon\; Day 1', body)
+        self.assertIn('DESCRIPTION:Bring a laptop\\,\\nand snacks', body)
+        self.assertIn('CATEGORIES:CS Club', body)
+        self.assertNotIn('Sketch Night', body)
+        self.assertNotIn('Old Meetup', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_unchanged_feed_returns_304(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('event-ics-feed'))
+        etag = response['ETag']
+        self._body(response)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('event-ics-feed'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(reverse('event-ics-feed'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.event.title = 'Hackathon (moved)'
+        self.event.save()
+        response = self.client.get(reverse('event-ics-feed'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deletion_changes_etag(self):
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(reverse('event-ics-feed'))['ETag']
+        self.event.delete()
+        self.assertNotEqual(self.client.get(reverse('event-ics-feed'))['ETag'], etag)
+
+    def test_personal_feed_with_token(self):
+        self.client.force_authenticate(user=self.user)
+        url = self.client.get(reverse('event-ics-link')).data['url']
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = self._body(response)
+        self.assertIn('Hackathon', body)
+        self.assertNotIn('Sketch Night', body)
+
+    def test_personal_feed_rejects_bad_token(self):
+        response = self.client.get(reverse('event-ics-user-feed', kwargs={'token': 'MQ:forged'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rotating_link_revokes_old_feed_url(self):
+        self.client.force_authenticate(user=self.user)
+        old_url = self.client.get(reverse('event-ics-link')).data['url']
+        response = self.client.post(reverse('event-ics-link'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        new_url = response.data['url']
+        self.assertNotEqual(new_url, old_url)
+        self.client.force_authenticate(user=None)
+
+        self.assertEqual(self.client.get(old_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(new_url).status_code, status.HTTP_200_OK)
+
+    def test_feed_describes_its_timezone(self):
+        self.client.force_authenticate(user=self.user)
+        body = self._body(self.client.get(reverse('event-ics-feed')))
+        self.assertEqual(body.count('BEGIN:VTIMEZONE'), 1)
+        self.assertIn(
+            'BEGIN:VTIMEZONE\r\nTZID:Asia/Kolkata\r\nBEGIN:STANDARD\r\nDTSTART:19700101T000000\r\n'
+            'TZOFFSETFROM:+0530\r\nTZOFFSETTO:+0530\r\nTZNAME:IST\r\nEND:STANDARD\r\nEND:VTIMEZONE\r\n',
+            body,
+        )
+
+    @override_settings(EVENT_RECURRENCE_TIMEZONE='America/New_York')
+    def test_timezone_with_dst_lists_its_transitions(self):
+        self.client.force_authenticate(user=self.user)
+        body = self._body(self.client.get(reverse('event-ics-feed')))
+        self.assertIn('TZID:America/New_York', body)
+        self.assertIn('BEGIN:DAYLIGHT\r\n', body)
+        self.assertIn('TZOFFSETFROM:-0500\r\nTZOFFSETTO:-0400\r\nTZNAME:EDT', body)
+        self.assertIn('TZOFFSETFROM:-0400\r\nTZOFFSETTO:-0500\r\nTZNAME:EST', body)
+
+    def test_recurring_series_with_exceptions(self):
+        from events.models import EventOccurrenceException
+        series = Event.objects.create(
+            title='Weekly Sync', start=self.event.start, end=self.event.start + timedelta(hours=1),
+            location='Room 3', club=self.club, created_by=self.user,
+            recurrence_rule='FREQ=WEEKLY;UNTIL=20991231',
+        )
+        EventOccurrenceException.objects.create(
+            event=series, original_start=series.start + timedelta(weeks=1), is_cancelled=True,
+        )
+        EventOccurrenceException.objects.create(
+            event=series, original_start=series.start + timedelta(weeks=2), location='Main Hall',
+        )
+        self.client.force_authenticate(user=self.user)
+        body = self._body(self.client.get(reverse('event-ics-feed')))
+        self.assertIn('RRULE:FREQ=WEEKLY;UNTIL=20991231T235959Z', body)
+        self.assertEqual(body.count('EXDATE;TZID=Asia/Kolkata:'), 1)
+        self.assertEqual(body.count('RECURRENCE-ID;TZID=Asia/Kolkata:'), 1)
+        self.assertIn('LOCATION:Main Hall', body)
+
+
+class EventExportTests(TestCase):
+    """Test the streaming CSV/PDF export and background export jobs."""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        self.client = APIClient()
+        self.parent = Club.objects.create(slug='tech', name='Tech Society', color='#3B82F6')
+        self.club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6', parent=self.parent)
+        self.partner = Club.objects.create(slug='art', name='Art Club', color='#10B981')
+        self.user = User.objects.create_user(
+            email='member@example.com',
+            username='member',
+            password='Pass123!',
+            club=self.parent,
+            timezone='UTC',
+            time_format='24h',
+        )
+        self.client.force_authenticate(user=self.user)
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        for i in range(3):
+            event = Event.objects.create(
+                title=f'=Session {i}', start=self.start + timedelta(days=i), end=self.start + timedelta(days=i, hours=2),
+                location='CS Lab 2', club=self.club, created_by=self.user,
+            )
+        event.collaborating_clubs.add(self.partner)
+        self.params = {
+            'start': (self.start - timedelta(days=1)).isoformat(),
+            'end': (self.start + timedelta(days=10)).isoformat(),
+        }
+        self.export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_root, True)
+
+    def _body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv_export_streams_all_rows(self):
+        import csv
+        import io
+        response = self.client.get(reverse('event-export'), self.params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(self._body(response).decode('utf-8-sig'))))
+        self.assertEqual(rows[0][:3], ['Title', 'Start', 'End'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][0], "'=Session 0")
+        self.assertEqual(rows[1][4:6], ['Tech Society', 'CS Club'])
+        self.assertEqual(rows[3][6], 'Art Club')
+
+    def test_csv_export_expands_recurring_series(self):
+        Event.objects.create(
+            title='Standup', start=self.start, end=self.start + timedelta(minutes=15),
+            location='Online', club=self.partner, created_by=self.user,
+            recurrence_rule='FREQ=DAILY;COUNT=4',
+        )
+        response = self.client.get(reverse('event-export'), {**self.params, 'clubs': str(self.partner.id)})
+        lines = self._body(response).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(all(line.startswith('Standup') for line in lines[1:]))
+
+    def test_pdf_export(self):
+        response = self.client.get(reverse('event-export'), {**self.params, 'format': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        body = self._body(response)
+        self.assertTrue(body.startswith(b'%PDF-1.4'))
+        self.assertTrue(body.rstrip().endswith(b'%%EOF'))
+        self.assertIn(b'(=Session 2) Tj', body)
+        # The xref offset must point at the xref table
+        startxref = int(body.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+        self.assertTrue(body[startxref:].startswith(b'xref'))
+
+    def test_pdf_export_paginates(self):
+        from events.export import ROWS_PER_PAGE
+        Event.objects.bulk_create([
+            Event(title=f'Bulk {i}', start=self.start, end=self.start + timedelta(hours=1),
+                  location='Hall', club=self.club, created_by=self.user)
+            for i in range(ROWS_PER_PAGE)
+        ])
+        body = self._body(self.client.get(reverse('event-export'), {**self.params, 'format': 'pdf'}))
+        self.assertIn(b'/Count 2', body)
+
+    def test_export_requires_range(self):
+        response = self.client.get(reverse('event-export'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_large_export_runs_as_job(self):
+        from events.tasks import generate_event_export
+        with self.settings(EVENT_EXPORT_MAX_SYNC_ROWS=2, EVENT_EXPORT_ROOT=self.export_root):
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.get(reverse('event-export'), self.params)
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(len(callbacks), 1)
+            status_url = response['Location']
+            job_id = response.json()['id']
+
+            response = self.client.get(status_url)
+            self.assertEqual(response.data['status'], 'pending')
+            response = self.client.get(reverse('event-export-download', kwargs={'export_id': job_id}))
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+            generate_event_export(job_id)
+            response = self.client.get(status_url)
+            self.assertEqual(response.data['status'], 'ready')
+            self.assertEqual(response.data['row_count'], 3)
+
+            response = self.client.get(response.data['download_url'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(b''.join(response.streaming_content).decode('utf-8-sig').count('\n'), 4)
+
+    def test_export_jobs_are_private(self):
+        from events.models import EventExport
+        other = User.objects.create_user(email='other@example.com', username='other', password='Pass123!')
+        job = EventExport.objects.create(
+            requested_by=other, format='csv', range_start=self.start, range_end=self.start + timedelta(days=1),
+        )
+        response = self.client.get(reverse('event-export-status', kwargs={'export_id': job.id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkEventTests(TestCase):
+    """Test the bulk create/update/delete endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.sub = Club.objects.create(slug='cs-ai', name='AI Group', color='#3B82F6', parent=self.club)
+        self.other = Club.objects.create(slug='art', name='Art Club', color='#10B981')
+        self.user = User.objects.create_user(
+            email='member@example.com',
+            username='member',
+            password='Pass123!',
+            club=self.club,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.event = Event.objects.create(
+            title='Existing', start=self.start, end=self.start + timedelta(hours=1),
+            location='Room 1', club=self.club, created_by=self.user,
+        )
+        self.foreign = Event.objects.create(
+            title='Foreign', start=self.start, end=self.start + timedelta(hours=1),
+            location='Studio', club=self.other, created_by=self.user,
+        )
+
+    def _create_op(self, i, **extra):
+        return {'op': 'create', 'data': {
+            'title': f'Lecture {i}',
+            'start': (self.start + timedelta(days=i)).isoformat(),
+            'end': (self.start + timedelta(days=i, hours=1)).isoformat(),
+            'location': 'Hall A',
+            **extra,
+        }}
+
+    def test_bulk_create_with_constant_queries(self):
+        operations = [self._create_op(i, collaborating_club_ids=[self.other.id]) for i in range(20)]
+        operations[3]['data']['club_id'] = self.sub.id
+        # Club access, referenced clubs, two savepoint pairs (request, apply) and two
+        # inserts; independent of batch size
+        with self.assertNumQueries(8):
+            response = self.client.post(reverse('event-bulk'), {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['applied'])
+        self.assertTrue(all(r['status'] == 'created' for r in response.data['results']))
+
+        created = Event.objects.filter(title__startswith='Lecture')
+        self.assertEqual(created.count(), 20)
+        self.assertEqual(created.filter(club=self.sub).count(), 1)
+        self.assertEqual(created.first().location_key, 'hall a')
+        self.assertEqual(Event.collaborating_clubs.through.objects.filter(club=self.other).count(), 20)
+
+    def test_mixed_operations(self):
+        operations = [
+            self._create_op(1),
+            {'op': 'update', 'id': str(self.event.id), 'data': {
+                'location': 'Room 2', 'collaborating_club_ids': [self.other.id],
+            }},
+        ]
+        extra = Event.objects.create(
+            title='To delete', start=self.start, end=self.start + timedelta(hours=1),
+            location='Room 3', club=self.sub, created_by=self.user,
+        )
+        operations.append({'op': 'delete', 'id': str(extra.id)})
+        response = self.client.post(reverse('event-bulk'), {'operations': operations}, format='json')
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'updated', 'deleted'])
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.location, 'Room 2')
+        self.assertEqual(self.event.location_key, 'room 2')
+        self.assertEqual(list(self.event.collaborating_clubs.all()), [self.other])
+        self.assertFalse(Event.objects.filter(pk=extra.pk).exists())
+        from events.models import EventTombstone
+        self.assertTrue(EventTombstone.objects.filter(event_id=extra.pk).exists())
+
+    def test_batch_is_all_or_nothing(self):
+        operations = [
+            self._create_op(1),
+            {'op': 'update', 'id': str(self.foreign.id), 'data': {'title': 'Hijacked'}},
+            self._create_op(2, collaborating_club_ids=[999]),
+            {'op': 'delete', 'id': str(self.event.id)},
+            {'op': 'delete', 'id': str(self.event.id)},
+            {'op': 'explode'},
+        ]
+        response = self.client.post(reverse('event-bulk'), {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.data['applied'])
+        self.assertEqual(
+            [r['status'] for r in response.data['results']],
+            ['valid', 'error', 'error', 'valid', 'error', 'error'],
+        )
+        self.assertFalse(Event.objects.filter(title__startswith='Lecture').exists())
+        self.assertTrue(Event.objects.filter(pk=self.event.pk).exists())
+
+    def test_create_for_foreign_club_denied(self):
+        response = self.client.post(
+            reverse('event-bulk'), {'operations': [self._create_op(1, club_id=self.other.id)]}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('club_id', response.data['results'][0]['errors'])
+
+    @override_settings(EVENT_BULK_MAX_OPERATIONS=2)
+    def test_operation_limit(self):
+        operations = [self._create_op(i) for i in range(3)]
+        response = self.client.post(reverse('event-bulk'), {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('operations', response.data['detail'])
+
+    @override_settings(EVENT_ENFORCE_LOCATION_CONFLICTS=True)
+    def test_conflicts_within_batch(self):
+        operations = [self._create_op(1), self._create_op(1)]
+        response = self.client.post(reverse('event-bulk'), {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('location', response.data['results'][1]['errors'])
+
+    def test_bulk_create_invalidates_cache(self):
+        params = {
+            'start': (self.start - timedelta(days=1)).isoformat(),
+            'end': (self.start + timedelta(days=5)).isoformat(),
+        }
+        self.assertEqual(len(self.client.get(reverse('event-feed'), params).data['events']), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('event-bulk'), {'operations': [self._create_op(1)]}, format='json')
+        self.assertEqual(len(self.client.get(reverse('event-feed'), params).data['events']), 3)
+
+
+class ClubAccessTests(TestCase):
+    """Test the per-request ClubAccess resolver."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.main = Club.objects.create(slug='tech', name='Tech Society', color='#3B82F6')
+        self.sub = Club.objects.create(slug='tech-ai', name='AI Group', color='#3B82F6', parent=self.main)
+        self.extra = Club.objects.create(slug='music', name='Music Club', color='#F59E0B')
+        self.other = Club.objects.create(slug='art', name='Art Club', color='#10B981')
+        self.user = User.objects.create_user(
+            email='lead@example.com', username='lead', password='Pass123!', club=self.main,
+        )
+        self.user.extra_clubs.add(self.extra)
+        start = timezone.now() + timedelta(days=1)
+        self.event = Event.objects.create(
+            title='AI Meetup', start=start, end=start + timedelta(hours=1),
+            location='Lab 1', club=self.sub, created_by=self.user,
+        )
+
+    def test_resolves_writable_set_in_one_query(self):
+        from events.access import ClubAccess
+        access = ClubAccess(self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(access.writable_club_ids, {self.main.id, self.sub.id, self.extra.id})
+            self.assertEqual(access.extra_club_ids, [self.extra.id])
+            self.assertTrue(access.can_write(self.sub.id))
+            self.assertFalse(access.can_write(self.other.id))
+
+    def test_sub_club_role_excludes_siblings(self):
+        from events.access import ClubAccess
+        self.user.sub_club = self.sub
+        self.user.save()
+        sibling = Club.objects.create(slug='tech-web', name='Web Group', color='#3B82F6', parent=self.main)
+        access = ClubAccess(self.user)
+        self.assertEqual(access.writable_club_ids, {self.sub.id, self.extra.id})
+        self.assertFalse(access.can_write(sibling.id))
+        self.assertEqual(access.default_club_id(), self.sub.id)
+
+    def test_deeper_hierarchy_costs_one_query(self):
+        from events.access import ClubAccess
+        chapter = Club.objects.create(slug='tech-ai-ml', name='ML Chapter', color='#3B82F6', parent=self.sub)
+        access = ClubAccess(self.user)
+        with self.assertNumQueries(1):
+            self.assertTrue(access.can_write(chapter.id))
+        self.user.sub_club = self.sub
+        self.user.save()
+        self.assertEqual(ClubAccess(self.user).writable_club_ids, {self.sub.id, chapter.id, self.extra.id})
+
+    def test_extra_only_user_defaults_to_first_extra_club(self):
+        from events.access import ClubAccess
+        user = User.objects.create_user(email='x@example.com', username='x', password='Pass123!')
+        user.extra_clubs.add(self.extra, self.other)
+        access = ClubAccess(user)
+        self.assertTrue(access.has_any_club)
+        self.assertEqual(access.default_club_id(), self.other.id)  # 'Art Club' sorts first
+
+    def test_memoized_per_request(self):
+        from events.access import ClubAccess
+        from types import SimpleNamespace
+        request = SimpleNamespace(user=self.user)
+        with self.assertNumQueries(1):
+            first = ClubAccess.for_request(request)
+            first.can_write(self.sub.id)
+            self.assertIs(ClubAccess.for_request(request), first)
+            ClubAccess.for_request(request).can_write(self.other.id)
+
+    def test_patch_access_check_is_constant(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('event-detail', args=[self.event.id])
+        # Includes the savepoint pair of the booking transaction
+        with self.assertNumQueries(10):
+            response = self.client.patch(url, {'title': 'AI Meetup #2'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # More extra clubs do not add queries
+        for i in range(5):
+            self.user.extra_clubs.add(Club.objects.create(slug=f'x{i}', name=f'Extra {i}'))
+        with self.assertNumQueries(10):
+            self.client.patch(url, {'title': 'AI Meetup #3'}, format='json')
+
+    def test_delete_outside_writable_set_denied(self):
+        start = timezone.now() + timedelta(days=2)
+        foreign = Event.objects.create(
+            title='Gallery', start=start, end=start + timedelta(hours=1),
+            location='Studio', club=self.other, created_by=self.user,
+        )
+        self.client.force_authenticate(user=self.user)
+        response = self.client.delete(reverse('event-detail', args=[foreign.id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
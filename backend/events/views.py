@@ -1,20 +1,54 @@
 import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework import viewsets, permissions, status
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from django.utils.dateparse import parse_datetime
-from .models import Event
-from .serializers import EventSerializer, EventCreateSerializer
+from .models import Event, EventExport, EventTombstone, EventOccurrenceException
+from . import cache as response_cache
+from .access import ClubAccess
+from .bulk import BulkEventProcessor, BulkRequestSerializer
+from .conflicts import find_conflicts, check_slots, lock_rooms
+from .feed import build_event_feed
+from . import ics
+from .export import export_queryset, get_export_storage, iter_export, iter_export_rows
+from .serializers import (
+    EventSerializer, EventCreateSerializer, ConflictSlotSerializer, ConflictCheckSerializer,
+    EventOccurrenceExceptionSerializer, ExportRangeSerializer, EventExportSerializer, expand_recurring,
+)
+from .renderers import ICalendarRenderer, CSVRenderer, PDFRenderer
 from .permissions import IsClubMemberOrReadOnly, IsSameClubMember
+from clubs import tree as club_tree
+from notifications import urgent
 
 logger = logging.getLogger(__name__)
 
 
+def _make_aware(value):
+    if timezone.is_naive(value):
+        return timezone.make_aware(value)
+    return value
+
+
 class EventViewSet(viewsets.ModelViewSet):
     """
     ViewSet for Event CRUD operations with club-based permissions.
     """
-    queryset = Event.objects.select_related('club', 'created_by').prefetch_related('collaborating_clubs').all()
+    queryset = (
+        Event.objects
+        .select_related('club__parent', 'created_by')
+        .prefetch_related('collaborating_clubs', 'exceptions')
+        .all()
+    )
     permission_classes = [permissions.IsAuthenticated, IsClubMemberOrReadOnly, IsSameClubMember]
     
     def get_serializer_class(self):
@@ -33,40 +67,429 @@ class EventViewSet(viewsets.ModelViewSet):
         # Re-serialize with the full read serializer so id/club are included
         output = EventSerializer(serializer.instance, context=self.get_serializer_context())
         return Response(output.data, status=status.HTTP_201_CREATED)
-    
-    def get_queryset(self):
+
+    def _get_date_range(self):
         """
-        Filter events by date range if provided in query params.
+        Parse the `start`/`end` query params.
+        Returns aware (start_dt, end_dt), or (None, None) if either is missing or invalid.
+        Dates and naive datetimes are taken in the current timezone.
         """
-        queryset = super().get_queryset()
-        
-        # Get query parameters
         start_param = self.request.query_params.get('start', None)
         end_param = self.request.query_params.get('end', None)
-        club_ids = self.request.query_params.get('clubs', None)
-        
-        # Filter by date range (for calendar view)
+
         if start_param and end_param:
             try:
                 start_dt = parse_datetime(start_param)
                 end_dt = parse_datetime(end_param)
-                
                 if start_dt and end_dt:
-                    # Query events that overlap with the date range
-                    queryset = queryset.filter(
-                        start__lte=end_dt,
-                        end__gte=start_dt
-                    )
+                    return _make_aware(start_dt), _make_aware(end_dt)
             except (ValueError, TypeError):
-                logger.warning("Invalid date params: start=%s, end=%s", start_param, end_param)
-        
-        # Filter by club IDs
+                pass
+            logger.warning("Invalid date params: start=%s, end=%s", start_param, end_param)
+        return None, None
+
+    def _get_club_ids(self, param='clubs'):
+        """Parse a comma-separated club ID query param (`clubs` by default) into a list of IDs."""
+        club_ids = self.request.query_params.get(param, None)
+        if not club_ids:
+            return []
+        return [int(cid) for cid in club_ids.split(',') if cid.isdigit()]
+
+    def _get_club_filter(self):
+        """
+        Club IDs the list is filtered on, and whether the filter is hierarchical.
+
+        `clubs` matches events organized by exactly those clubs (no IDs: all
+        clubs). `club_tree` makes the filter hierarchical: its IDs are expanded
+        to every club below them from the cached hierarchy, `clubs` IDs are
+        added as they are, and events co-organized by any of them match too.
+        A main club's whole calendar is then `?club_tree=<id>`, however many
+        sub-clubs it has.
+        """
+        if 'club_tree' not in self.request.query_params:
+            return self._get_club_ids(), False
+        club_ids = club_tree.expand(self._get_club_ids('club_tree')) | set(self._get_club_ids())
+        return sorted(club_ids), True
+
+    def _filter_clubs(self, queryset):
+        club_ids, hierarchical = self._get_club_filter()
+        if hierarchical:
+            # EXISTS on the (event, club) unique index instead of a JOIN that
+            # would need DISTINCT
+            collaborations = Event.collaborating_clubs.through.objects.filter(
+                event_id=OuterRef('pk'), club_id__in=club_ids,
+            )
+            return queryset.filter(Q(club_id__in=club_ids) | Exists(collaborations))
         if club_ids:
-            club_id_list = [int(cid) for cid in club_ids.split(',') if cid.isdigit()]
-            if club_id_list:
-                queryset = queryset.filter(club_id__in=club_id_list)
-        
+            return queryset.filter(club_id__in=club_ids)
         return queryset
+
+    def _get_response_cache_key(self, kind):
+        """
+        Cache key for a range payload, or None if the request is not cacheable
+        (caching disabled or unavailable, or query params beyond
+        start/end/clubs/club_tree/page).
+        """
+        if not response_cache.is_enabled():
+            return None
+        if set(self.request.query_params) - {'start', 'end', 'clubs', 'club_tree', 'page'}:
+            return None
+        start_dt, end_dt = self._get_date_range()
+        # Expanded IDs: every club whose events (or collaborations) can
+        # appear invalidates the entry
+        club_ids, hierarchical = self._get_club_filter()
+        return response_cache.build_cache_key(
+            kind, start_dt, end_dt, club_ids,
+            extra={
+                'tree': hierarchical,
+                'page': self.request.query_params.get('page'),
+                'host': self.request.get_host(),
+            },
+        )
+    
+    def get_queryset(self):
+        """
+        Filter events by date range if provided in query params.
+        """
+        queryset = super().get_queryset()
+        
+        # Filter by date range (for calendar view)
+        start_dt, end_dt = self._get_date_range()
+        if start_dt and end_dt:
+            # Query events that overlap with the date range
+            queryset = queryset.overlapping(start_dt, end_dt)
+        
+        # Filter by club IDs
+        return self._filter_clubs(queryset)
+
+    def _list_payload(self):
+        """
+        (Paginated) list data. Within a start/end window, recurring series are
+        expanded into their occurrences; without one they are returned as stored.
+        Page size counts stored rows, so an expanded page may hold more items.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        events = page if page is not None else list(queryset)
+        data = self.get_serializer(events, many=True).data
+
+        start_dt, end_dt = self._get_date_range()
+        if start_dt and end_dt:
+            data = expand_recurring(events, data, start_dt, end_dt)
+
+        if page is not None:
+            return self.get_paginated_response(data).data
+        return data
+
+    def list(self, request, *args, **kwargs):
+        """
+        Serve range queries from the response cache when possible.
+        """
+        cache_key = self._get_response_cache_key('list')
+        if cache_key is None:
+            return Response(self._list_payload())
+        return Response(response_cache.get_or_build(cache_key, self._list_payload))
+
+    @action(detail=False, methods=['get'])
+    def feed(self, request):
+        """
+        Compact calendar feed for a date window (`start` and `end` are required).
+        Events carry plain club IDs; clubs are side-loaded once in a `clubs` map.
+        """
+        start_dt, end_dt = self._get_date_range()
+        if not (start_dt and end_dt):
+            raise ValidationError({"detail": "Valid start and end query parameters are required."})
+
+        def build():
+            return build_event_feed(self.get_queryset(), window=(start_dt, end_dt))
+
+        cache_key = self._get_response_cache_key('feed')
+        if cache_key is None:
+            return Response(build())
+        return Response(response_cache.get_or_build(cache_key, build))
+
+    @action(detail=True, methods=['post', 'delete'])
+    def exceptions(self, request, pk=None):
+        """
+        Cancel or override a single occurrence of a recurring event (POST), or
+        restore it (DELETE with `original_start` in the query string).
+        """
+        event = self.get_object()
+
+        if request.method == 'DELETE':
+            original = parse_datetime(request.query_params.get('original_start') or '')
+            if original is None:
+                raise ValidationError({"original_start": "A valid original_start is required."})
+            EventOccurrenceException.objects.filter(event=event, original_start=original).delete()
+            # Touch the series so caches and delta-sync clients pick up the change
+            event.save(update_fields=['updated_at'])
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        serializer = EventOccurrenceExceptionSerializer(data=request.data, context={'event': event})
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.validated_data)
+        original = data.pop('original_start')
+        exception, _ = EventOccurrenceException.objects.update_or_create(
+            event=event, original_start=original, defaults=data,
+        )
+        event.save(update_fields=['updated_at'])
+        logger.info("Occurrence %s of event %s changed by %s", original.isoformat(), event.id, request.user.email)
+        return Response(EventOccurrenceExceptionSerializer(exception, context={'event': event}).data)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Delta sync: events created or updated after the `since` watermark, plus
+        tombstones for events deleted since then, and a new watermark.
+        Honors the `clubs`/`club_tree` filter but not the date window, so events
+        moved out of a client's visible range still reach it.
+        """
+        since_param = request.query_params.get('since')
+        try:
+            since = parse_datetime(since_param) if since_param else None
+        except ValueError:
+            since = None
+        if since is None:
+            raise ValidationError({"since": "A valid ISO-8601 watermark is required."})
+        # A watermark without an offset is taken in the current timezone
+        since = _make_aware(since)
+
+        watermark = timezone.now()
+        retention = timedelta(days=settings.EVENT_TOMBSTONE_RETENTION_DAYS)
+        if since < watermark - retention:
+            return Response(
+                {"error": "Watermark is older than the deletion log; reload the full range."},
+                status=status.HTTP_410_GONE,
+            )
+
+        # Re-read a small overlap so rows committed just after a previous
+        # watermark was taken are not missed; clients upsert by id.
+        since = since - timedelta(seconds=settings.EVENT_SYNC_OVERLAP_SECONDS)
+
+        queryset = Event.objects.filter(updated_at__gt=since)
+        tombstones = EventTombstone.objects.filter(deleted_at__gt=since)
+        queryset = self._filter_clubs(queryset)
+        club_ids, hierarchical = self._get_club_filter()
+        # Tombstones do not record collaborators, so a hierarchical sync gets
+        # every deletion; clients ignore IDs they do not hold
+        if club_ids and not hierarchical:
+            tombstones = tombstones.filter(club_id__in=club_ids)
+
+        payload = build_event_feed(queryset)
+        payload['deleted'] = list(tombstones.values_list('event_id', flat=True).distinct())
+        payload['watermark'] = watermark
+        return Response(payload)
+
+    def _ics_response(self, queryset, name, club_ids=None):
+        """
+        Stream an iCalendar feed, or answer 304 when the client's
+        If-None-Match / If-Modified-Since still matches.
+        """
+        etag, last_modified = ics.feed_validators(queryset, club_ids)
+        etag = quote_etag(etag)
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request=self.request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = StreamingHttpResponse(
+                ics.iter_calendar(queryset, name, self.request.get_host()),
+                content_type='text/calendar; charset=utf-8',
+            )
+            response['Content-Disposition'] = 'inline; filename="calendar.ics"'
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='ics', renderer_classes=[ICalendarRenderer])
+    def ics_feed(self, request):
+        """
+        iCalendar feed of all events, or of the clubs in `?clubs=`.
+        """
+        club_ids = self._get_club_ids()
+        return self._ics_response(ics.feed_queryset(club_ids), 'CEAL Calendar', club_ids)
+
+    @action(
+        detail=False, methods=['get'], url_path=r'ics/(?P<token>[^/.]+)',
+        renderer_classes=[ICalendarRenderer],
+        authentication_classes=[], permission_classes=[permissions.AllowAny],
+    )
+    def ics_user_feed(self, request, token=None):
+        """
+        Personal iCalendar feed for calendar-app subscriptions, authenticated
+        by the signed token in the URL instead of a session.
+        Follows the user's clubs unless `?clubs=` narrows it.
+        """
+        from accounts.models import User
+
+        claims = ics.read_user_token(token)
+        user = None
+        if claims is not None:
+            user_id, version = claims
+            user = User.objects.filter(pk=user_id, ics_feed_version=version, is_active=True).first()
+        if user is None:
+            raise NotFound("Unknown calendar feed.")
+        club_ids = self._get_club_ids() or ics.user_club_ids(user)
+        return self._ics_response(ics.feed_queryset(club_ids), f'CEAL Calendar ({user.username})', club_ids)
+
+    @action(detail=False, methods=['get', 'post'], url_path='ics-link', permission_classes=[permissions.IsAuthenticated])
+    def ics_link(self, request):
+        """
+        Subscription URL of the current user's personal iCalendar feed.
+        POST issues a new URL and revokes every earlier one.
+        """
+        from accounts.models import User
+
+        user = request.user
+        if request.method == 'POST':
+            User.objects.filter(pk=user.pk).update(ics_feed_version=F('ics_feed_version') + 1)
+            user.refresh_from_db(fields=['ics_feed_version'])
+        token = ics.make_user_token(user)
+        return Response({"url": reverse('event-ics-user-feed', kwargs={'token': token}, request=request)})
+
+    @action(detail=False, methods=['get'], url_path='export', renderer_classes=[CSVRenderer, PDFRenderer])
+    def export(self, request):
+        """
+        CSV (default) or PDF (`?format=pdf`) export of every event in
+        `start`..`end`, optionally limited to `?clubs=`.
+        Ranges holding more than EVENT_EXPORT_MAX_SYNC_ROWS stored events are
+        generated by a Celery job instead: the response is a 202 whose
+        Location header points at the job status.
+        """
+        serializer = ExportRangeSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        start_dt, end_dt = serializer.validated_data['start'], serializer.validated_data['end']
+        export_format = request.accepted_renderer.format
+        club_ids = self._get_club_ids()
+        queryset = export_queryset(start_dt, end_dt, club_ids)
+
+        if queryset.count() > settings.EVENT_EXPORT_MAX_SYNC_ROWS:
+            from .tasks import generate_event_export
+
+            job = EventExport.objects.create(
+                requested_by=request.user, format=export_format,
+                range_start=start_dt, range_end=end_dt, club_ids=club_ids,
+            )
+            transaction.on_commit(lambda: generate_event_export.delay(str(job.id)))
+            logger.info("Event export %s queued by %s", job.id, request.user.email)
+            data = EventExportSerializer(job, context={'request': request}).data
+            response = JsonResponse(data, status=status.HTTP_202_ACCEPTED)
+            response['Location'] = reverse('event-export-status', kwargs={'export_id': job.id}, request=request)
+            return response
+
+        title = f"CEAL Calendar: {start_dt:%d %b %Y} - {end_dt:%d %b %Y}"
+        rows = iter_export_rows(queryset, start_dt, end_dt)
+        response = StreamingHttpResponse(
+            iter_export(export_format, rows, title, request.user),
+            content_type=request.accepted_renderer.media_type,
+        )
+        file_name = f"ceal-events-{start_dt:%Y%m%d}-{end_dt:%Y%m%d}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+        return response
+
+    def _get_export_job(self, export_id):
+        queryset = EventExport.objects.all()
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(requested_by=self.request.user)
+        job = queryset.filter(pk=export_id).first()
+        if job is None:
+            raise NotFound("Export not found.")
+        return job
+
+    @action(detail=False, methods=['get'], url_path=r'exports/(?P<export_id>[0-9a-f-]+)')
+    def export_status(self, request, export_id=None):
+        """
+        Status of a background export started by the export endpoint.
+        """
+        job = self._get_export_job(export_id)
+        return Response(EventExportSerializer(job, context={'request': request}).data)
+
+    @action(detail=False, methods=['get'], url_path=r'exports/(?P<export_id>[0-9a-f-]+)/download')
+    def export_download(self, request, export_id=None):
+        """
+        Download the file of a finished background export.
+        """
+        job = self._get_export_job(export_id)
+        if job.status != 'ready':
+            return Response({"error": "Export is not ready yet.", "status": job.status}, status=status.HTTP_409_CONFLICT)
+        storage = get_export_storage()
+        if not storage.exists(job.file_name):
+            raise NotFound("Export file has expired.")
+        file_name = f"ceal-events-{job.range_start:%Y%m%d}-{job.range_end:%Y%m%d}.{job.format}"
+        return FileResponse(storage.open(job.file_name, 'rb'), as_attachment=True, filename=file_name)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Apply up to EVENT_BULK_MAX_OPERATIONS create/update/delete operations
+        in one transaction: {"operations": [{"op": "create", "data": {...}},
+        {"op": "update", "id": ..., "data": {...}}, {"op": "delete", "id": ...}]}.
+        All-or-nothing: any invalid operation returns 400 and writes nothing.
+        Results are reported per operation, in input order.
+        """
+        serializer = BulkRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        processor = BulkEventProcessor(
+            request.user, serializer.validated_data['operations'], access=ClubAccess.for_request(request),
+        )
+        # One transaction, so the rooms locked by the conflict check stay
+        # locked until the batch is written
+        with transaction.atomic():
+            if not processor.validate():
+                return Response({"applied": False, "results": processor.results}, status=status.HTTP_400_BAD_REQUEST)
+            processor.apply()
+
+        counts = {}
+        for result in processor.results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        logger.info("Bulk event operations by %s: %s", request.user.email, counts)
+        return Response({"applied": True, "results": processor.results})
+
+    @action(detail=False, methods=['get', 'post'])
+    def conflicts(self, request):
+        """
+        Room double-booking check.
+        GET ?location=&start=&end=[&exclude=] checks a single slot;
+        POST {"slots": [...]} checks up to EVENT_CONFLICT_CHECK_MAX_SLOTS
+        proposed slots in one query, including clashes between the slots.
+        """
+        if request.method == 'GET':
+            serializer = ConflictSlotSerializer(data=request.query_params)
+            serializer.is_valid(raise_exception=True)
+            slot = serializer.validated_data
+            conflicts = find_conflicts(slot['location'], slot['start'], slot['end'], slot.get('exclude'))
+            return Response({"conflicts": conflicts})
+
+        serializer = ConflictCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({"results": check_slots(serializer.validated_data['slots'])})
+
+    def _enforce_location_conflicts(self, location, start, end, exclude_id=None):
+        """
+        Reject a booking that overlaps another event at the same location,
+        when EVENT_ENFORCE_LOCATION_CONFLICTS is enabled. Call inside the
+        transaction that writes the booking: the room stays locked until it
+        commits.
+        """
+        if not settings.EVENT_ENFORCE_LOCATION_CONFLICTS:
+            return
+        lock_rooms([location])
+        clashes = find_conflicts(location, start, end, exclude_id)
+        if clashes:
+            clash = clashes[0]
+            raise ValidationError({
+                "location": f"{location} is already booked for '{clash['title']}' "
+                            f"({clash['start'].isoformat()} – {clash['end'].isoformat()})."
+            })
+
+    @action(detail=False, methods=['get'], url_path='cache-stats', permission_classes=[permissions.IsAdminUser])
+    def cache_stats(self, request):
+        """
+        Hit/miss counters of the event response cache (staff only).
+        """
+        return Response(response_cache.get_stats())
     
     def perform_create(self, serializer):
         """
@@ -76,6 +499,7 @@ class EventViewSet(viewsets.ModelViewSet):
         Saves collaborating_club_ids as the collaborating_clubs M2M relation.
         """
         user = self.request.user
+        access = ClubAccess.for_request(self.request)
 
         # Pop optional fields from validated data before saving
         club_id = serializer.validated_data.pop('club_id', None)
@@ -83,66 +507,37 @@ class EventViewSet(viewsets.ModelViewSet):
 
         from clubs.models import Club as ClubModel
 
-        # Collect all club IDs the user legitimately has write-access to
-        extra_club_ids = list(user.extra_clubs.values_list('id', flat=True))
-
-        if user.is_superuser:
-            if not club_id:
-                raise PermissionDenied("Superusers must specify a club_id when creating events.")
-            try:
-                club = ClubModel.objects.get(pk=club_id)
-            except ClubModel.DoesNotExist:
-                raise PermissionDenied("Invalid club_id.")
-
-        elif club_id and club_id in extra_club_ids:
-            # Any user (including sub_club role) can target one of their extra_clubs
-            try:
-                club = ClubModel.objects.get(pk=club_id)
-            except ClubModel.DoesNotExist:
-                raise PermissionDenied("Invalid club_id.")
-
-        elif user.sub_club:
-            # Sub-club role with no extra_club override: use their assigned sub-club
-            if club_id and club_id != user.sub_club.id:
-                raise PermissionDenied("You can only create events for your assigned clubs.")
-            club = user.sub_club
-
-        elif user.club:
-            # Main-club role: default to main club, but allow targeting a direct sub-club
-            if club_id and club_id != user.club.id:
-                try:
-                    target = ClubModel.objects.get(pk=club_id)
-                except ClubModel.DoesNotExist:
-                    raise PermissionDenied("Invalid club_id.")
-                if target.parent_id != user.club.id:
-                    raise PermissionDenied("You can only create events for your club and its sub-clubs.")
-                club = target
-            else:
-                club = user.club
-
+        if club_id:
+            if not access.can_write(club_id):
+                raise PermissionDenied(access.denial_message('create'))
+        elif access.is_superuser:
+            raise PermissionDenied("Superusers must specify a club_id when creating events.")
         else:
-            # Extra-clubs only users
-            if club_id and club_id in extra_club_ids:
-                try:
-                    club = ClubModel.objects.get(pk=club_id)
-                except ClubModel.DoesNotExist:
-                    raise PermissionDenied("Invalid club_id.")
-            elif extra_club_ids:
-                club = ClubModel.objects.get(pk=extra_club_ids[0])
-            else:
+            club_id = access.default_club_id()
+            if club_id is None:
                 raise PermissionDenied("You must be a member of a club to create events.")
 
-        event = serializer.save(
-            club=club,
-            created_by=user
-        )
+        try:
+            club = ClubModel.objects.get(pk=club_id)
+        except ClubModel.DoesNotExist:
+            raise PermissionDenied("Invalid club_id.")
+
+        data = serializer.validated_data
+        with transaction.atomic():
+            self._enforce_location_conflicts(data['location'], data['start'], data['end'])
+
+            event = serializer.save(
+                club=club,
+                created_by=user
+            )
 
-        # Set collaborating clubs
-        if collaborating_club_ids:
-            from clubs.models import Club as ClubModel
-            collab_clubs = ClubModel.objects.filter(pk__in=collaborating_club_ids)
-            event.collaborating_clubs.set(collab_clubs)
+            # Set collaborating clubs
+            if collaborating_club_ids:
+                from clubs.models import Club as ClubModel
+                collab_clubs = ClubModel.objects.filter(pk__in=collaborating_club_ids)
+                event.collaborating_clubs.set(collab_clubs)
 
+        urgent.notify_on_commit(event)
         logger.info("Event created: '%s' (id=%s) by %s in club '%s'", event.title, event.id, user.email, club.name)
     
     def perform_update(self, serializer):
@@ -159,33 +554,29 @@ class EventViewSet(viewsets.ModelViewSet):
         # collaborating_club_ids is now declared on EventSerializer, so it arrives in validated_data
         collaborating_club_ids = serializer.validated_data.pop('collaborating_club_ids', None)
 
-        if not user.is_superuser:
-            extra_club_ids = list(user.extra_clubs.values_list('id', flat=True))
-
-            # Allow edit if the event's club is in the user's extra_clubs (takes priority)
-            if event.club.id in extra_club_ids:
-                pass  # permitted
-            elif user.sub_club:
-                # Sub-club role: only their exact sub-club
-                if user.sub_club.id != event.club.id:
-                    raise PermissionDenied("You can only edit events for your assigned clubs.")
-            elif user.club:
-                # Main-club role: own club OR any direct sub-club
-                is_own_club = event.club.id == user.club.id
-                is_sub_club = event.club.parent_id == user.club.id
-                if not (is_own_club or is_sub_club):
-                    raise PermissionDenied("You can only edit events for your club and its sub-clubs.")
-            else:
-                raise PermissionDenied("You must be a member of a club to edit events.")
-
-        updated_event = serializer.save(club=event.club, created_by=event.created_by)
-
-        # Update collaborating clubs whenever the field is present in the payload
-        if collaborating_club_ids is not None:
-            from clubs.models import Club as ClubModel
-            collab_clubs = ClubModel.objects.filter(pk__in=collaborating_club_ids)
-            updated_event.collaborating_clubs.set(collab_clubs)
+        access = ClubAccess.for_request(self.request)
+        if not access.can_write(event.club_id):
+            raise PermissionDenied(access.denial_message('edit'))
+
+        data = serializer.validated_data
+        previous = (event.start, event.end)
+        with transaction.atomic():
+            self._enforce_location_conflicts(
+                data.get('location', event.location),
+                data.get('start', event.start),
+                data.get('end', event.end),
+                exclude_id=event.pk,
+            )
+
+            updated_event = serializer.save(club=event.club, created_by=event.created_by)
+
+            # Update collaborating clubs whenever the field is present in the payload
+            if collaborating_club_ids is not None:
+                from clubs.models import Club as ClubModel
+                collab_clubs = ClubModel.objects.filter(pk__in=collaborating_club_ids)
+                updated_event.collaborating_clubs.set(collab_clubs)
 
+        urgent.notify_on_commit(updated_event, previous)
         logger.info("Event updated: '%s' (id=%s) by %s", event.title, event.id, user.email)
 
     def perform_destroy(self, instance):
@@ -196,23 +587,8 @@ class EventViewSet(viewsets.ModelViewSet):
         Extra-clubs: can delete events for their extra clubs.
         """
         user = self.request.user
-        if not user.is_superuser:
-            extra_club_ids = list(user.extra_clubs.values_list('id', flat=True))
-            
-            # Allow delete if the event's club is in the user's extra_clubs
-            if instance.club.id in extra_club_ids:
-                pass # permitted
-            elif user.sub_club:
-                # Sub-club role: strict — only their exact sub-club
-                if user.sub_club.id != instance.club.id:
-                    raise PermissionDenied("You can only delete events for your assigned clubs.")
-            elif user.club:
-                # Main-club role: own club OR any direct sub-club
-                is_own_club = instance.club.id == user.club.id
-                is_sub_club = instance.club.parent_id == user.club.id
-                if not (is_own_club or is_sub_club):
-                    raise PermissionDenied("You can only delete events for your club and its sub-clubs.")
-            else:
-                raise PermissionDenied("You must be a member of a club to delete events.")
+        access = ClubAccess.for_request(self.request)
+        if not access.can_write(instance.club_id):
+            raise PermissionDenied(access.denial_message('delete'))
         logger.info("Event deleted: '%s' (id=%s) by %s", instance.title, instance.id, user.email)
         instance.delete()
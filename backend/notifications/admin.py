@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import OutboxEmail
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['to_email', 'kind', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['to_email', 'subject']
+    readonly_fields = ['user', 'to_email', 'subject', 'body', 'html_body', 'created_at', 'sent_at', 'last_error']
@@ -0,0 +1,252 @@
+"""
+Digest email construction and batched delivery.
+
+`send_mail` opens (and TLS-negotiates) a fresh SMTP connection for every
+recipient, which dominates dispatch time when thousands of digests go out at
+once. `send_batched()` instead pushes messages through one connection per
+batch of NOTIFICATION_EMAIL_BATCH_SIZE, reconnecting when the server drops
+the session, and reports the outcome of every message separately so only the
+users whose digest failed are retried.
+
+Delivery goes through django.core.mail.get_connection(), so the same code
+runs against SMTP, MailHog or the test suite's locmem backend.
+
+Rendering is shared too: `render_digest()` caches the bodies per event set,
+timezone and time format, and only the greeting is filled in per recipient.
+"""
+import logging
+import smtplib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+from .utils import format_event_datetime
+
+logger = logging.getLogger(__name__)
+
+# Stands in for the recipient's name in cached digest bodies
+GREETING_PLACEHOLDER = '__digest_greeting_name__'
+RENDER_CACHE_SIZE = 256
+RENDER_CACHE_SECONDS = 600
+
+_render_cache = OrderedDict()
+_render_lock = threading.Lock()
+
+
+def _render_key(events, timezone_str, time_format):
+    # updated_at moves on every edit, so an edited event never hits a stale body
+    return (
+        tuple(sorted((str(event.pk), event.updated_at.isoformat() if event.updated_at else '') for event in events)),
+        timezone_str,
+        time_format,
+    )
+
+
+def render_digest(events, timezone_str, time_format='12h'):
+    """
+    Render the (text, HTML) bodies of a digest, with GREETING_PLACEHOLDER in
+    place of the recipient's name.
+
+    Users in the same timezone due in the same minute mostly receive the same
+    events, so bodies are cached per (event IDs and versions, timezone, time
+    format) in a small per-process LRU that also expires entries after
+    RENDER_CACHE_SECONDS (club and organizer names are not in the key).
+    """
+    key = _render_key(events, timezone_str, time_format)
+    now = time.monotonic()
+    with _render_lock:
+        cached = _render_cache.get(key)
+        if cached is not None and cached[0] > now:
+            _render_cache.move_to_end(key)
+            return cached[1]
+
+    created_events = []
+    updated_events = []
+    for event in events:
+        # If the difference between updated_at and created_at is more than 2 seconds, consider it an update
+        is_updated = False
+        if getattr(event, 'created_at', None) and getattr(event, 'updated_at', None):
+            is_updated = abs((event.updated_at - event.created_at).total_seconds()) > 2
+
+        event_data = {
+            'title': event.title,
+            'club_name': event.club.name,
+            'description': event.description,
+            'datetime': format_event_datetime(event.start, timezone_str, time_format),
+            'end_datetime': format_event_datetime(event.end, timezone_str, time_format),
+            'location': event.location,
+            'created_by': f"{event.created_by.first_name} {event.created_by.last_name}".strip() or event.created_by.username,
+        }
+        if is_updated:
+            updated_events.append(event_data)
+        else:
+            created_events.append(event_data)
+
+    html_content = render_to_string('email_digest.html', {
+        'greeting_name': GREETING_PLACEHOLDER,
+        'created_events': created_events,
+        'updated_events': updated_events,
+        'event_count': len(events),
+        'frontend_url': settings.FRONTEND_URL,
+    })
+    text_content = (
+        f"You have {len(events)} upcoming event(s) across clubs. "
+        f"Visit {settings.FRONTEND_URL} to view details."
+    )
+    bodies = (text_content, html_content)
+
+    with _render_lock:
+        _render_cache[key] = (now + RENDER_CACHE_SECONDS, bodies)
+        _render_cache.move_to_end(key)
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return bodies
+
+
+def clear_render_cache():
+    """Drop every cached digest body (tests and benchmarks start cold)."""
+    with _render_lock:
+        _render_cache.clear()
+
+
+def build_digest_message(user, events):
+    """
+    Build the HTML digest email for a user, without sending it.
+
+    Args:
+        user: User object
+        events: list of Event objects (from any club)
+
+    Returns:
+        EmailMultiAlternatives
+    """
+    text_content, html_content = render_digest(events, user.timezone, user.time_format)
+    html_content = html_content.replace(GREETING_PLACEHOLDER, escape(user.first_name or user.username))
+
+    message = EmailMultiAlternatives(
+        subject="Upcoming Events - CampusCalendar",
+        body=text_content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+    message.attach_alternative(html_content, 'text/html')
+    return message
+
+
+def build_urgent_message(user, event, created=False, previous=None):
+    """
+    Build the plain-text urgent-change email for a user, without sending it.
+
+    Args:
+        user: User object
+        event: the Event as it is now
+        created: whether the event was added rather than edited
+        previous: (start, end) before the edits, if the timing changed
+
+    Returns:
+        EmailMessage
+    """
+    def when(start, end):
+        return (
+            f"{format_event_datetime(start, user.timezone, user.time_format)} - "
+            f"{format_event_datetime(end, user.timezone, user.time_format)}"
+        )
+
+    if created:
+        subject = f"New event soon: {event.title}"
+    elif previous and previous != (event.start, event.end):
+        subject = f"Event rescheduled: {event.title}"
+    else:
+        subject = f"Event updated: {event.title}"
+
+    lines = [
+        f"Hi {user.first_name or user.username},",
+        "",
+        f"{event.title} ({event.club.name})",
+        f"When: {when(event.start, event.end)}",
+    ]
+    if not created and previous and previous != (event.start, event.end):
+        lines.append(f"Previously: {when(*previous)}")
+    if event.location:
+        lines.append(f"Where: {event.location}")
+    lines += ["", f"Visit {settings.FRONTEND_URL} to view details."]
+
+    return EmailMessage(
+        subject=f"{subject} - CampusCalendar",
+        body="\n".join(lines),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def _is_connection_error(exc):
+    # SMTPException subclasses OSError, so only a dropped session or a
+    # socket-level failure means the connection itself is gone
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+def send_batched(messages, batch_size=None, max_reconnects=None, connection_factory=get_connection):
+    """
+    Send `messages` over one reusable connection per batch.
+
+    A message whose send fails because the connection dropped is retried
+    once on a fresh connection (at most `max_reconnects` times per batch).
+    Any other failure (refused recipient, rejected data) is recorded for that
+    message only and the batch carries on.
+
+    Args:
+        messages: list of EmailMessage objects
+        batch_size: messages per connection (default NOTIFICATION_EMAIL_BATCH_SIZE)
+        max_reconnects: reconnects allowed per batch (default NOTIFICATION_EMAIL_MAX_RECONNECTS)
+        connection_factory: callable returning an email backend instance
+
+    Returns:
+        list: one entry per message, None if it was sent or the exception
+        that prevented it
+    """
+    batch_size = batch_size or settings.NOTIFICATION_EMAIL_BATCH_SIZE
+    if max_reconnects is None:
+        max_reconnects = settings.NOTIFICATION_EMAIL_MAX_RECONNECTS
+
+    results = [None] * len(messages)
+    for offset in range(0, len(messages), batch_size):
+        connection = connection_factory(fail_silently=False)
+        reconnects = 0
+        try:
+            connection.open()
+        except Exception as e:
+            logger.error("Could not open mail connection: %s", e)
+            for index in range(offset, min(offset + batch_size, len(messages))):
+                results[index] = e
+            continue
+
+        try:
+            for index in range(offset, min(offset + batch_size, len(messages))):
+                message = messages[index]
+                while True:
+                    try:
+                        connection.send_messages([message])
+                        break
+                    except Exception as e:
+                        if not _is_connection_error(e) or reconnects >= max_reconnects:
+                            logger.warning("Failed to send email to %s: %s", ', '.join(message.to), e)
+                            results[index] = e
+                            break
+                        reconnects += 1
+                        logger.info("Mail connection lost (%s); reconnecting.", e)
+                        connection.close()
+                        try:
+                            connection.open()
+                        except Exception as open_error:
+                            results[index] = open_error
+                            break
+        finally:
+            connection.close()
+    return results
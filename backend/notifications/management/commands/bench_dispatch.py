@@ -0,0 +1,230 @@
+"""
+Load-test the digest pipeline against synthetic users and events.
+
+Seeds N users spread over realistic timezones, all due in the benchmarked
+minute (the 7-10 AM peak), and M events changed over the last day, then runs
+the dispatch pipeline one phase at a time:
+
+    eligibility  claim due users (dispatch_notifications)
+    events       the shared changed-events query (ChangedEvents) and the
+                 subscribed users' relevant events (subscribed_events)
+    render       build every digest (build_digests)
+    queue        write outbox rows and user schedules (queue_digests)
+    send         drain the outbox (claim_batch + deliver_batch)
+
+Each phase reports wall time, DB queries, peak Python memory (tracemalloc,
+which slows the phases down; --skip-memory for clean timings) and items per
+second, printed as JSON so results can be compared between releases.
+Everything runs inside a transaction that is rolled back, and mail goes to
+Django's locmem backend unless --smtp is given (e.g. the compose MailHog):
+
+    python manage.py bench_dispatch --users 5000 --events 300 --output bench.json
+"""
+import json
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import User
+from clubs.models import Club, ClubClosure, ClubSubscription
+from events.models import Event
+from notifications import tasks
+from notifications.mailer import clear_render_cache
+from notifications.outbox import TokenBucket, claim_batch, deliver_batch
+from notifications.utils import compute_next_notification_at, get_timezone
+
+# Mostly on-campus users, with a tail abroad
+TIMEZONE_WEIGHTS = [
+    ('Asia/Kolkata', 80),
+    ('Asia/Dubai', 5),
+    ('Europe/London', 4),
+    ('America/New_York', 4),
+    ('Asia/Singapore', 3),
+    ('Europe/Berlin', 2),
+    ('America/Los_Angeles', 2),
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark the notification dispatch pipeline per phase; prints JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help="Synthetic users due in the benchmarked minute")
+        parser.add_argument('--events', type=int, default=200, help="Synthetic events changed in the last 24 hours")
+        parser.add_argument('--clubs', type=int, default=20)
+        parser.add_argument(
+            '--subscriptions', type=int, default=0,
+            help="Clubs each user subscribes to (0: no subscriptions, every club's events)",
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--smtp', action='store_true', help="Send through the configured EMAIL_BACKEND")
+        parser.add_argument('--output', help="Also write the JSON report to this file")
+        parser.add_argument(
+            '--skip-memory', action='store_true',
+            help="Do not trace memory (tracemalloc slows Python-heavy phases considerably)",
+        )
+
+    def handle(self, *args, **options):
+        report = None
+        try:
+            with transaction.atomic():
+                report = self._bench(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+
+    def _bench(self, options):
+        self.trace_memory = not options['skip_memory']
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        self._seed(rng, now, options)
+        clear_render_cache()
+
+        phases = {}
+        claims = self._measure(phases, 'eligibility', lambda: tasks._claim_due_users(now), len)
+        slots = dict(claims)
+        users = tasks.load_claimed_users(slots)
+        window_starts = tasks.digest_window_starts(users, slots)
+
+        def events():
+            changed = tasks.ChangedEvents(min(window_starts.values()), now)
+            return changed, tasks.subscribed_events(users, changed)
+
+        changed, relevant = self._measure(phases, 'events', events, lambda result: len(result[0]))
+        emails, retry = self._measure(
+            phases, 'render', lambda: tasks.build_digests(users, slots, window_starts, changed, now, relevant),
+            lambda result: len(result[0]),
+        )
+        self._measure(phases, 'queue', lambda: tasks.queue_digests(users, emails, retry, now), lambda _: len(emails))
+
+        backend = settings.EMAIL_BACKEND if options['smtp'] else 'django.core.mail.backends.locmem.EmailBackend'
+        with override_settings(EMAIL_BACKEND=backend):
+            mail.outbox = []
+            self._measure(phases, 'send', self._drain, lambda delivered: delivered)
+            mail.outbox = []
+
+        return {
+            'users': options['users'],
+            'events': options['events'],
+            'subscriptions_per_user': options['subscriptions'],
+            'digests': len(emails),
+            'database': connection.vendor,
+            'email_backend': backend,
+            'total_seconds': round(sum(phase['seconds'] for phase in phases.values()), 4),
+            'phases': phases,
+        }
+
+    def _seed(self, rng, now, options):
+        clubs = Club.objects.bulk_create([
+            Club(slug=f'bench-{i}', name=f'Bench Club {i}') for i in range(options['clubs'])
+        ])
+        ClubClosure.objects.rebuild()
+        creator = User.objects.create(
+            email='bench-organizer@example.com', username='bench-organizer', notification_enabled=False,
+        )
+
+        zones = [zone for zone, _ in TIMEZONE_WEIGHTS]
+        weights = [weight for _, weight in TIMEZONE_WEIGHTS]
+        users = []
+        for i in range(options['users']):
+            zone = rng.choices(zones, weights)[0]
+            # Due this minute in their own timezone, last digest yesterday
+            local_now = now.astimezone(get_timezone(zone))
+            notification_time = local_now.time().replace(second=0, microsecond=0)
+            last_sent = now - timedelta(days=1)
+            users.append(User(
+                email=f'bench-{i}@example.com',
+                username=f'bench-{i}',
+                password='!',
+                timezone=zone,
+                notification_enabled=True,
+                notification_time=notification_time,
+                last_notification_sent_at=last_sent,
+                next_notification_at=compute_next_notification_at(notification_time, zone, now, last_sent),
+            ))
+        User.objects.bulk_create(users, batch_size=1000)
+
+        per_user = min(options['subscriptions'], len(clubs))
+        if per_user:
+            users = User.objects.filter(email__startswith='bench-', notification_enabled=True)
+            ClubSubscription.objects.bulk_create([
+                ClubSubscription(user=user, club=club)
+                for user in users
+                for club in rng.sample(clubs, per_user)
+            ], batch_size=1000)
+
+        events = []
+        for i in range(options['events']):
+            start = now + timedelta(days=rng.randint(0, 30), hours=rng.randint(8, 18))
+            event = Event(
+                title=f'Bench event {i}',
+                description='Synthetic benchmark event.',
+                location=f'Room {rng.randint(1, 40)}',
+                start=start,
+                end=start + timedelta(hours=rng.randint(1, 3)),
+                club=rng.choice(clubs),
+                created_by=creator,
+            )
+            event.refresh_derived_fields()
+            events.append(event)
+        Event.objects.bulk_create(events, batch_size=1000)
+
+        # Spread changes over the last day; some are edits of older events
+        for event in events:
+            event.updated_at = now - timedelta(seconds=rng.randint(1, 86_000))
+            event.created_at = event.updated_at - timedelta(days=rng.choice([0, 0, 0, 3]))
+        Event.objects.bulk_update(events, ['created_at', 'updated_at'], batch_size=1000)
+
+    def _drain(self):
+        # Unthrottled: the benchmark measures the pipeline, not the configured rate
+        bucket = TokenBucket(rate=1e9, capacity=settings.NOTIFICATION_OUTBOX_BURST)
+        delivered = 0
+        while True:
+            rows = claim_batch(timezone.now(), settings.NOTIFICATION_OUTBOX_BATCH_SIZE)
+            if not rows:
+                return delivered
+            delivered += deliver_batch(rows, bucket)
+
+    def _measure(self, phases, name, run, count):
+        peak = None
+        if self.trace_memory:
+            tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                began = time.perf_counter()
+                result = run()
+                elapsed = time.perf_counter() - began
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+        finally:
+            if self.trace_memory:
+                tracemalloc.stop()
+
+        items = count(result)
+        phases[name] = {
+            'seconds': round(elapsed, 4),
+            'queries': len(queries),
+            'peak_memory_kb': round(peak / 1024, 1) if peak is not None else None,
+            'items': items,
+            'items_per_second': round(items / elapsed, 1) if elapsed else None,
+        }
+        self.stderr.write(f"{name:<12} {elapsed:8.3f}s  {len(queries):>6} queries  {items:>8} items")
+        return result
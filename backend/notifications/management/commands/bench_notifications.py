@@ -0,0 +1,125 @@
+"""
+Benchmark digest email delivery: one connection per message (what
+send_mail does) against send_batched()'s pooled connections.
+
+Point EMAIL_HOST/EMAIL_PORT at a local SMTP stand-in such as the compose
+file's MailHog service before running; nothing is written to the database:
+
+    EMAIL_PORT=1026 python manage.py bench_notifications --messages 500 --batch-sizes 1 50 200
+
+With --render, no mail is sent; instead digest rendering is timed per
+1,000 recipients with the render cache disabled and enabled:
+
+    python manage.py bench_notifications --render --timezones 3
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import User
+from clubs.models import Club
+from events.models import Event
+from notifications import mailer
+from notifications.mailer import build_digest_message, clear_render_cache, send_batched
+
+
+class Command(BaseCommand):
+    help = "Benchmark digest email throughput (messages/second) per connection strategy."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200, help="Digests sent per strategy")
+        parser.add_argument('--events', type=int, default=5, help="Events in each digest")
+        parser.add_argument(
+            '--batch-sizes', nargs='+', type=int, default=[50, 200],
+            help="Pooled batch sizes to compare with one connection per message",
+        )
+        parser.add_argument('--render', action='store_true', help="Time digest rendering instead of delivery")
+        parser.add_argument(
+            '--timezones', type=int, default=3,
+            help="With --render: distinct recipient timezones (distinct bodies per event set)",
+        )
+
+    def handle(self, *args, **options):
+        if options['render']:
+            self._bench_render(options)
+            return
+
+        try:
+            get_connection(fail_silently=False).open()
+        except Exception as e:
+            raise CommandError(f"Cannot reach the mail server at {settings.EMAIL_HOST}:{settings.EMAIL_PORT}: {e}")
+
+        messages = self._digests(options['messages'], options['events'])
+        self.stdout.write(f"{'strategy':<16}  {'messages':>8}  {'failed':>6}  {'seconds':>8}  {'msg/s':>8}")
+        self._run('per-message', lambda: self._send_unpooled(messages), len(messages))
+        for batch_size in options['batch_sizes']:
+            self._run(
+                f'batch={batch_size}',
+                lambda: send_batched(messages, batch_size=batch_size),
+                len(messages),
+            )
+
+    def _bench_render(self, options):
+        zones = ['Asia/Kolkata', 'UTC', 'America/New_York', 'Europe/London', 'Asia/Tokyo'][:max(1, options['timezones'])]
+        events = self._events(options['events'])
+        recipients = [
+            User(email=f'bench{i}@example.com', username=f'bench{i}', timezone=zones[i % len(zones)])
+            for i in range(1000)
+        ]
+
+        self.stdout.write(f"{'render cache':<14}  {'recipients':>10}  {'ms / 1,000':>10}")
+        for label, cache_size in (('disabled', 0), ('enabled', mailer.RENDER_CACHE_SIZE)):
+            clear_render_cache()
+            original_size = mailer.RENDER_CACHE_SIZE
+            mailer.RENDER_CACHE_SIZE = cache_size
+            try:
+                began = time.perf_counter()
+                for user in recipients:
+                    build_digest_message(user, events)
+                elapsed = time.perf_counter() - began
+            finally:
+                mailer.RENDER_CACHE_SIZE = original_size
+            self.stdout.write(f"{label:<14}  {len(recipients):>10}  {elapsed * 1000:>10.1f}")
+        clear_render_cache()
+
+    def _events(self, count):
+        # Unsaved objects are enough to render the template
+        club = Club(name='Bench Club', slug='bench')
+        creator = User(email='organizer@example.com', username='organizer', first_name='Bench')
+        start = timezone.now() + timedelta(days=1)
+        return [
+            Event(
+                title=f'Bench event {i}', description='Synthetic benchmark event.', location=f'Room {i}',
+                start=start + timedelta(hours=i), end=start + timedelta(hours=i + 1),
+                club=club, created_by=creator, created_at=start, updated_at=start,
+            )
+            for i in range(count)
+        ]
+
+    def _digests(self, count, events_per_digest):
+        events = self._events(events_per_digest)
+        return [
+            build_digest_message(User(email=f'bench{i}@example.com', username=f'bench{i}'), events)
+            for i in range(count)
+        ]
+
+    def _send_unpooled(self, messages):
+        results = []
+        for message in messages:
+            try:
+                get_connection(fail_silently=False).send_messages([message])
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _run(self, name, send, count):
+        began = time.perf_counter()
+        results = send()
+        elapsed = time.perf_counter() - began
+        failed = sum(1 for error in results if error is not None)
+        self.stdout.write(f"{name:<16}  {count:>8}  {failed:>6}  {elapsed:>8.2f}  {count / elapsed:>8.1f}")
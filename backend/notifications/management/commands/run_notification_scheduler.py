@@ -0,0 +1,26 @@
+"""
+Run the digest scheduler loop (see notifications/scheduler.py):
+
+    python manage.py run_notification_scheduler
+"""
+from django.core.management.base import BaseCommand
+
+from notifications import scheduler
+
+
+class Command(BaseCommand):
+    help = "Dispatch digests from the Redis schedule as they fall due."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-sleep', type=float, default=None,
+            help="Longest wait between checks, in seconds (default NOTIFICATION_SCHEDULER_MAX_SLEEP_SECONDS)",
+        )
+        parser.add_argument('--skip-rebuild', action='store_true', help="Do not reload the schedule from the database")
+
+    def handle(self, *args, **options):
+        if not options['skip_rebuild']:
+            count = scheduler.rebuild()
+            self.stdout.write(f"Scheduled {count} user(s) from the database.")
+        self.stdout.write("Notification scheduler running.")
+        scheduler.run_forever(max_sleep=options['max_sleep'])
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxemail',
+            name='kind',
+            field=models.CharField(choices=[('digest', 'Digest'), ('urgent', 'Urgent change'), ('password_reset', 'Password reset')], max_length=20),
+        ),
+    ]
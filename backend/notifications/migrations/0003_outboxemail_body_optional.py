@@ -0,0 +1,25 @@
+# Generated by Django 5.0 on 2026-10-18 08:26
+
+from django.db import migrations, models
+
+
+def clear_reset_links(apps, schema_editor):
+    # Reset mails are rebuilt at delivery, so stored links are only a liability
+    OutboxEmail = apps.get_model('notifications', 'OutboxEmail')
+    OutboxEmail.objects.filter(kind='password_reset').update(body='', html_body='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_outboxemail_urgent_kind'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxemail',
+            name='body',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(clear_reset_links, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be delivered by notifications.tasks.send_outbox.
+
+    Producers (digest generation, urgent changes, password reset) only insert rows and
+    commit; delivery, rate limiting and retries happen in the sender task.
+    While a sender holds a row its status is 'sending' and available_at is
+    its lease; a row whose lease ran out is picked up again.
+    """
+    KIND_CHOICES = [
+        ('digest', 'Digest'),
+        ('urgent', 'Urgent change'),
+        ('password_reset', 'Password reset'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='outbox_emails'
+    )
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    # Empty for password resets, whose link is generated at delivery
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # The sender only ever scans rows that still need delivering
+            models.Index(
+                fields=['available_at'],
+                name='outbox_deliverable_idx',
+                condition=models.Q(status__in=['pending', 'sending']),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} to {self.to_email} ({self.status})"
@@ -0,0 +1,182 @@
+"""
+Transactional email outbox.
+
+Producers write OutboxEmail rows inside their own transaction and return;
+notifications.tasks.send_outbox (routed to the dedicated `email` queue)
+drains them:
+
+- `claim_batch()` locks deliverable rows with SKIP LOCKED and leases them,
+  so several senders never deliver the same row. Time-critical kinds
+  (KIND_PRIORITY) are claimed ahead of the digest backlog, so a password
+  reset link does not expire waiting behind the morning digests;
+- delivery goes through mailer.send_batched(), throttled by a TokenBucket
+  of NOTIFICATION_OUTBOX_RATE_PER_SECOND;
+- outcomes are written back with one bulk_update per batch; failed rows
+  are retried with exponential backoff until NOTIFICATION_OUTBOX_MAX_ATTEMPTS.
+
+Password reset rows store no body: the message, with its reset link, is
+built from the row's user at delivery time (accounts/emails.py), so the
+table never holds a working link.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .mailer import send_batched
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# Claim order by kind, lowest first; kinds not listed (digests) come last
+KIND_PRIORITY = {'password_reset': 0, 'urgent': 1}
+# Outcome of a row whose message cannot be built (its user was deleted)
+UNDELIVERABLE = 'Recipient account no longer exists'
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: `rate` tokens per second, bursts of at most
+    `capacity`. take(n) blocks until n tokens are available.
+
+    The bucket is per process; the email worker runs with concurrency 1 so
+    the configured rate is the overall sending rate.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self.tokens = float(self.capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, n=1):
+        if n > self.capacity:
+            raise ValueError("Cannot take more tokens than the bucket holds.")
+        self._refill()
+        if self.tokens < n:
+            self._sleep((n - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= n
+
+
+def outbox_email(message, kind, user=None):
+    """An unsaved OutboxEmail for an EmailMessage with a single recipient."""
+    html_body = ''
+    for content, mimetype in getattr(message, 'alternatives', ()):
+        if mimetype == 'text/html':
+            html_body = content
+    return OutboxEmail(
+        kind=kind,
+        user=user,
+        to_email=message.to[0],
+        subject=message.subject,
+        body=message.body,
+        html_body=html_body,
+    )
+
+
+def _wake_sender():
+    from .tasks import send_outbox
+
+    try:
+        send_outbox.delay()
+    except Exception as e:
+        # The rows are committed; the every-minute beat run delivers them
+        logger.warning("Could not trigger the outbox sender: %s", e)
+
+
+def enqueue(emails):
+    """
+    Insert outbox rows and wake the sender once the surrounding transaction
+    commits (immediately in autocommit mode).
+    """
+    OutboxEmail.objects.bulk_create(emails)
+    if emails:
+        transaction.on_commit(_wake_sender)
+
+
+def claim_batch(now, limit):
+    """Lock and lease up to `limit` deliverable rows, time-critical kinds first."""
+    priority = Case(
+        *(When(kind=kind, then=Value(rank)) for kind, rank in KIND_PRIORITY.items()),
+        default=Value(len(KIND_PRIORITY)),
+        output_field=IntegerField(),
+    )
+    with transaction.atomic():
+        rows = list(
+            OutboxEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='sending'), available_at__lte=now)
+            .order_by(priority, 'available_at', 'id')[:limit]
+        )
+        lease_until = now + timedelta(seconds=settings.NOTIFICATION_OUTBOX_LEASE_SECONDS)
+        for row in rows:
+            row.status = 'sending'
+            row.available_at = lease_until
+        OutboxEmail.objects.bulk_update(rows, ['status', 'available_at'])
+    return rows
+
+
+def _message(row):
+    """The EmailMessage for a claimed row, or None if it can no longer be built."""
+    if row.kind == 'password_reset':
+        from accounts.emails import password_reset_message
+
+        return password_reset_message(row.user) if row.user is not None else None
+    message = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[row.to_email],
+    )
+    if row.html_body:
+        message.attach_alternative(row.html_body, 'text/html')
+    return message
+
+
+def deliver_batch(rows, bucket):
+    """
+    Send claimed rows and record every outcome with one bulk_update.
+
+    Returns:
+        int: number of rows delivered
+    """
+    errors = []
+    for offset in range(0, len(rows), bucket.capacity):
+        messages = [_message(row) for row in rows[offset:offset + bucket.capacity]]
+        sendable = [message for message in messages if message is not None]
+        if sendable:
+            bucket.take(len(sendable))
+        results = iter(send_batched(sendable))
+        errors += [next(results) if message is not None else UNDELIVERABLE for message in messages]
+
+    now = timezone.now()
+    delivered = 0
+    for row, error in zip(rows, errors):
+        row.attempts += 1
+        if error is None:
+            row.status = 'sent'
+            row.sent_at = now
+            row.last_error = ''
+            delivered += 1
+        elif error is UNDELIVERABLE or row.attempts >= settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS:
+            row.status = 'failed'
+            row.last_error = str(error)
+        else:
+            row.status = 'pending'
+            row.last_error = str(error)
+            row.available_at = now + timedelta(seconds=60 * 2 ** (row.attempts - 1))
+    OutboxEmail.objects.bulk_update(rows, ['status', 'attempts', 'last_error', 'available_at', 'sent_at'])
+    return delivered
@@ -0,0 +1,176 @@
+"""
+Event-driven digest scheduling on a Redis sorted set.
+
+Every user with a pending digest is a member of SCHEDULE_KEY, scored by the
+UNIX timestamp of their next_notification_at. Saving a user (see signals.py)
+and queueing their digest keep the score current. The scheduler loop
+(`manage.py run_notification_scheduler`) sleeps until the earliest score.
+It then pops only the members that are due and hands them to
+dispatch_notifications, so idle minutes cost nothing and digests go out
+within seconds of their time.
+
+The sorted set is only a wake-up index: next_notification_at in the
+database stays the source of truth, dispatch still claims users with
+SKIP LOCKED, and a low-frequency beat sweep catches anything the set
+missed (Redis flushed, a popped batch lost).
+"""
+import logging
+import time
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_KEY = 'notifications:schedule'
+WAKE_KEY = 'notifications:schedule:wake'
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.NOTIFICATION_SCHEDULER_REDIS_URL)
+    return _client
+
+
+def schedule(entries):
+    """
+    Set or clear the due time of users.
+
+    Args:
+        entries: iterable of (user ID, aware datetime or None); None removes
+        the user from the schedule
+    """
+    due = {}
+    removed = []
+    for user_id, when in entries:
+        if when is None:
+            removed.append(str(user_id))
+        else:
+            due[str(user_id)] = when.timestamp()
+    if not due and not removed:
+        return
+
+    client = get_redis()
+    pipe = client.pipeline(transaction=False)
+    if due:
+        pipe.zadd(SCHEDULE_KEY, due)
+    if removed:
+        pipe.zrem(SCHEDULE_KEY, *removed)
+    pipe.zrange(SCHEDULE_KEY, 0, 0, withscores=True)
+    head = pipe.execute()[-1]
+
+    # Wake a sleeping loop when one of these is now the earliest entry
+    if due and head and head[0][1] >= min(due.values()):
+        pipe = client.pipeline(transaction=False)
+        pipe.lpush(WAKE_KEY, 1)
+        pipe.ltrim(WAKE_KEY, 0, 0)
+        pipe.execute()
+
+
+def schedule_on_commit(entries):
+    """
+    schedule() once the current transaction commits. A Redis failure is
+    logged, not raised: the beat sweep still finds the users through
+    next_notification_at.
+    """
+    entries = list(entries)
+
+    def apply():
+        try:
+            schedule(entries)
+        except Exception as e:
+            logger.warning("Could not update the notification schedule: %s", e)
+    transaction.on_commit(apply)
+
+
+def pop_due(now, limit):
+    """
+    Remove and return up to `limit` user IDs whose due time is <= now.
+
+    ZREM reports whether this caller removed the member, so two loops
+    popping at once never both get the same user.
+    """
+    client = get_redis()
+    members = client.zrangebyscore(SCHEDULE_KEY, '-inf', now.timestamp(), start=0, num=limit)
+    if not members:
+        return []
+    pipe = client.pipeline(transaction=False)
+    for member in members:
+        pipe.zrem(SCHEDULE_KEY, member)
+    return [int(member) for member, removed in zip(members, pipe.execute()) if removed]
+
+
+def seconds_until_next(now):
+    """Seconds until the earliest scheduled user is due, or None if nobody is."""
+    head = get_redis().zrange(SCHEDULE_KEY, 0, 0, withscores=True)
+    if not head:
+        return None
+    return max(0.0, head[0][1] - now.timestamp())
+
+
+def rebuild():
+    """
+    Add every user with a pending digest to the set (idempotent), so the
+    schedule survives a Redis flush. Run when the loop starts.
+    """
+    from accounts.models import User
+
+    rows = (
+        User.objects
+        .filter(notification_enabled=True, next_notification_at__isnull=False)
+        .values_list('pk', 'next_notification_at')
+        .iterator(chunk_size=5000)
+    )
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= 5000:
+            schedule(batch)
+            count += len(batch)
+            batch = []
+    schedule(batch)
+    return count + len(batch)
+
+
+def tick(now=None):
+    """Dispatch the users that are due now; returns their IDs."""
+    from .tasks import dispatch_notifications
+
+    now = now or timezone.now()
+    user_ids = pop_due(now, settings.NOTIFICATION_SCHEDULER_BATCH_SIZE)
+    if user_ids:
+        try:
+            dispatch_notifications.delay(user_ids=user_ids)
+        except Exception:
+            # Put them back so the next tick retries
+            schedule((user_id, now) for user_id in user_ids)
+            raise
+    return user_ids
+
+
+def run_forever(max_sleep=None):
+    """
+    Scheduler loop: dispatch what is due, then block until the next due
+    time, a wake-up from schedule(), or `max_sleep` seconds.
+    """
+    max_sleep = max_sleep or settings.NOTIFICATION_SCHEDULER_MAX_SLEEP_SECONDS
+    client = get_redis()
+    while True:
+        try:
+            if len(tick()) >= settings.NOTIFICATION_SCHEDULER_BATCH_SIZE:
+                continue  # more may be due already
+            wait = seconds_until_next(timezone.now())
+        except Exception as e:
+            logger.error("Notification scheduler tick failed: %s", e, exc_info=True)
+            time.sleep(5)
+            continue
+        wait = max_sleep if wait is None else min(wait, max_sleep)
+        if wait > 0:
+            # Redis >= 6 accepts fractional BLPOP timeouts
+            client.blpop([WAKE_KEY], timeout=wait)
@@ -0,0 +1,21 @@
+"""
+Keep the Redis digest schedule (see scheduler.py) in step with User saves.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from . import scheduler
+
+
+@receiver(post_save, sender=User)
+def schedule_on_user_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'next_notification_at' not in update_fields:
+        return
+    due = instance.next_notification_at if instance.notification_enabled else None
+    scheduler.schedule_on_commit([(instance.pk, due)])
+
+
+@receiver(post_delete, sender=User)
+def unschedule_on_user_delete(sender, instance, **kwargs):
+    scheduler.schedule_on_commit([(instance.pk, None)])
@@ -1,23 +1,141 @@
+import bisect
 import logging
+import time
+import uuid
 from datetime import timedelta
 
-from celery import shared_task
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils import timezone
+from celery import group, shared_task
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import datetime
 
-import pytz
-
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 
 from accounts.models import User
+from clubs.models import ClubSubscription
 from events.models import Event
-from .utils import convert_to_local, is_within_minute, is_notification_due_today, format_event_datetime
+from . import scheduler, urgent
+from .mailer import build_digest_message, build_urgent_message
+from .models import OutboxEmail
+from .outbox import TokenBucket, claim_batch, deliver_batch, enqueue, outbox_email
+from .utils import compute_next_notification_at
 
 logger = logging.getLogger(__name__)
 
+DISPATCH_LOCK_KEY = 'notifications:dispatch-lock'
+
+
+class ChangedEvents:
+    """
+    Events added or updated in (start, now], loaded in one query and sorted
+    by change time so any later window start is a bisect away.
+
+    An event's change time is the later of created_at and updated_at that
+    is not after `now`, so `since(t)` matches exactly the rows of
+    created_at in (t, now] OR updated_at in (t, now].
+    """
+
+    def __init__(self, start, now):
+        events = (
+            Event.objects
+            .filter(
+                Q(created_at__gt=start, created_at__lte=now) |
+                Q(updated_at__gt=start, updated_at__lte=now)
+            )
+            .select_related('club', 'created_by')
+        )
+        keyed = sorted(
+            ((max(t for t in (event.created_at, event.updated_at) if t <= now), event) for event in events),
+            key=lambda pair: pair[0],
+        )
+        self._keys = [key for key, _ in keyed]
+        self._events = [event for _, event in keyed]
+
+    def __len__(self):
+        return len(self._events)
+
+    def ids(self):
+        return [event.pk for event in self._events]
+
+    def since(self, start, relevant=None):
+        """
+        Events changed after `start`, ordered by start time, optionally only
+        those whose ID is in `relevant`.
+        """
+        index = bisect.bisect_right(self._keys, start)
+        events = self._events[index:]
+        if relevant is not None:
+            events = [event for event in events if event.pk in relevant]
+        return sorted(events, key=lambda event: event.start)
+
+
+def subscribed_events(users, changed):
+    """
+    IDs of the changed events each subscribed user follows, for all users
+    at once in one query: events organized or co-organized by a subscribed
+    club, or by any club below it when the subscription includes sub-clubs.
+
+    Returns:
+        dict: user ID -> set of event IDs, for users with subscriptions only
+        (users without any subscription follow every club)
+    """
+    relevant = {user.pk: set() for user in users if user.has_subscriptions}
+    if not relevant or not len(changed):
+        return relevant
+
+    event_ids = changed.ids()
+    subscriptions = ClubSubscription.objects.filter(user_id__in=relevant).order_by()
+    flat = subscriptions.filter(include_sub_clubs=False)
+    # Through ClubClosure, which links every club to itself and to all the
+    # clubs below it, however deep
+    nested = subscriptions.filter(include_sub_clubs=True)
+    below = 'club__descendant_links__descendant__'
+    pairs = (
+        flat.filter(club__events__in=event_ids)
+        .values_list('user_id', 'club__events')
+        .union(
+            flat.filter(club__collaborated_events__in=event_ids)
+            .values_list('user_id', 'club__collaborated_events'),
+            nested.filter(**{f'{below}events__in': event_ids})
+            .values_list('user_id', f'{below}events'),
+            nested.filter(**{f'{below}collaborated_events__in': event_ids})
+            .values_list('user_id', f'{below}collaborated_events'),
+        )
+    )
+    for user_id, event_id in pairs:
+        relevant[user_id].add(event_id)
+    return relevant
+
+
+def _claim_due_users(now_utc, user_ids=None):
+    """
+    Claim the users whose digest is due: (user ID, scheduled slot) pairs.
+
+    Rows are locked with SKIP LOCKED, so a concurrent claim skips them
+    instead of waiting, and their next_notification_at is pushed out by
+    NOTIFICATION_CLAIM_LEASE_SECONDS before the lock is released. No other
+    run picks them up while their chunk is being sent; if a chunk is lost
+    the users fall due again when the lease runs out.
+    """
+    with transaction.atomic():
+        claims = (
+            User.objects
+            .select_for_update(skip_locked=True)
+            .filter(notification_enabled=True, next_notification_at__lte=now_utc)
+            .order_by('next_notification_at')
+            .values_list('pk', 'next_notification_at')
+        )
+        if user_ids is not None:
+            claims = claims.filter(pk__in=user_ids)
+        claims = list(claims)
+        if claims:
+            lease_until = now_utc + timedelta(seconds=settings.NOTIFICATION_CLAIM_LEASE_SECONDS)
+            User.objects.filter(pk__in=[pk for pk, _ in claims]).update(next_notification_at=lease_until)
+    return claims
+
 
 @shared_task(
     bind=True,
@@ -26,107 +144,244 @@ logger = logging.getLogger(__name__)
     retry_backoff_max=300,
     max_retries=3,
 )
-def dispatch_notifications(self):
+def dispatch_notifications(self, user_ids=None):
     """
     Celery task to dispatch email notifications to users.
     Runs every minute via Celery Beat.
 
     Sends ALL users with notifications enabled a digest of events
     from ANY club, as long as:
-      1. It is the user's notification time (or overdue today).
+      1. Their next notification is due (next_notification_at <= now).
       2. The event was added or updated in the 24 hours preceding the notification.
+
+    next_notification_at is kept up to date by User.save() and is indexed,
+    so each run only reads the users that are due instead of every user.
+
+    This task only coordinates: it claims the due users and fans them out
+    in chunks of NOTIFICATION_DISPATCH_CHUNK_SIZE as a group of
+    send_notification_chunk tasks, so a slow SMTP server no longer makes a
+    run overlap the next beat tick. A single chunk is handled in-process.
+    Digests are queued in the email outbox and delivered by send_outbox.
+
+    Args:
+        user_ids: users popped from the Redis schedule (see scheduler.py).
+            Omitted for the beat sweep, which claims everyone due and is the
+            only caller that takes the run-level lock; row claims already
+            keep scheduler runs from double-sending.
+    """
+    if user_ids is not None:
+        return _dispatch(user_ids)
+
+    lock_token = str(uuid.uuid4())
+    if not cache.add(DISPATCH_LOCK_KEY, lock_token, timeout=settings.NOTIFICATION_DISPATCH_LOCK_SECONDS):
+        return "Notification dispatch already running."
+    try:
+        return _dispatch()
+    finally:
+        if cache.get(DISPATCH_LOCK_KEY) == lock_token:
+            cache.delete(DISPATCH_LOCK_KEY)
+
+
+def _dispatch(user_ids=None):
+    claims = _claim_due_users(timezone.now(), user_ids)
+    if not claims:
+        return "No users eligible for notification at this time."
+
+    logger.info("Found %d eligible user(s) for notification dispatch.", len(claims))
+
+    # JSON-serializable payloads: [user ID, scheduled slot] pairs
+    size = settings.NOTIFICATION_DISPATCH_CHUNK_SIZE
+    chunks = [
+        [[pk, slot.isoformat()] for pk, slot in claims[i:i + size]]
+        for i in range(0, len(claims), size)
+    ]
+    if len(chunks) == 1:
+        return send_notification_chunk(chunks[0])
+
+    group(send_notification_chunk.s(chunk) for chunk in chunks).apply_async()
+    result = f"Dispatched {len(claims)} user(s) in {len(chunks)} chunk(s)"
+    logger.info(result)
+    return result
+
+
+@shared_task
+def send_notification_chunk(claims):
+    """
+    Queue the digests of one chunk of claimed users in the email outbox.
+
+    Args:
+        claims: list of [user ID, scheduled slot (ISO 8601)] pairs
+
+    Outbox rows and the users' new schedule are written in one transaction
+    with bulk_create/bulk_update; send_outbox delivers the rows afterwards.
+    Users whose digest could not be built get their scheduled slot back, so
+    the next run retries them.
     """
     now_utc = timezone.now()
+    slots = {pk: parse_datetime(slot) for pk, slot in claims}
+    users = load_claimed_users(slots)
+    if not users:
+        return "Queued 0 notification(s)"
 
-    # All users who have opted into notifications (no club requirement)
-    users = (
-        User.objects
-        .filter(notification_enabled=True, notification_time__isnull=False)
-        .select_related('club', 'sub_club')
-    )
+    window_starts = digest_window_starts(users, slots)
 
-    # ---------------------------------------------------------------
-    # Step 1: Determine which users are eligible RIGHT NOW
-    # ---------------------------------------------------------------
-    eligible_users = []
-    for user in users:
-        try:
-            local_now = convert_to_local(now_utc, user.timezone)
+    # Users due in the same minute have nearly identical windows, so the
+    # union window is fetched once and each user's slice bisected from it.
+    changed = ChangedEvents(min(window_starts.values()), now_utc)
+    relevant = subscribed_events(users, changed)
 
-            # Primary check: exact minute match
-            if is_within_minute(local_now.time(), user.notification_time):
-                eligible_users.append(user)
-                continue
+    emails, retry = build_digests(users, slots, window_starts, changed, now_utc, relevant)
+    queue_digests(users, emails, retry, now_utc)
 
-            # Fallback: notification is due today but hasn't been sent
-            if is_notification_due_today(local_now, user.notification_time, user.last_notification_sent_at, user.timezone):
-                eligible_users.append(user)
-        except Exception as e:
-            logger.error("Error checking eligibility for user %s: %s", user.email, e)
+    result = f"Queued {len(emails)} notification(s)"
+    logger.info(result)
+    return result
 
-    if not eligible_users:
-        return "No users eligible for notification at this time."
 
-    logger.info("Found %d eligible user(s) for notification dispatch.", len(eligible_users))
+# The steps of send_notification_chunk, also timed one by one by
+# `manage.py bench_dispatch`.
 
-    # ---------------------------------------------------------------
-    # Step 2: Send notification to each eligible user
-    # ---------------------------------------------------------------
-    sent_count = 0
-    for user in eligible_users:
-        try:
-            user_last_sent = user.last_notification_sent_at or timezone.make_aware(datetime(1970, 1, 1))
+def load_claimed_users(slots):
+    return list(
+        User.objects
+        .filter(pk__in=slots, notification_enabled=True)
+        .select_related('club', 'sub_club')
+        .annotate(has_subscriptions=Exists(ClubSubscription.objects.filter(user_id=OuterRef('pk'))))
+        .order_by('email')
+    )
 
-            # Compute the user's notification datetime for today (in their timezone)
-            try:
-                user_tz = pytz.timezone(user.timezone)
-            except Exception:
-                user_tz = pytz.UTC
 
-            local_now = convert_to_local(now_utc, user.timezone)
-            notif_today = user_tz.localize(
-                datetime.combine(local_now.date(), user.notification_time)
-            )
+def digest_window_starts(users, slots):
+    """
+    Effective window start per user: whichever is more recent, the user's
+    last notification or 24 hours before the scheduled notification time
+    (prevents spamming all historical events on the first day).
+    """
+    epoch = timezone.make_aware(datetime(1970, 1, 1))
+    return {
+        user.pk: max(slots[user.pk] - timedelta(hours=24), user.last_notification_sent_at or epoch)
+        for user in users
+    }
 
-            # Determine the 24-hour window before the user's notification time today
-            window_start = notif_today - timedelta(hours=24)
-            window_start_utc = window_start.astimezone(pytz.UTC)
-
-            # Effective start is whichever is more recent: the user's last notification time,
-            # or 24 hours ago (prevents spamming all historical events on the first day).
-            effective_start_utc = max(window_start_utc, user_last_sent)
-
-            # Query events across ALL clubs that:
-            # - Were added or updated in the 24h period before the notification
-            new_events = list(
-                Event.objects
-                .filter(
-                    Q(created_at__gt=effective_start_utc, created_at__lte=now_utc) |
-                    Q(updated_at__gt=effective_start_utc, updated_at__lte=now_utc)
-                )
-                .select_related('club', 'created_by')
-                .order_by('start')
-            )
+
+def build_digests(users, slots, window_starts, changed, now_utc, relevant=None):
+    """
+    Render each user's digest into an unsaved outbox row and move the user's
+    schedule on in memory. Subscribed users (keys of `relevant`, see
+    subscribed_events) only get the events of the clubs they follow.
+
+    Returns:
+        (outbox rows, IDs of users whose digest could not be built)
+    """
+    relevant = relevant or {}
+    emails = []
+    retry = set()
+    for user in users:
+        try:
+            # Events added or updated since the window start, across ALL
+            # clubs unless the user subscribes to some
+            new_events = changed.since(window_starts[user.pk], relevant.get(user.pk))
 
             if not new_events:
                 logger.debug("No relevant events for user %s.", user.email)
+                # Nothing to send today; tomorrow's window still covers
+                # anything added from now on.
+                user.next_notification_at = compute_next_notification_at(
+                    user.notification_time, user.timezone, now_utc, now_utc
+                )
                 continue
 
             logger.info(
-                "Sending %d event(s) to user %s.",
+                "Queueing %d event(s) for user %s.",
                 len(new_events), user.email
             )
-
-            success = send_digest_email(user, new_events)
-            if success:
-                user.last_notification_sent_at = now_utc
-                user.save(update_fields=['last_notification_sent_at'])
-                sent_count += 1
+            emails.append(outbox_email(build_digest_message(user, new_events), 'digest', user=user))
+            user.last_notification_sent_at = now_utc
+            user.schedule_next_notification(now=now_utc)
 
         except Exception as e:
             logger.error("Error processing notification for %s: %s", user.email, e, exc_info=True)
+            user.next_notification_at = slots[user.pk]
+            retry.add(user.pk)
+    return emails, retry
+
+
+def queue_digests(users, emails, retry, now_utc):
+    """Write the outbox rows and the users' new schedule in one transaction."""
+    # bulk_update sends no signals, so the Redis schedule is updated here;
+    # failed users are retried a minute later rather than in a tight loop
+    retry_at = now_utc + timedelta(minutes=1)
+    schedule_entries = [
+        (user.pk, retry_at if user.pk in retry else user.next_notification_at) for user in users
+    ]
+    with transaction.atomic():
+        enqueue(emails)
+        User.objects.bulk_update(users, ['last_notification_sent_at', 'next_notification_at'])
+        scheduler.schedule_on_commit(schedule_entries)
+
+
+@shared_task
+def send_urgent_notification(event_id):
+    """
+    Queue urgent-change emails for an event at the end of its debounce
+    window (see notifications/urgent.py).
+
+    The window is closed before the event is read, so an edit made while
+    this runs opens a new window instead of being lost. The event is read
+    as it is now: every edit made during the window goes out as one email
+    per recipient.
+    """
+    created, previous = urgent.close_window(event_id)
+    event = Event.objects.select_related('club').filter(pk=event_id).first()
+    if event is None:
+        return "Event deleted"
+    if not (urgent.is_urgent(event.start, event.end) or (previous and urgent.is_urgent(*previous))):
+        return "Event no longer urgent"
+
+    emails = [
+        outbox_email(build_urgent_message(user, event, created, previous), 'urgent', user=user)
+        for user in urgent.recipients(event).iterator(chunk_size=1000)
+    ]
+    with transaction.atomic():
+        enqueue(emails)
+
+    result = f"Queued {len(emails)} urgent notification(s)"
+    logger.info(result)
+    return result
 
-    result = f"Sent {sent_count} notification(s)"
+
+@shared_task
+def send_outbox():
+    """
+    Deliver pending outbox emails (see notifications/outbox.py).
+
+    Routed to the dedicated `email` queue; triggered whenever rows are
+    enqueued, and every minute by Celery Beat to pick up retries. Keeps
+    claiming batches for up to NOTIFICATION_OUTBOX_TIME_LIMIT_SECONDS.
+    """
+    bucket = TokenBucket(settings.NOTIFICATION_OUTBOX_RATE_PER_SECOND, settings.NOTIFICATION_OUTBOX_BURST)
+    deadline = time.monotonic() + settings.NOTIFICATION_OUTBOX_TIME_LIMIT_SECONDS
+    delivered = 0
+    while time.monotonic() < deadline:
+        rows = claim_batch(timezone.now(), settings.NOTIFICATION_OUTBOX_BATCH_SIZE)
+        if not rows:
+            break
+        delivered += deliver_batch(rows, bucket)
+
+    result = f"Delivered {delivered} email(s)"
+    logger.info(result)
+    return result
+
+
+@shared_task
+def prune_outbox():
+    """
+    Delete delivered and permanently failed outbox rows older than
+    NOTIFICATION_OUTBOX_RETENTION_DAYS. Runs daily via Celery Beat.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.NOTIFICATION_OUTBOX_RETENTION_DAYS)
+    deleted, _ = OutboxEmail.objects.filter(status__in=['sent', 'failed'], created_at__lt=cutoff).delete()
+    result = f"Pruned {deleted} outbox email(s)"
     logger.info(result)
     return result
 
@@ -143,52 +398,8 @@ def send_digest_email(user, events):
         bool: True if email sent successfully
     """
     try:
-        # Prepare event data for template
-        created_events = []
-        updated_events = []
-        for event in events:
-            # If the difference between updated_at and created_at is more than 2 seconds, consider it an update
-            is_updated = False
-            if hasattr(event, 'created_at') and hasattr(event, 'updated_at') and event.created_at and event.updated_at:
-                is_updated = abs((event.updated_at - event.created_at).total_seconds()) > 2
-
-            event_data = {
-                'title': event.title,
-                'club_name': event.club.name,
-                'description': event.description,
-                'datetime': format_event_datetime(event.start, user.timezone),
-                'end_datetime': format_event_datetime(event.end, user.timezone),
-                'location': event.location,
-                'created_by': f"{event.created_by.first_name} {event.created_by.last_name}".strip() or event.created_by.username,
-            }
-            if is_updated:
-                updated_events.append(event_data)
-            else:
-                created_events.append(event_data)
-
-        # Render HTML email
-        html_content = render_to_string('email_digest.html', {
-            'user': user,
-            'created_events': created_events,
-            'updated_events': updated_events,
-            'event_count': len(events),
-            'frontend_url': settings.FRONTEND_URL,
-        })
-
-        # Send email
-        send_mail(
-            subject=f"Upcoming Events - CampusCalendar",
-            message=(
-                f"You have {len(event_data)} upcoming event(s) across clubs. "
-                f"Visit {settings.FRONTEND_URL} to view details."
-            ),
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_content,
-            fail_silently=False,
-        )
-
-        logger.info("Digest email sent to %s (%d events)", user.email, len(event_data))
+        build_digest_message(user, events).send(fail_silently=False)
+        logger.info("Digest email sent to %s (%d events)", user.email, len(events))
         return True
 
     except Exception as e:
@@ -4,13 +4,32 @@ Tests for the notifications app: dispatch logic, batching, utilities.
 from datetime import time, datetime, timedelta
 from unittest.mock import patch, MagicMock
 
-from django.test import TestCase
+import smtplib
+from unittest import skipUnless
+
+import pytz
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends import locmem
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.urls import reverse
 from django.utils import timezone
 
 from accounts.models import User
 from clubs.models import Club
 from events.models import Event
-from notifications.utils import is_within_minute, is_notification_due_today, convert_to_local, format_event_datetime
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover
+    fakeredis = None
+
+from notifications import scheduler
+from notifications.mailer import build_digest_message, clear_render_cache, send_batched
+from notifications.utils import (
+    is_within_minute, is_notification_due_today, convert_to_local, format_event_datetime,
+    compute_next_notification_at,
+)
 
 
 class IsWithinMinuteTests(TestCase):
@@ -89,6 +108,331 @@ class ConvertToLocalTests(TestCase):
         self.assertEqual(local, utc_time)
 
 
+class ComputeNextNotificationAtTests(TestCase):
+    """Test the next-due computation behind the dispatch index."""
+
+    def utc(self, *args):
+        import pytz
+        return datetime(*args, tzinfo=pytz.UTC)
+
+    def test_due_today_when_never_sent(self):
+        # 09:00 in Kolkata is 03:30 UTC; already passed, so due immediately
+        now = self.utc(2025, 6, 15, 6, 0)
+        self.assertEqual(
+            compute_next_notification_at(time(9, 0), 'Asia/Kolkata', now),
+            self.utc(2025, 6, 15, 3, 30),
+        )
+
+    def test_tomorrow_after_sending_today(self):
+        now = self.utc(2025, 6, 15, 3, 30)
+        self.assertEqual(
+            compute_next_notification_at(time(9, 0), 'Asia/Kolkata', now, now),
+            self.utc(2025, 6, 16, 3, 30),
+        )
+
+    def test_later_time_today_after_sending(self):
+        """Moving the time later in the day schedules a second digest today."""
+        sent = self.utc(2025, 6, 15, 3, 30)
+        now = self.utc(2025, 6, 15, 5, 0)
+        self.assertEqual(
+            compute_next_notification_at(time(15, 0), 'Asia/Kolkata', now, sent),
+            self.utc(2025, 6, 15, 9, 30),
+        )
+
+    def test_keeps_local_time_across_dst(self):
+        # Sent Saturday 08:00 EST (13:00 UTC); Sunday 08:00 is EDT (12:00 UTC)
+        sent = self.utc(2025, 3, 8, 13, 0)
+        self.assertEqual(
+            compute_next_notification_at(time(8, 0), 'America/New_York', sent, sent),
+            self.utc(2025, 3, 9, 12, 0),
+        )
+
+    def test_skipped_time_fires_after_jump(self):
+        # 02:30 does not exist on 2025-03-09 in New York; fires at 03:30 EDT
+        sent = self.utc(2025, 3, 8, 7, 30)
+        self.assertEqual(
+            compute_next_notification_at(time(2, 30), 'America/New_York', sent, sent),
+            self.utc(2025, 3, 9, 7, 30),
+        )
+
+    def test_no_time(self):
+        self.assertIsNone(compute_next_notification_at(None, 'UTC', timezone.now()))
+
+
+class FlakyBackend(locmem.EmailBackend):
+    """locmem backend that refuses some recipients and drops the session once for others."""
+    opened = 0
+    refused = set()
+    drop_once = set()
+
+    def open(self):
+        FlakyBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            recipient = message.to[0]
+            if recipient in FlakyBackend.refused:
+                raise smtplib.SMTPRecipientsRefused({recipient: (550, b'No such user')})
+            if recipient in FlakyBackend.drop_once:
+                FlakyBackend.drop_once.discard(recipient)
+                raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return super().send_messages(messages)
+
+
+class SendBatchedTests(TestCase):
+    """Test batched delivery over reused connections."""
+
+    def setUp(self):
+        FlakyBackend.opened = 0
+        FlakyBackend.refused = set()
+        FlakyBackend.drop_once = set()
+
+    def send(self, recipients, **kwargs):
+        messages = [EmailMessage('Digest', 'Body', 'noreply@example.com', [to]) for to in recipients]
+        return send_batched(messages, connection_factory=lambda **kw: FlakyBackend(**kw), **kwargs)
+
+    def test_one_connection_per_batch(self):
+        results = self.send([f'u{i}@example.com' for i in range(5)], batch_size=2)
+        self.assertEqual(results, [None] * 5)
+        self.assertEqual(FlakyBackend.opened, 3)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_failures_recorded_per_message(self):
+        FlakyBackend.refused = {'gone@example.com'}
+        results = self.send(['a@example.com', 'gone@example.com', 'b@example.com'], batch_size=10)
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], smtplib.SMTPRecipientsRefused)
+        self.assertIsNone(results[2])
+        self.assertEqual(FlakyBackend.opened, 1)  # a refusal does not reconnect
+        self.assertEqual([m.to for m in mail.outbox], [['a@example.com'], ['b@example.com']])
+
+    def test_reconnects_after_disconnect(self):
+        FlakyBackend.drop_once = {'b@example.com'}
+        results = self.send(['a@example.com', 'b@example.com', 'c@example.com'], batch_size=10)
+        self.assertEqual(results, [None] * 3)
+        self.assertEqual(FlakyBackend.opened, 2)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_reconnects_are_bounded(self):
+        FlakyBackend.drop_once = {'b@example.com'}
+        results = self.send(['a@example.com', 'b@example.com'], batch_size=10, max_reconnects=0)
+        self.assertIsInstance(results[1], smtplib.SMTPServerDisconnected)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class DigestRenderCacheTests(TestCase):
+    """Test that digest bodies are rendered once per event set, timezone and time format."""
+
+    def setUp(self):
+        clear_render_cache()
+        club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.creator = User.objects.create_user(
+            email='admin@cs.com', username='admin', password='Pass123!', notification_enabled=False,
+        )
+        now = timezone.now()
+        self.event = Event.objects.create(
+            title='Workshop', start=now + timedelta(days=2), end=now + timedelta(days=2, hours=1),
+            location='Lab', club=club, created_by=self.creator,
+        )
+
+    def user(self, name, **kwargs):
+        return User(email=f'{name}@example.com', username=name, first_name=name, **kwargs)
+
+    @patch('notifications.mailer.render_to_string', wraps=render_to_string)
+    def test_same_digest_rendered_once_per_timezone(self, mock_render):
+        ann = build_digest_message(self.user('Ann', timezone='UTC'), [self.event])
+        bob = build_digest_message(self.user('Bob', timezone='UTC'), [self.event])
+        self.assertEqual(mock_render.call_count, 1)
+        self.assertIn('Hi Ann,', ann.alternatives[0][0])
+        self.assertIn('Hi Bob,', bob.alternatives[0][0])
+        self.assertEqual(ann.body, bob.body)
+
+        build_digest_message(self.user('Cy', timezone='Asia/Kolkata'), [self.event])
+        build_digest_message(self.user('Di', timezone='UTC', time_format='24h'), [self.event])
+        self.assertEqual(mock_render.call_count, 3)
+
+    def test_edited_event_is_rendered_again(self):
+        before = build_digest_message(self.user('Ann', timezone='UTC'), [self.event])
+        self.event.title = 'Renamed Workshop'
+        self.event.save()
+        after = build_digest_message(self.user('Ann', timezone='UTC'), [self.event])
+        self.assertNotIn('Renamed Workshop', before.alternatives[0][0])
+        self.assertIn('Renamed Workshop', after.alternatives[0][0])
+
+    def test_greeting_is_escaped(self):
+        message = build_digest_message(self.user('<b>Eve</b>', timezone='UTC'), [self.event])
+        self.assertIn('Hi &lt;b&gt;Eve&lt;/b&gt;,', message.alternatives[0][0])
+
+    def test_time_format_preference(self):
+        self.event.start = datetime(2025, 6, 15, 15, 30, tzinfo=pytz.UTC)
+        self.event.end = self.event.start + timedelta(hours=1)
+        twelve = build_digest_message(self.user('Ann', timezone='UTC'), [self.event])
+        clear_render_cache()
+        twenty_four = build_digest_message(self.user('Bob', timezone='UTC', time_format='24h'), [self.event])
+        self.assertIn('03:30 PM', twelve.alternatives[0][0])
+        self.assertIn('at 15:30', twenty_four.alternatives[0][0])
+
+
+class OutboxTests(TestCase):
+    """Test claiming, rate limiting and retrying outbox deliveries."""
+
+    def setUp(self):
+        from notifications.models import OutboxEmail
+        FlakyBackend.opened = 0
+        FlakyBackend.refused = set()
+        FlakyBackend.drop_once = set()
+        self.rows = OutboxEmail.objects.bulk_create([
+            OutboxEmail(kind='digest', to_email=f'u{i}@example.com', subject='Digest', body='Body')
+            for i in range(3)
+        ])
+
+    def test_token_bucket_waits_for_tokens(self):
+        from notifications.outbox import TokenBucket
+        clock = [0.0]
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            clock[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=4, clock=lambda: clock[0], sleep=sleep)
+        bucket.take(4)
+        self.assertEqual(slept, [])
+        bucket.take(3)
+        self.assertEqual(slept, [1.5])
+        with self.assertRaises(ValueError):
+            bucket.take(5)
+
+    def test_claimed_rows_are_leased(self):
+        from notifications.outbox import claim_batch
+        now = timezone.now()
+        self.assertEqual(len(claim_batch(now, 2)), 2)
+        self.assertEqual(len(claim_batch(now, 10)), 1)
+        self.assertEqual(claim_batch(now, 10), [])
+        # An abandoned lease is picked up again once it runs out
+        self.assertEqual(len(claim_batch(now + timedelta(hours=1), 10)), 3)
+
+    def test_time_critical_kinds_jump_the_digest_backlog(self):
+        from notifications.models import OutboxEmail
+        from notifications.outbox import claim_batch
+        OutboxEmail.objects.bulk_create([
+            OutboxEmail(kind='digest', to_email=f'backlog{i}@example.com', subject='Digest', body='Body')
+            for i in range(20)
+        ])
+        reset = OutboxEmail.objects.create(kind='password_reset', to_email='r@example.com', subject='Reset', body='Link')
+        alert = OutboxEmail.objects.create(kind='urgent', to_email='a@example.com', subject='Soon', body='Moved')
+
+        claimed = claim_batch(timezone.now(), 3)
+        self.assertEqual([row.pk for row in claimed[:2]], [reset.pk, alert.pk])
+        self.assertEqual(claimed[2].pk, self.rows[0].pk)
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.FlakyBackend', NOTIFICATION_OUTBOX_MAX_ATTEMPTS=1)
+    def test_marks_delivered_and_failed(self):
+        from notifications.models import OutboxEmail
+        from notifications.tasks import send_outbox
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        FlakyBackend.refused = {'u1@example.com'}
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertIn('Delivered 2 email', send_outbox())
+        # One lease update and one outcome update for the whole batch
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        statuses = dict(OutboxEmail.objects.values_list('to_email', 'status'))
+        self.assertEqual(statuses, {'u0@example.com': 'sent', 'u1@example.com': 'failed', 'u2@example.com': 'sent'})
+        self.assertEqual(FlakyBackend.opened, 1)
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class NotificationSchedulerTests(TestCase):
+    """Test the Redis sorted-set schedule against fakeredis."""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = patch.object(scheduler, '_client', self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = timezone.now()
+        self.club = Club.objects.create(slug='cs', name='CS Club', color='#3B82F6')
+        self.creator = User.objects.create_user(
+            email='admin@cs.com', username='admin', password='Pass123!', notification_enabled=False,
+        )
+
+    def make_user(self, name, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return User.objects.create_user(
+                email=f'{name}@example.com', username=name, password='Pass123!', timezone='UTC', **kwargs,
+            )
+
+    def score(self, user):
+        return self.redis.zscore(scheduler.SCHEDULE_KEY, str(user.pk))
+
+    def test_user_saves_keep_schedule(self):
+        user = self.make_user('ann', notification_time=time(9, 0))
+        self.assertEqual(self.score(user), user.next_notification_at.timestamp())
+
+        user.notification_enabled = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertIsNone(self.score(user))
+
+    def test_pop_due_returns_each_user_once(self):
+        scheduler.schedule([(1, self.now - timedelta(minutes=1)), (2, self.now), (3, self.now + timedelta(hours=1))])
+        self.assertEqual(sorted(scheduler.pop_due(self.now, 10)), [1, 2])
+        self.assertEqual(scheduler.pop_due(self.now, 10), [])
+        self.assertAlmostEqual(scheduler.seconds_until_next(self.now), 3600, places=3)
+
+    def test_earlier_entry_wakes_loop(self):
+        scheduler.schedule([(1, self.now + timedelta(hours=1))])
+        self.redis.delete(scheduler.WAKE_KEY)
+        scheduler.schedule([(2, self.now + timedelta(hours=2))])
+        self.assertEqual(self.redis.llen(scheduler.WAKE_KEY), 0)
+        scheduler.schedule([(3, self.now + timedelta(minutes=5))])
+        self.assertEqual(self.redis.llen(scheduler.WAKE_KEY), 1)
+
+    @patch('notifications.tasks.dispatch_notifications.delay')
+    def test_tick_dispatches_only_due_users(self, mock_delay):
+        due = self.make_user('due', notification_time=time(self.now.hour, self.now.minute))
+        later = self.make_user('later', notification_time=time(9, 0))
+        scheduler.schedule([(later.pk, self.now + timedelta(hours=2))])
+        self.assertEqual(scheduler.tick(), [due.pk])
+        mock_delay.assert_called_once_with(user_ids=[due.pk])
+        self.assertEqual(scheduler.tick(), [])
+
+    def test_rebuild_restores_schedule(self):
+        user = self.make_user('ann', notification_time=time(9, 0))
+        self.redis.flushall()
+        self.assertEqual(scheduler.rebuild(), 1)
+        self.assertEqual(self.score(user), user.next_notification_at.timestamp())
+
+    @patch('notifications.tasks.send_outbox.delay')
+    def test_dispatch_reschedules_sent_users(self, mock_send_outbox):
+        from notifications.tasks import dispatch_notifications
+
+        Event.objects.create(
+            title='Talk', start=self.now + timedelta(days=3), end=self.now + timedelta(days=3, hours=1),
+            location='Hall', club=self.club, created_by=self.creator,
+        )
+        minute = time(self.now.hour, self.now.minute)
+        popped = self.make_user('popped', notification_time=minute)
+        other = self.make_user('other', notification_time=minute)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = dispatch_notifications(user_ids=[popped.pk])
+        self.assertIn('Queued 1 notification', result)
+        mock_send_outbox.assert_called_once()
+
+        popped.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.score(popped), popped.next_notification_at.timestamp())
+        self.assertGreater(popped.next_notification_at, self.now + timedelta(hours=23))
+        # Not popped, so not claimed
+        self.assertIsNone(other.last_notification_sent_at)
+
+
 class DispatchNotificationsTests(TestCase):
     """Test the dispatch_notifications task logic."""
 
@@ -126,7 +470,7 @@ class DispatchNotificationsTests(TestCase):
 
         self.now = timezone.now()
 
-    @patch('notifications.tasks.send_digest_email', return_value=True)
+    @patch('notifications.tasks.build_digest_message', wraps=build_digest_message)
     def test_user_gets_events_added_recently_from_other_clubs(self, mock_send):
         """
         Users get notified about newly added events from ANY club in the 24h window before notification.
@@ -150,7 +494,7 @@ class DispatchNotificationsTests(TestCase):
         self.assertEqual(mock_send.call_count, 2)
         self.assertIn('2 notification', result)
 
-    @patch('notifications.tasks.send_digest_email', return_value=True)
+    @patch('notifications.tasks.build_digest_message', wraps=build_digest_message)
     def test_events_added_outside_24h_window_excluded(self, mock_send):
         """Events added > 24h ago should NOT be notified."""
         event = Event.objects.create(
@@ -174,7 +518,7 @@ class DispatchNotificationsTests(TestCase):
 
         mock_send.assert_not_called()
 
-    @patch('notifications.tasks.send_digest_email', return_value=True)
+    @patch('notifications.tasks.build_digest_message', wraps=build_digest_message)
     def test_updated_event_triggers_notification(self, mock_send):
         """An event updated in the last 24h (after old notification) triggers."""
         event = Event.objects.create(
@@ -201,7 +545,7 @@ class DispatchNotificationsTests(TestCase):
         event_list = args[1]
         self.assertIn(event, event_list)
 
-    @patch('notifications.tasks.send_digest_email', return_value=True)
+    @patch('notifications.tasks.build_digest_message', wraps=build_digest_message)
     def test_no_dispatch_without_events_in_added_window(self, mock_send):
         """No notifications when there are no newly added events."""
         self.user_a.notification_time = time(self.now.hour, self.now.minute)
@@ -213,3 +557,388 @@ class DispatchNotificationsTests(TestCase):
         from notifications.tasks import dispatch_notifications
         result = dispatch_notifications()
         mock_send.assert_not_called()
+
+    def test_schedule_follows_settings(self):
+        """next_notification_at is recomputed on settings change and cleared when disabled."""
+        self.user_a.notification_time = time(self.now.hour, self.now.minute)
+        self.user_a.save()
+        self.user_a.refresh_from_db()
+        self.assertLessEqual(self.user_a.next_notification_at, timezone.now())
+
+        self.user_a.notification_enabled = False
+        self.user_a.save(update_fields=['notification_enabled'])
+        self.user_a.refresh_from_db()
+        self.assertIsNone(self.user_a.next_notification_at)
+
+    @patch('notifications.tasks.build_digest_message', wraps=build_digest_message)
+    def test_only_due_users_are_read(self, mock_send):
+        """Users not yet due are excluded by the query, and a send moves the schedule on."""
+        Event.objects.create(
+            title='Talk',
+            start=self.now + timedelta(days=3),
+            end=self.now + timedelta(days=3, hours=1),
+            location='Hall',
+            club=self.club_a,
+            created_by=self.creator,
+        )
+        self.user_a.notification_time = time(self.now.hour, self.now.minute)
+        self.user_a.save()
+        User.objects.filter(pk=self.user_no_club.pk).update(next_notification_at=self.now + timedelta(hours=1))
+
+        from notifications.tasks import dispatch_notifications
+        result = dispatch_notifications()
+
+        self.assertEqual([call[0][0] for call in mock_send.call_args_list], [self.user_a])
+        self.assertIn('1 notification', result)
+        self.user_a.refresh_from_db()
+        self.assertGreater(self.user_a.next_notification_at, self.now + timedelta(hours=23))
+
+        mock_send.reset_mock()
+        dispatch_notifications()
+        mock_send.assert_not_called()
+
+    @patch('notifications.tasks.build_digest_message', wraps=build_digest_message)
+    def test_user_without_events_moves_to_next_slot(self, mock_send):
+        self.user_a.notification_time = time(self.now.hour, self.now.minute)
+        self.user_a.save()
+        self.user_no_club.notification_enabled = False
+        self.user_no_club.save()
+
+        from notifications.tasks import dispatch_notifications
+        dispatch_notifications()
+
+        mock_send.assert_not_called()
+        self.user_a.refresh_from_db()
+        self.assertIsNone(self.user_a.last_notification_sent_at)
+        self.assertGreater(self.user_a.next_notification_at, self.now + timedelta(hours=23))
+
+    @patch('notifications.tasks.build_digest_message', wraps=build_digest_message)
+    def test_event_query_shared_across_users(self, mock_send):
+        """One event query per run, however many users are due; windows still differ per user."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from notifications.tasks import dispatch_notifications
+
+        old = Event.objects.create(
+            title='Earlier', start=self.now + timedelta(days=2), end=self.now + timedelta(days=2, hours=1),
+            location='Hall', club=self.club_a, created_by=self.creator,
+        )
+        Event.objects.filter(pk=old.pk).update(
+            created_at=self.now - timedelta(hours=3), updated_at=self.now - timedelta(hours=3),
+        )
+        recent = Event.objects.create(
+            title='Later', start=self.now + timedelta(days=1), end=self.now + timedelta(days=1, hours=1),
+            location='Hall', club=self.club_b, created_by=self.creator,
+        )
+        for i in range(3):
+            User.objects.create_user(
+                email=f'extra{i}@example.com', username=f'extra{i}', password='Pass123!',
+                notification_time=time(self.now.hour, self.now.minute), timezone='UTC',
+            )
+        for user in [self.user_a, self.user_no_club]:
+            user.notification_time = time(self.now.hour, self.now.minute)
+            user.save()
+        # user_a already got a digest an hour ago, so only sees the later event
+        User.objects.filter(pk=self.user_a.pk).update(last_notification_sent_at=self.now - timedelta(hours=1))
+
+        with CaptureQueriesContext(connection) as ctx:
+            dispatch_notifications()
+
+        event_queries = [q for q in ctx.captured_queries if 'FROM "events_event"' in q['sql']]
+        self.assertEqual(len(event_queries), 1)
+        self.assertEqual(mock_send.call_count, 5)
+        events_by_user = {call[0][0].pk: call[0][1] for call in mock_send.call_args_list}
+        self.assertEqual(events_by_user[self.user_a.pk], [recent])
+        self.assertEqual(events_by_user[self.user_no_club.pk], [recent, old])
+
+    @patch('notifications.tasks.build_digest_message', wraps=build_digest_message)
+    def test_subscribed_users_only_get_followed_clubs(self, mock_send):
+        """Subscriptions narrow the digest, resolved for all due users in one query."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from clubs.models import ClubSubscription
+        from notifications.tasks import dispatch_notifications
+
+        sub_club = Club.objects.create(slug='cs-web', name='Web Group', parent=self.club_a)
+        club_c = Club.objects.create(slug='music', name='Music Club')
+
+        def event(title, club, hours):
+            return Event.objects.create(
+                title=title, start=self.now + timedelta(days=2, hours=hours),
+                end=self.now + timedelta(days=2, hours=hours + 1),
+                location=f'Room {hours}', club=club, created_by=self.creator,
+            )
+
+        own = event('CS Talk', self.club_a, 1)
+        nested = event('Web Meetup', sub_club, 2)
+        collab = event('Jam Session', club_c, 3)
+        collab.collaborating_clubs.add(self.club_a)
+        other = event('AI Workshop', self.club_b, 4)
+
+        flat_user = User.objects.create_user(
+            email='flat@example.com', username='flat', password='Pass123!', timezone='UTC',
+        )
+        quiet_user = User.objects.create_user(
+            email='quiet@example.com', username='quiet', password='Pass123!', timezone='UTC',
+        )
+        ClubSubscription.objects.create(user=self.user_a, club=self.club_a)
+        ClubSubscription.objects.create(user=flat_user, club=self.club_a, include_sub_clubs=False)
+        ClubSubscription.objects.create(user=quiet_user, club=Club.objects.create(slug='chess', name='Chess'))
+        for user in [self.user_a, self.user_no_club, flat_user, quiet_user]:
+            user.notification_time = time(self.now.hour, self.now.minute)
+            user.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = dispatch_notifications()
+
+        relevance_queries = [
+            q for q in ctx.captured_queries
+            if '"clubs_clubsubscription"' in q['sql'] and '"events_event"' in q['sql']
+        ]
+        self.assertEqual(len(relevance_queries), 1)
+        self.assertIn('3 notification', result)
+        events_by_user = {call[0][0].pk: call[0][1] for call in mock_send.call_args_list}
+        self.assertEqual(events_by_user[self.user_a.pk], [own, nested, collab])
+        self.assertEqual(events_by_user[flat_user.pk], [own, collab])
+        self.assertEqual(events_by_user[self.user_no_club.pk], [own, nested, collab, other])
+        # Nothing followed changed: skipped before rendering, moved to tomorrow
+        self.assertNotIn(quiet_user.pk, events_by_user)
+        quiet_user.refresh_from_db()
+        self.assertGreater(quiet_user.next_notification_at, self.now + timedelta(hours=23))
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.FlakyBackend')
+    def test_digests_go_through_outbox(self):
+        """Digests are queued with the users' new schedule; a refused delivery is retried from the outbox."""
+        from notifications.models import OutboxEmail
+        from notifications.tasks import dispatch_notifications, send_outbox
+
+        FlakyBackend.refused = {self.user_no_club.email}
+        FlakyBackend.drop_once = set()
+        Event.objects.create(
+            title='Talk', start=self.now + timedelta(days=3), end=self.now + timedelta(days=3, hours=1),
+            location='Hall', club=self.club_a, created_by=self.creator,
+        )
+        for user in [self.user_a, self.user_no_club]:
+            user.notification_time = time(self.now.hour, self.now.minute)
+            user.save()
+
+        self.assertIn('Queued 2 notification', dispatch_notifications())
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.filter(kind='digest', status='pending').count(), 2)
+        for user in [self.user_a, self.user_no_club]:
+            user.refresh_from_db()
+            self.assertIsNotNone(user.last_notification_sent_at)
+            self.assertGreater(user.next_notification_at, self.now + timedelta(hours=23))
+
+        self.assertIn('Delivered 1 email', send_outbox())
+        self.assertEqual([m.to for m in mail.outbox], [[self.user_a.email]])
+        self.assertIn('Hi member_a,', mail.outbox[0].alternatives[0][0])
+        refused = OutboxEmail.objects.get(to_email=self.user_no_club.email)
+        self.assertEqual((refused.status, refused.attempts), ('pending', 1))
+        self.assertGreater(refused.available_at, timezone.now())
+
+    @override_settings(NOTIFICATION_DISPATCH_CHUNK_SIZE=1)
+    @patch('notifications.tasks.group')
+    def test_fans_out_chunks_and_claims_users(self, mock_group):
+        """Due users are split into a group of chunk tasks and are not claimed twice."""
+        from notifications.tasks import dispatch_notifications
+
+        Event.objects.create(
+            title='Talk', start=self.now + timedelta(days=3), end=self.now + timedelta(days=3, hours=1),
+            location='Hall', club=self.club_a, created_by=self.creator,
+        )
+        for user in [self.user_a, self.user_no_club]:
+            user.notification_time = time(self.now.hour, self.now.minute)
+            user.save()
+
+        result = dispatch_notifications()
+        self.assertIn('2 user(s) in 2 chunk(s)', result)
+        signatures = list(mock_group.call_args[0][0])
+        self.assertEqual(len(signatures), 2)
+        mock_group.return_value.apply_async.assert_called_once()
+
+        # Claimed users are leased out, so an overlapping run finds nobody due
+        self.assertIn('No users eligible', dispatch_notifications())
+
+        for signature in signatures:
+            self.assertIn('1 notification', signature())
+        from notifications.tasks import send_outbox
+        send_outbox()
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted([self.user_a.email, self.user_no_club.email]))
+
+    @patch('notifications.tasks.build_digest_message', wraps=build_digest_message)
+    def test_overlapping_run_skips_while_locked(self, mock_build):
+        from django.core.cache import cache
+        from notifications.tasks import DISPATCH_LOCK_KEY, dispatch_notifications
+
+        self.user_a.notification_time = time(self.now.hour, self.now.minute)
+        self.user_a.save()
+        cache.set(DISPATCH_LOCK_KEY, 'other-run')
+        try:
+            self.assertIn('already running', dispatch_notifications())
+        finally:
+            cache.delete(DISPATCH_LOCK_KEY)
+        self.user_a.refresh_from_db()
+        self.assertLessEqual(self.user_a.next_notification_at, timezone.now())
+
+
+class UrgentNotificationTests(TestCase):
+    """Test urgent-change alerts: triggering, coalescing and recipients."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+        cache.clear()
+        self.main = Club.objects.create(slug='tech', name='Tech Society', color='#3B82F6')
+        self.sub = Club.objects.create(slug='tech-ai', name='AI Group', color='#3B82F6', parent=self.main)
+        self.other = Club.objects.create(slug='music', name='Music Club', color='#F59E0B')
+        self.organizer = User.objects.create_user(
+            email='organizer@example.com', username='organizer', password='Pass123!',
+            club=self.main, sub_club=self.sub, notification_enabled=False,
+        )
+
+        def member(name, **kwargs):
+            kwargs.setdefault('urgent_notifications_enabled', True)
+            return User.objects.create_user(
+                email=f'{name}@example.com', username=name, password='Pass123!',
+                notification_enabled=False, timezone='UTC', **kwargs,
+            )
+
+        self.main_member = member('main', club=self.main)
+        self.sub_member = member('sub', club=self.main, sub_club=self.sub)
+        self.no_club = member('noclub')
+        self.other_member = member('other', club=self.other)
+        self.opted_out = member('optedout', club=self.main, urgent_notifications_enabled=False)
+        self.extra_member = member('extra')
+        self.extra_member.extra_clubs.add(self.sub)
+
+        self.now = timezone.now()
+        self.event = Event.objects.create(
+            title='AI Talk', start=self.now + timedelta(days=7), end=self.now + timedelta(days=7, hours=1),
+            location='Hall 1', club=self.sub, created_by=self.organizer,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.organizer)
+
+    def _patch(self, **data):
+        return self.client.patch(reverse('event-detail', args=[self.event.id]), data, format='json')
+
+    @patch('notifications.tasks.send_urgent_notification.apply_async')
+    def test_edits_within_window_are_coalesced(self, mock_apply):
+        start = self.now + timedelta(hours=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._patch(start=start.isoformat(), end=(start + timedelta(hours=1)).isoformat())
+        with self.captureOnCommitCallbacks(execute=True):
+            self._patch(location='Hall 2')
+        mock_apply.assert_called_once_with((str(self.event.id),), countdown=120)
+
+    @patch('notifications.tasks.send_urgent_notification.apply_async')
+    def test_changes_outside_horizon_are_not_urgent(self, mock_apply):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._patch(location='Hall 2')
+            self.client.post(reverse('event-list'), {
+                'title': 'Next month', 'location': 'Hall 3',
+                'start': (self.now + timedelta(days=30)).isoformat(),
+                'end': (self.now + timedelta(days=30, hours=1)).isoformat(),
+            }, format='json')
+        mock_apply.assert_not_called()
+
+    @patch('notifications.tasks.send_urgent_notification.apply_async')
+    def test_new_event_starting_soon_is_urgent(self, mock_apply):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('event-list'), {
+                'title': 'Pop-up meetup', 'location': 'Hall 3',
+                'start': (self.now + timedelta(hours=2)).isoformat(),
+                'end': (self.now + timedelta(hours=3)).isoformat(),
+            }, format='json')
+        mock_apply.assert_called_once_with((response.data['id'],), countdown=120)
+
+    @patch('notifications.tasks.send_urgent_notification.apply_async')
+    def test_bulk_changes_are_urgent(self, mock_apply):
+        start = self.now + timedelta(hours=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('event-bulk'), {'operations': [
+                {'op': 'update', 'id': str(self.event.id), 'data': {
+                    'start': start.isoformat(), 'end': (start + timedelta(hours=1)).isoformat(),
+                }},
+                {'op': 'create', 'data': {
+                    'title': 'Pop-up meetup', 'location': 'Hall 3',
+                    'start': (self.now + timedelta(hours=2)).isoformat(),
+                    'end': (self.now + timedelta(hours=3)).isoformat(),
+                }},
+                {'op': 'create', 'data': {
+                    'title': 'Next month', 'location': 'Hall 3',
+                    'start': (self.now + timedelta(days=30)).isoformat(),
+                    'end': (self.now + timedelta(days=30, hours=1)).isoformat(),
+                }},
+            ]}, format='json')
+        self.assertTrue(response.data['applied'])
+        created_id = str(response.data['results'][1]['id'])
+        self.assertEqual(
+            sorted(call.args[0] for call in mock_apply.call_args_list),
+            sorted([(str(self.event.id),), (created_id,)]),
+        )
+
+        # The window remembers the timing before the bulk edit
+        from notifications.urgent import close_window
+        created, previous = close_window(str(self.event.id))
+        self.assertFalse(created)
+        self.assertEqual(previous[0], self.event.start)
+
+    @patch('notifications.tasks.send_urgent_notification.apply_async')
+    def test_one_email_per_recipient_after_window(self, mock_apply):
+        from notifications.tasks import send_outbox, send_urgent_notification
+        old_start = self.event.start
+        start = self.now + timedelta(hours=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._patch(start=start.isoformat(), end=(start + timedelta(hours=1)).isoformat())
+        with self.captureOnCommitCallbacks(execute=True):
+            self._patch(location='Hall 2')
+
+        result = send_urgent_notification(str(self.event.id))
+        self.assertIn('Queued 4 urgent', result)
+        send_outbox()
+
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            sorted(user.email for user in (self.main_member, self.sub_member, self.no_club, self.extra_member)),
+        )
+        message = mail.outbox[0]
+        self.assertIn('Event rescheduled: AI Talk', message.subject)
+        self.assertIn('Hall 2', message.body)
+        self.assertIn(format_event_datetime(old_start, 'UTC'), message.body)
+
+        # The window is closed: the next edit opens a new one
+        with self.captureOnCommitCallbacks(execute=True):
+            self._patch(location='Hall 3')
+        self.assertEqual(mock_apply.call_count, 2)
+
+    def test_task_skips_deleted_and_no_longer_urgent_events(self):
+        from notifications.tasks import send_urgent_notification
+        self.assertEqual(send_urgent_notification(self.event.id), "Event no longer urgent")
+        event_id = self.event.id
+        self.event.delete()
+        self.assertEqual(send_urgent_notification(event_id), "Event deleted")
+
+    def test_collaborating_club_members_are_recipients(self):
+        from notifications.urgent import recipients
+        self.event.club = self.main
+        self.event.save()
+        self.assertNotIn(self.other_member, recipients(self.event))
+        self.event.collaborating_clubs.add(self.other)
+        self.assertIn(self.other_member, recipients(self.event))
+        # Extra clubs are followed one by one, without their parent
+        self.assertNotIn(self.extra_member, recipients(self.event))
+
+    def test_subscriptions_replace_club_membership(self):
+        from clubs.models import ClubSubscription
+        from notifications.urgent import recipients
+        # Subscribed elsewhere: no longer follows their own club
+        ClubSubscription.objects.create(user=self.main_member, club=self.other)
+        # Follows the main club and, through it, the sub-club
+        ClubSubscription.objects.create(user=self.other_member, club=self.main)
+        users = list(recipients(self.event))
+        self.assertNotIn(self.main_member, users)
+        self.assertIn(self.other_member, users)
+        ClubSubscription.objects.filter(user=self.other_member).update(include_sub_clubs=False)
+        self.assertNotIn(self.other_member, recipients(self.event))
@@ -0,0 +1,135 @@
+"""
+Urgent-change emails.
+
+The daily digest is too late for an event that was just moved to an hour
+from now. When an event is created or edited through the API and it starts
+(or started, before the edit) within NOTIFICATION_URGENT_HORIZON_HOURS,
+members who opted in are emailed right away:
+
+- the API only does a cache.add() and a Celery publish after commit; the
+  recipients are resolved and the emails written to the outbox by
+  notifications.tasks.send_urgent_notification;
+- the first edit opens a debounce window of NOTIFICATION_URGENT_DEBOUNCE_SECONDS
+  (a per-event cache key) and schedules the task at its end. Later edits in
+  the window find the key taken and do nothing, and the task reads the event
+  as it is by then, so a burst of edits becomes one message per recipient.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import User
+from clubs.models import ClubClosure, ClubSubscription
+
+logger = logging.getLogger(__name__)
+
+WINDOW_KEY_PREFIX = 'notifications:urgent:'
+
+
+def window_key(event_id):
+    return f'{WINDOW_KEY_PREFIX}{event_id}'
+
+
+def is_urgent(start, end=None, now=None):
+    """Whether an event with this timing has not ended and starts within the horizon."""
+    now = now or timezone.now()
+    horizon = now + timedelta(hours=settings.NOTIFICATION_URGENT_HORIZON_HOURS)
+    return (end or start) >= now and start <= horizon
+
+
+def notify_on_commit(event, previous=None):
+    """
+    Open an urgent-change window for `event` once the surrounding
+    transaction commits, if its new or previous timing is urgent.
+
+    Args:
+        event: the saved Event
+        previous: (start, end) before an edit, None for a new event
+    """
+    if not (is_urgent(event.start, event.end) or (previous and is_urgent(*previous))):
+        return
+    # Only the first change of a window is kept, so the email can say what
+    # the event looked like before the burst of edits
+    state = {
+        'created': previous is None,
+        'previous_start': previous[0].isoformat() if previous else None,
+        'previous_end': previous[1].isoformat() if previous else None,
+    }
+    transaction.on_commit(lambda: _open_window(str(event.pk), state))
+
+
+def _open_window(event_id, state):
+    from .tasks import send_urgent_notification
+
+    debounce = settings.NOTIFICATION_URGENT_DEBOUNCE_SECONDS
+    # The key outlives the countdown, so a lost task only delays the next
+    # window instead of suppressing alerts for the event for good
+    if not cache.add(window_key(event_id), state, timeout=debounce * 2 + 60):
+        return
+    try:
+        send_urgent_notification.apply_async((event_id,), countdown=debounce)
+    except Exception as e:
+        logger.warning("Could not schedule urgent notification for event %s: %s", event_id, e)
+        cache.delete(window_key(event_id))
+
+
+def close_window(event_id):
+    """
+    End the event's debounce window and return the state recorded when it
+    opened: (created, previous (start, end) or None).
+    """
+    key = window_key(event_id)
+    state = cache.get(key) or {}
+    cache.delete(key)
+    previous = None
+    if state.get('previous_start'):
+        previous = (parse_datetime(state['previous_start']), parse_datetime(state['previous_end']))
+    return bool(state.get('created')), previous
+
+
+def recipients(event):
+    """
+    Opted-in users following the event's club or one of its collaborating
+    clubs, resolved through the indexed club columns rather than by
+    scanning users.
+
+    Users with club subscriptions follow exactly those clubs (and everything
+    below them where the subscription includes sub-clubs). Everyone else
+    follows the same clubs as their personal calendar feed
+    (events.ics.user_club_ids): everything under their club or sub-club, and
+    their extra clubs; users with no club at all follow every club.
+    """
+    club_ids = {event.club_id, *event.collaborating_clubs.values_list('id', flat=True)}
+    # The event's clubs and every club above them: following a club
+    # includes everything below it
+    ancestor_ids = set(
+        ClubClosure.objects.filter(descendant_id__in=club_ids).values_list('ancestor_id', flat=True)
+    ) | club_ids
+    subscribers = ClubSubscription.objects.filter(
+        Q(club_id__in=club_ids) | Q(club_id__in=ancestor_ids, include_sub_clubs=True)
+    )
+    extras = User.extra_clubs.through.objects
+    members = (
+        Q(club_id__in=ancestor_ids)
+        | Q(sub_club_id__in=ancestor_ids)
+        | Q(pk__in=extras.filter(club_id__in=club_ids).values('user_id'))
+        | (
+            Q(club__isnull=True, sub_club__isnull=True)
+            & ~Exists(extras.filter(user_id=OuterRef('pk')))
+        )
+    )
+    return (
+        User.objects
+        .filter(urgent_notifications_enabled=True, is_active=True)
+        .filter(
+            Q(pk__in=subscribers.values('user_id'))
+            | (~Exists(ClubSubscription.objects.filter(user_id=OuterRef('pk'))) & members)
+        )
+        .order_by('email')
+    )
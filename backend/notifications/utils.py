@@ -1,8 +1,22 @@
+import functools
+
 import pytz
-from datetime import datetime, time, date
+from datetime import datetime, time, date, timedelta
 from django.conf import settings
 
 
+@functools.lru_cache(maxsize=128)
+def get_timezone(timezone_str):
+    """
+    pytz timezone for a name, cached (LRU) so building thousands of digests
+    does not resolve the same zone over and over.
+
+    Raises:
+        pytz.UnknownTimeZoneError: for an unknown name (not cached)
+    """
+    return pytz.timezone(timezone_str)
+
+
 def convert_to_local(utc_time, timezone_str):
     """
     Convert UTC datetime to user's local timezone.
@@ -15,7 +29,7 @@ def convert_to_local(utc_time, timezone_str):
         datetime object in user's local timezone
     """
     try:
-        user_tz = pytz.timezone(timezone_str)
+        user_tz = get_timezone(timezone_str)
         return utc_time.astimezone(user_tz)
     except Exception:
         # Fallback to UTC if timezone is invalid
@@ -67,27 +81,77 @@ def is_notification_due_today(local_now, notification_time, last_sent_utc, user_
 
     # Check if last notification was sent before today in user's local tz
     try:
-        user_tz = pytz.timezone(user_tz_str)
+        user_tz = get_timezone(user_tz_str)
         last_sent_local = last_sent_utc.astimezone(user_tz)
         return last_sent_local.date() < local_now.date()
     except Exception:
         return False
 
 
-def format_event_datetime(dt, timezone_str):
+def _local_slot(day, notification_time, user_tz):
+    """
+    The UTC instant of `notification_time` on local date `day`.
+
+    Times skipped by a DST jump resolve to the same wall time after the
+    jump (02:30 on a spring-forward night fires at 03:30); repeated times
+    resolve to their second occurrence.
+    """
+    local = user_tz.normalize(user_tz.localize(datetime.combine(day, notification_time), is_dst=False))
+    return local.astimezone(pytz.UTC)
+
+
+def compute_next_notification_at(notification_time, timezone_str, now_utc, last_sent_utc=None):
+    """
+    The UTC instant a user's next digest is due.
+
+    Mirrors the per-minute checks this replaces:
+    - not sent yet today (user's local date): today's slot, even if it has
+      already passed, so a missed minute is caught up;
+    - already sent today: today's slot only if it lies after that send and
+      its minute has not ended (the time was just moved later in the day),
+      otherwise tomorrow's slot.
+
+    Args:
+        notification_time: time object (user's preferred notification time)
+        timezone_str: timezone string (e.g., 'Asia/Kolkata')
+        now_utc: aware datetime the schedule is computed from
+        last_sent_utc: datetime (UTC) of last notification sent, or None
+
+    Returns:
+        datetime in UTC, or None if no notification time is set
+    """
+    if not notification_time:
+        return None
+    try:
+        user_tz = get_timezone(timezone_str)
+    except Exception:
+        user_tz = pytz.UTC
+
+    today = now_utc.astimezone(user_tz).date()
+    today_slot = _local_slot(today, notification_time, user_tz)
+    if not last_sent_utc or last_sent_utc.astimezone(user_tz).date() < today:
+        return today_slot
+    if today_slot > last_sent_utc and today_slot + timedelta(minutes=1) > now_utc:
+        return today_slot
+    return _local_slot(today + timedelta(days=1), notification_time, user_tz)
+
+
+def format_event_datetime(dt, timezone_str, time_format='12h'):
     """
     Format event datetime for display in user's timezone.
     
     Args:
         dt: datetime object
         timezone_str: timezone string
+        time_format: '12h' or '24h' (the user's preference)
     
     Returns:
         str: Formatted datetime string
     """
+    pattern = '%B %d, %Y at %H:%M' if time_format == '24h' else '%B %d, %Y at %I:%M %p'
     try:
-        user_tz = pytz.timezone(timezone_str)
+        user_tz = get_timezone(timezone_str)
         local_dt = dt.astimezone(user_tz)
-        return local_dt.strftime('%B %d, %Y at %I:%M %p')
+        return local_dt.strftime(pattern)
     except Exception:
-        return dt.strftime('%B %d, %Y at %I:%M %p')
+        return dt.strftime(pattern)
@@ -6,6 +6,12 @@ import interactionPlugin from '@fullcalendar/interaction';
 import momentTimezonePlugin from '@fullcalendar/moment-timezone';
 import { getContrastColor } from '../utils/colorUtils';
 
+// Occurrences of a recurring series share the series id; each one needs its
+// own id on the calendar
+const calendarId = (event) => (
+  event.occurrence_start ? `${event.id}:${event.occurrence_start}` : event.id
+);
+
 const Calendar = forwardRef(({ events, userColor = '#3779e6', timeFormat = '12h', selectable = true, timezone = 'Asia/Kolkata', onEventClick, onDateSelect, onDatesSet, onEventDrop, onEventResize }, ref) => {
   const calendarRef = useRef(null);
 
@@ -15,7 +21,7 @@ const Calendar = forwardRef(({ events, userColor = '#3779e6', timeFormat = '12h'
   }));
 
   const calendarEvents = events.map((event) => ({
-    id: event.id,
+    id: calendarId(event),
     title: event.title,
     start: event.start,
     end: event.end,
@@ -31,6 +37,7 @@ const Calendar = forwardRef(({ events, userColor = '#3779e6', timeFormat = '12h'
       club: event.club,
       created_by: event.created_by,
       created_by_name: event.created_by_name,
+      occurrence_start: event.occurrence_start,
     },
   }));
 
@@ -94,7 +101,7 @@ const Calendar = forwardRef(({ events, userColor = '#3779e6', timeFormat = '12h'
       eventClick={(info) => {
         // Use loose equality (==) because FullCalendar IDs are strings, 
         // but local state IDs might be numbers
-        const event = events.find((e) => e.id == info.event.id);
+        const event = events.find((e) => calendarId(e) == info.event.id);
         if (event) onEventClick(event);
       }}
       dateClick={(info) => {
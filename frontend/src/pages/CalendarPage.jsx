@@ -2,12 +2,39 @@ import { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
 import Calendar from '../components/Calendar';
-import { useTheme } from '../context/ThemeContext';
 import EventModal from '../components/EventModal';
 import ClubFilterSidebar from '../components/ClubFilterSidebar';
 import Navbar from '../components/Navbar';
 import api from '../api/client';
-import { exportToPDF } from '../api/pdfExportService';
+import { exportToPDF, exportToCSV } from '../api/pdfExportService';
+
+// Filter params for a partial club selection. A main club selected with all
+// of its sub-clubs, and any selected sub-club, go into `club_tree` (the server
+// expands them to everything below and includes collaborations); a main club
+// selected on its own goes into `clubs` (its own events only; when the
+// selection also has a tree, events it co-organizes match too).
+function clubFilterParams(clubs, selectedClubs) {
+  const selected = new Set(selectedClubs);
+  const tree = [];
+  const exact = [];
+  clubs.forEach(c => {
+    const subs = c.sub_clubs || [];
+    if (selected.has(c.id) && subs.every(sub => selected.has(sub.id))) {
+      tree.push(c.id);
+      return;
+    }
+    if (selected.has(c.id)) exact.push(c.id);
+    subs.forEach(sub => {
+      if (selected.has(sub.id)) tree.push(sub.id);
+    });
+  });
+  // club_tree switches the server to hierarchical matching, so it is only
+  // sent when there is a tree to expand
+  const params = {};
+  if (tree.length > 0) params.club_tree = tree.join(',');
+  if (exact.length > 0) params.clubs = exact.join(',');
+  return params;
+}
 
 export default function CalendarPage() {
   const [events, setEvents] = useState([]);
@@ -17,7 +44,6 @@ export default function CalendarPage() {
   const [showEventModal, setShowEventModal] = useState(false);
   const [loading, setLoading] = useState(true);
   const { user, isAuthenticated } = useAuth();
-  const { theme } = useTheme();
   const navigate = useNavigate();
   const calendarRef = useRef(null);
 
@@ -78,12 +104,24 @@ export default function CalendarPage() {
       
       const allIdsCount = clubs.reduce((acc, c) => acc + 1 + (c.sub_clubs?.length || 0), 0);
       if (selectedClubs.length > 0 && selectedClubs.length < allIdsCount) {
-        params.clubs = selectedClubs.join(',');
+        Object.assign(params, clubFilterParams(clubs, selectedClubs));
       }
 
-      const response = await api.get('/api/events/', { params });
-      const data = response.data;
-      const eventsArray = Array.isArray(data) ? data : (data.results || []);
+      let eventsArray;
+      if (params.start && params.end) {
+        // Compact feed: plain club IDs plus a side-loaded clubs map
+        const response = await api.get('/api/events/feed/', { params });
+        const { events: feedEvents = [], clubs: clubMap = {} } = response.data;
+        eventsArray = feedEvents.map(event => ({
+          ...event,
+          club: clubMap[event.club_id],
+          collaborating_clubs: event.collaborating_club_ids.map(id => clubMap[id]).filter(Boolean),
+        }));
+      } else {
+        const response = await api.get('/api/events/', { params });
+        const data = response.data;
+        eventsArray = Array.isArray(data) ? data : (data.results || []);
+      }
       
       const processedEvents = (Array.isArray(eventsArray) ? eventsArray : []).map(event => {
         // Check if user has permission to edit this event (mirrors canEditEvent logic)
@@ -99,12 +137,16 @@ export default function CalendarPage() {
           extraClubIds.includes(eventClub.id)
         );
         
+        // Dragging one occurrence of a series would PATCH the whole series;
+        // occurrences are changed through the event modal instead
+        const isDraggable = Boolean(isEditable && !event.occurrence_start);
+
         return {
           ...event,
-          editable: isEditable,
-          startEditable: isEditable,
-          durationEditable: isEditable,
-          resourceEditable: isEditable,
+          editable: isDraggable,
+          startEditable: isDraggable,
+          durationEditable: isDraggable,
+          resourceEditable: isDraggable,
         };
       });
 
@@ -150,8 +192,8 @@ export default function CalendarPage() {
   const handleEventDrop = async (info) => {
     const { event, oldEvent, revert, view } = info;
     
-    // Check permission
-    if (!canEditEvent(event)) {
+    // Check permission; occurrences of a series are never dragged
+    if (!canEditEvent(event) || event.extendedProps.occurrence_start) {
       revert();
       return;
     }
@@ -208,8 +250,8 @@ export default function CalendarPage() {
   const handleEventResize = async (info) => {
     const { event, revert } = info;
 
-    // Check permission
-    if (!canEditEvent(event)) {
+    // Check permission; occurrences of a series are never dragged
+    if (!canEditEvent(event) || event.extendedProps.occurrence_start) {
       revert();
       return;
     }
@@ -254,7 +296,7 @@ export default function CalendarPage() {
     }
   };
 
-  const handleExportPDF = async () => {
+  const handleExport = async (exportFn) => {
     try {
       const calendarApi = calendarRef.current.getApi();
       const currentView = calendarApi.view;
@@ -263,14 +305,23 @@ export default function CalendarPage() {
         end: currentView.activeEnd
       };
 
-      await exportToPDF(events, selectedClubs, dateRange, currentView.type, theme, user?.time_format || '12h', user?.timezone || 'Asia/Kolkata');
-    } catch (error) {
+      // Same club filter as loadEvents: omit it when every club is selected
+      const allIdsCount = clubs.reduce((acc, c) => acc + 1 + (c.sub_clubs?.length || 0), 0);
+      const clubsParam = selectedClubs.length > 0 && selectedClubs.length < allIdsCount
+        ? selectedClubs.join(',')
+        : undefined;
 
-      console.error('Failed to export PDF:', error);
-      alert('Error exporting PDF. Please try again.');
+      await exportFn(dateRange, currentView.type, clubsParam);
+    } catch (error) {
+      console.error('Failed to export events:', error);
+      alert('Error exporting events. Please try again.');
     }
   };
 
+  const handleExportPDF = () => handleExport(exportToPDF);
+
+  const handleExportCSV = () => handleExport(exportToCSV);
+
   const canEditEvent = (event) => {
     if (!user) return false;
     if (user.is_superuser) return true;
@@ -372,6 +423,16 @@ export default function CalendarPage() {
                   Export PDF
                 </button>
 
+                <button
+                  onClick={handleExportCSV}
+                  className="flex-1 sm:flex-none bg-white dark:bg-gray-800 text-gray-700 dark:text-gray-200 px-4 py-2.5 rounded-xl font-semibold border border-gray-200 dark:border-gray-700 hover:bg-gray-50 dark:hover:bg-gray-700 shadow-sm transition-all duration-200 flex items-center justify-center gap-2"
+                >
+                  <svg className="w-5 h-5" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                    <path strokeLinecap="round" strokeLinejoin="round" strokeWidth="2" d="M12 10v6m0 0l-3-3m3 3l3-3m2 8H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z" />
+                  </svg>
+                  Export CSV
+                </button>
+
                 {(user?.club || user?.sub_club || user?.extra_clubs?.length > 0) && (
                   <button
                     onClick={() => {
@@ -1,5 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
+import api from '../api/client';
 import Navbar from '../components/Navbar';
 
 const TIMEZONES = [
@@ -14,10 +15,39 @@ export default function Settings() {
     notification_time: '',
     timezone: 'Asia/Kolkata',
     time_format: '12h',
+    urgent_notifications_enabled: false,
   });
   const [message, setMessage] = useState('');
   const [error, setError] = useState('');
   const [loading, setLoading] = useState(false);
+  const [clubs, setClubs] = useState([]);
+  const [subscriptions, setSubscriptions] = useState({});
+
+  useEffect(() => {
+    Promise.all([api.get('/api/clubs/'), api.get('/api/clubs/subscriptions/')])
+      .then(([clubsRes, subscriptionsRes]) => {
+        setClubs(clubsRes.data.results || clubsRes.data);
+        const list = subscriptionsRes.data.results || subscriptionsRes.data;
+        setSubscriptions(Object.fromEntries(list.map((sub) => [sub.club, sub.id])));
+      })
+      .catch(() => setError('Failed to load club subscriptions'));
+  }, []);
+
+  const toggleSubscription = async (clubId) => {
+    try {
+      if (subscriptions[clubId]) {
+        await api.delete(`/api/clubs/subscriptions/${subscriptions[clubId]}/`);
+        const { [clubId]: _removed, ...rest } = subscriptions;
+        setSubscriptions(rest);
+      } else {
+        const res = await api.post('/api/clubs/subscriptions/', { club: clubId });
+        setSubscriptions({ ...subscriptions, [clubId]: res.data.id });
+      }
+    } catch (err) {
+      console.error('Failed to update club subscriptions:', err);
+      setError('Failed to update club subscriptions');
+    }
+  };
 
   useEffect(() => {
     if (user) {
@@ -26,6 +56,7 @@ export default function Settings() {
         notification_time: user.notification_time || '',
         timezone: user.timezone || 'Asia/Kolkata',
         time_format: user.time_format || '12h',
+        urgent_notifications_enabled: user.urgent_notifications_enabled ?? false,
       });
     }
   }, [user]);
@@ -116,6 +147,24 @@ export default function Settings() {
                   </div>
                 )}
 
+                <div>
+                  <div className="flex items-center space-x-3">
+                    <input
+                      type="checkbox"
+                      id="urgent_notifications_enabled"
+                      checked={formData.urgent_notifications_enabled}
+                      onChange={(e) => setFormData({ ...formData, urgent_notifications_enabled: e.target.checked })}
+                      className="w-5 h-5 text-primary-600 rounded focus:ring-primary-500"
+                    />
+                    <label htmlFor="urgent_notifications_enabled" className="text-lg font-medium text-gray-900 dark:text-white">
+                      Instant Alerts for Last-Minute Changes
+                    </label>
+                  </div>
+                  <p className="text-sm text-gray-600 dark:text-gray-400 mt-2 ml-8">
+                    Get an email right away when an event of your clubs starting in the next few hours is added, moved or changed.
+                  </p>
+                </div>
+
                 <button
                   type="submit"
                   disabled={loading}
@@ -129,12 +178,51 @@ export default function Settings() {
                 <h3 className="font-semibold text-blue-900 dark:text-blue-300 mb-2">ℹ️ How Notifications Work</h3>
                 <ul className="text-sm text-blue-800 dark:text-blue-200 space-y-1">
                   <li>• Emails are sent if events were added or updated since your last notification</li>
-                  <li>• Events from all CEAL clubs will be included</li>
+                  <li>• Events from the clubs you follow are included (all CEAL clubs if you follow none)</li>
                   <li>• Other members will continue to receive notifications if they have them enabled</li>
                 </ul>
               </div>
             </section>
 
+            <section className="bg-white dark:bg-gray-800 rounded-xl shadow-lg p-8 transition-colors duration-200">
+              <h2 className="text-2xl font-bold text-gray-900 dark:text-white mb-2">Clubs You Follow</h2>
+              <p className="text-sm text-gray-600 dark:text-gray-400 mb-6">
+                Notifications only include events from the clubs you follow. Following a club includes its sub-clubs.
+                Follow none to hear about every club.
+              </p>
+              <div className="space-y-3">
+                {clubs.map((club) => (
+                  <div key={club.id}>
+                    <label className="flex items-center space-x-3">
+                      <input
+                        type="checkbox"
+                        checked={Boolean(subscriptions[club.id])}
+                        onChange={() => toggleSubscription(club.id)}
+                        className="w-5 h-5 text-primary-600 rounded focus:ring-primary-500"
+                      />
+                      <span className="w-3 h-3 rounded-full" style={{ backgroundColor: club.color }} />
+                      <span className="font-medium text-gray-900 dark:text-white">{club.name}</span>
+                    </label>
+                    {club.sub_clubs?.length > 0 && !subscriptions[club.id] && (
+                      <div className="ml-8 mt-2 space-y-2">
+                        {club.sub_clubs.map((sub) => (
+                          <label key={sub.id} className="flex items-center space-x-3">
+                            <input
+                              type="checkbox"
+                              checked={Boolean(subscriptions[sub.id])}
+                              onChange={() => toggleSubscription(sub.id)}
+                              className="w-4 h-4 text-primary-600 rounded focus:ring-primary-500"
+                            />
+                            <span className="text-sm text-gray-700 dark:text-gray-300">{sub.name}</span>
+                          </label>
+                        ))}
+                      </div>
+                    )}
+                  </div>
+                ))}
+              </div>
+            </section>
+
             <section className="bg-white dark:bg-gray-800 rounded-xl shadow-lg p-8 transition-colors duration-200">
               <h2 className="text-2xl font-bold text-gray-900 dark:text-white mb-6">Calendar Preferences</h2>
               <div>